@@ -22,7 +22,7 @@ class WorkflowForm(forms.ModelForm):
 
     class Meta:
         model = Workflow
-        fields = ('workflow', 'initial_state', 'title')
+        fields = ('workflow', 'initial_state', 'title', 'materialization')
 
     def __init__(self, *args, **kwargs):
         instance = kwargs.get("instance", None)
@@ -49,7 +49,7 @@ class WorkflowForm(forms.ModelForm):
 # noinspection PyMethodMayBeStatic
 class WorkflowAdmin(admin.ModelAdmin):
     form = WorkflowForm
-    list_display = ('model_class', 'field_name', 'initial_state')
+    list_display = ('model_class', 'field_name', 'initial_state', 'materialization')
 
     def model_class(self, obj):
         cls = obj.content_type.model_class()
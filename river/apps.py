@@ -3,6 +3,7 @@ import operator
 from functools import reduce
 
 from django.apps import AppConfig
+from django.db.models import Q
 from django.db.utils import OperationalError, ProgrammingError
 
 LOGGER = logging.getLogger(__name__)
@@ -29,6 +30,12 @@ class RiverApp(AppConfig):
             for model_class in self._get_all_workflow_classes():
                 self._register_hook_inlines(model_class)
 
+        from river.core.hookregistry import hook_registry
+        hook_registry.validate()
+
+        if app_config.WARM_UP_FUNCTIONS:
+            self._warm_up_functions()
+
         LOGGER.debug('RiverApp is loaded.')
 
     @classmethod
@@ -46,6 +53,19 @@ class RiverApp(AppConfig):
         from river.core.workflowregistry import workflow_registry
         return workflow_registry.workflows[id(model)]
 
+    def _warm_up_functions(self):
+        try:
+            functions = self.get_model('Function').objects.filter(
+                Q(river_onapprovedhook_hooks__isnull=False) |
+                Q(river_ontransithook_hooks__isnull=False) |
+                Q(river_oncompletehook_hooks__isnull=False)
+            ).distinct()
+            for function in functions:
+                function.get()
+            LOGGER.debug("%s functions are compiled in advance" % len(functions))
+        except (OperationalError, ProgrammingError):
+            pass
+
     def _register_hook_inlines(self, model):  # pylint: disable=no-self-use
         from django.contrib import admin
         from river.core.workflowregistry import workflow_registry
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import Permission, Group
 from django.contrib.contenttypes.models import ContentType
 
+from django.core.signals import setting_changed
 from django.db import connection
 
 
@@ -21,7 +22,22 @@ class RiverConfig(object):
                 'USER_CLASS': settings.AUTH_USER_MODEL,
                 'PERMISSION_CLASS': Permission,
                 'GROUP_CLASS': Group,
-                'INJECT_MODEL_ADMIN': False
+                'INJECT_MODEL_ADMIN': False,
+                'WORKFLOW_CACHE': None,
+                'DEFERRED_HOOKS': False,
+                'HOOK_WORKERS': 4,
+                'HOOK_QUEUE_SIZE': 1000,
+                'HOOK_QUEUE_TIMEOUT': 1.0,
+                'FUNCTION_CACHE_SIZE': 256,
+                'WARM_UP_FUNCTIONS': False,
+                'METRICS_BACKEND': None,
+                'APPROVAL_INBOX': False,
+                'INBOX_COUNTS_CACHE': None,
+                'INBOX_COUNTS_TIMEOUT': 30,
+                'AUTHORIZATION_CACHE': None,
+                'AUTHORIZATION_CACHE_SIZE': 1024,
+                'AUTHORIZATION_CACHE_TIMEOUT': 60,
+                'DRIVER': 'river.driver.orm_driver.OrmDriver'
             }
             river_settings = {}
             for key, default in allowed_configurations.items():
@@ -43,3 +59,11 @@ class RiverConfig(object):
 
 
 app_config = RiverConfig()
+
+
+def _on_setting_changed(setting, *args, **kwargs):
+    if setting.startswith(RiverConfig.prefix + '_'):
+        app_config.cached_settings = None
+
+
+setting_changed.connect(_on_setting_changed)
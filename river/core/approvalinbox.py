@@ -0,0 +1,76 @@
+import logging
+from collections import defaultdict
+from functools import reduce
+from itertools import product
+
+from django.db.models import Q
+
+from river.config import app_config
+from river.core.inboxcounts import invalidate_inbox_counts
+from river.models import ApprovalInbox, TransitionApproval, PENDING
+
+LOGGER = logging.getLogger(__name__)
+
+
+def refresh_approval_inbox(workflow, content_type, states):
+    """
+    Replaces the inbox rows of the given workflow objects with the approvals that can be approved on their current
+    states. ``states`` maps the ids of the workflow objects to their current state ids. It runs a fixed number of
+    queries no matter how many objects there are.
+    """
+    states = {str(object_id): state_id for object_id, state_id in states.items()}
+    if not states:
+        return
+
+    object_ids_by_state = defaultdict(list)
+    for object_id, state_id in states.items():
+        object_ids_by_state[state_id].append(object_id)
+
+    min_priorities = {}
+    approvals = []
+    for approval_id, object_id, transition_id, priority, user_id in TransitionApproval.objects.filter(
+            workflow=workflow, content_type=content_type, status=PENDING
+    ).filter(reduce(lambda agg, q: agg | q, [
+        Q(object_id__in=object_ids, transition__source_state_id=state_id) for state_id, object_ids in object_ids_by_state.items()
+    ])).values_list("pk", "object_id", "transition_id", "priority", "transactioner_id"):
+        min_priorities[transition_id] = min(priority, min_priorities.get(transition_id, priority))
+        approvals.append((approval_id, object_id, transition_id, priority, user_id))
+    approvals = [approval for approval in approvals if approval[3] == min_priorities[approval[2]]]
+
+    approval_ids = [approval_id for approval_id, _, _, _, _ in approvals]
+    groups = defaultdict(list)
+    for approval_id, group_id in TransitionApproval.groups.through.objects.filter(
+            transitionapproval_id__in=approval_ids
+    ).values_list("transitionapproval_id", "group_id"):
+        groups[approval_id].append(group_id)
+    permissions = defaultdict(list)
+    for approval_id, permission_id in TransitionApproval.permissions.through.objects.filter(
+            transitionapproval_id__in=approval_ids
+    ).values_list("transitionapproval_id", "permission_id"):
+        permissions[approval_id].append(permission_id)
+
+    ApprovalInbox.objects.filter(workflow=workflow, content_type=content_type, object_id__in=list(states.keys())).delete()
+    ApprovalInbox.objects.bulk_create([
+        ApprovalInbox(
+            workflow=workflow,
+            content_type=content_type,
+            object_id=object_id,
+            transition_approval_id=approval_id,
+            group_id=group_id,
+            permission_id=permission_id,
+            user_id=user_id,
+        )
+        for approval_id, object_id, _, _, user_id in approvals
+        for group_id, permission_id in product(groups[approval_id] or [None], permissions[approval_id] or [None])
+    ])
+    LOGGER.debug("The approval inbox is refreshed for %s workflow objects of the workflow %s", len(states), workflow.pk)
+
+
+def on_approvals_changed(workflow, content_type, states):
+    """
+    Keeps what is derived from the approvals up to date after the approvals of the given workflow objects are
+    written; the inbox rows when ``RIVER_APPROVAL_INBOX`` is enabled and the versions of the inbox counts.
+    """
+    if app_config.APPROVAL_INBOX:
+        refresh_approval_inbox(workflow, content_type, states)
+    invalidate_inbox_counts(workflow)
@@ -0,0 +1,255 @@
+import logging
+from collections import namedtuple, defaultdict
+
+from django.db.models import Q, OuterRef
+from django.utils import timezone
+
+from river.core.approvalinbox import on_approvals_changed
+from river.core.instanceworkflowobject import INSTANCE_WORKFLOW_OBJECTS, impossible_future_q, materialize_next_transitions
+from river.core.workflowgraph import workflow_graph_cache
+from river.models import TransitionApproval, Transition, WorkflowObjectSnapshot, PENDING, APPROVED, CANCELLED, DONE
+from river.models.on_approved_hook import OnApprovedHook
+from river.models.on_complete_hook import OnCompleteHook
+from river.models.on_transit_hook import OnTransitHook
+from river.signals import BatchSignal
+from river.utils.error_code import ErrorCode
+from river.utils.exceptions import RiverException
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_snapshots(workflow, content_type, field_name, workflow_objects):
+    """
+    Finds the snapshots of the given workflow objects with one query and maps them by the ids of the objects. The
+    snapshots of the objects that are initialized before the snapshots are introduced are taken one by one. The
+    snapshots are locked in the order of their pks until the end of the transaction, like the one of ``approve`` is,
+    so the batches and the single approvals of the same objects don't run over each other.
+    """
+    snapshots = {
+        snapshot.object_id: snapshot
+        for snapshot in WorkflowObjectSnapshot.objects.select_for_update().filter(
+            content_type=content_type,
+            workflow=workflow,
+            object_id__in=[str(workflow_object.pk) for workflow_object in workflow_objects]
+        ).order_by("pk")
+    }
+    return {
+        workflow_object.pk: snapshots.get(str(workflow_object.pk)) or getattr(workflow_object.river, field_name).snapshot
+        for workflow_object in workflow_objects
+    }
+
+
+class ApprovalResult(namedtuple("ApprovalResult", ["workflow_object", "transition_approval", "transited", "error"])):
+    """
+    The outcome of approving one of the workflow objects of a batch. ``error`` is the ``RiverException`` that tells
+    why the object couldn't be approved and it is ``None`` when the object is approved.
+    """
+
+    @property
+    def approved(self):
+        return self.error is None
+
+
+class BatchApproval(object):
+    """
+    Approves many workflow objects of the same workflow at once. The available approvals of the whole batch are
+    found with a single query and the approvals, the transitions, the snapshots and the states are written with
+    set based statements, so the number of the queries doesn't grow with the size of the batch except for the
+    objects whose workflow cycles back.
+    """
+
+    def __init__(self, workflow, content_type, field_name, river_driver):
+        self.workflow = workflow
+        self.content_type = content_type
+        self.field_name = field_name
+        self.river_driver = river_driver
+        self.graph = workflow_graph_cache.get(workflow)
+
+    def approve(self, workflow_objects, as_user, next_state=None, bulk=True):
+        workflow_objects = list(workflow_objects)
+        if not workflow_objects:
+            return []
+
+        errors = {}
+        snapshots = get_snapshots(self.workflow, self.content_type, self.field_name, workflow_objects)
+        approvals = self._select_approvals(workflow_objects, as_user, next_state, errors)
+        self._lock_approvals(approvals, errors)
+        approved_objects = [workflow_object for workflow_object in workflow_objects if workflow_object.pk in approvals]
+
+        transited = {}
+        if approved_objects:
+            now = timezone.now()
+            for workflow_object in approved_objects:
+                snapshot = snapshots[workflow_object.pk]
+                approval = approvals[workflow_object.pk]
+                approval.status = APPROVED
+                approval.transactioner = as_user
+                approval.transaction_date = now
+                approval.previous_id = snapshot.last_approval_id if snapshot else None
+            TransitionApproval.objects.bulk_update(approvals.values(), ["status", "transactioner", "transaction_date", "previous"])
+
+            if next_state:
+                self._cancel_impossible_future(approvals)
+
+            transited = self._complete_transitions(approvals)
+            for workflow_object in approved_objects:
+                if workflow_object.pk in transited:
+                    self._set_state(workflow_object, approvals[workflow_object.pk].transition.destination_state_id)
+            self._build_next_transitions(approved_objects, transited)
+            self._update_snapshots(approvals, snapshots, transited, now)
+            on_approvals_changed(self.workflow, self.content_type, {
+                workflow_object.pk: getattr(workflow_object, self.field_name + "_id") for workflow_object in approved_objects
+            })
+
+            transited_objects = [workflow_object for workflow_object in approved_objects if workflow_object.pk in transited]
+            with BatchSignal(OnApprovedHook, self.workflow, self._entries(approved_objects, approvals)), \
+                    BatchSignal(OnTransitHook, self.workflow, self._entries(transited_objects, approvals)), \
+                    BatchSignal(OnCompleteHook, self.workflow, self._entries(
+                        [workflow_object for workflow_object in transited_objects if self._on_final_state(workflow_object)], approvals
+                    )):
+                if bulk:
+                    type(workflow_objects[0]).objects.bulk_update(transited_objects, [self.field_name])
+                else:
+                    for workflow_object in approved_objects:
+                        workflow_object.save()
+
+            for workflow_object in approved_objects:
+                workflow_object.__dict__.pop(INSTANCE_WORKFLOW_OBJECTS, None)
+
+        LOGGER.debug("%s of %s workflow objects are approved by %s", len(approved_objects), len(workflow_objects), as_user)
+        return [
+            ApprovalResult(workflow_object, approvals.get(workflow_object.pk), workflow_object.pk in transited, errors.get(workflow_object.pk))
+            for workflow_object in workflow_objects
+        ]
+
+    def _select_approvals(self, workflow_objects, as_user, next_state, errors):
+        available_approvals = defaultdict(list)
+        for approval in self.river_driver.get_available_approvals(as_user).filter(
+                object_id__in=[str(workflow_object.pk) for workflow_object in workflow_objects]
+        ).select_related("transition"):
+            available_approvals[approval.object_id].append(approval)
+
+        approvals = {}
+        for workflow_object in workflow_objects:
+            candidates = available_approvals[str(workflow_object.pk)]
+            if next_state and candidates:
+                candidates = [approval for approval in candidates if approval.transition.destination_state_id == next_state.pk]
+                if not candidates:
+                    errors[workflow_object.pk] = RiverException(
+                        ErrorCode.INVALID_NEXT_STATE_FOR_USER, "Invalid state is given(%s) for the object %s" % (next_state, workflow_object)
+                    )
+                    continue
+            if not candidates:
+                errors[workflow_object.pk] = RiverException(
+                    ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER, "There is no available approval for the user on the object %s" % workflow_object
+                )
+            elif len(set(approval.transition.destination_state_id for approval in candidates)) > 1:
+                errors[workflow_object.pk] = RiverException(
+                    ErrorCode.NEXT_STATE_IS_REQUIRED, "State must be given when there are multiple states for destination"
+                )
+            else:
+                approvals[workflow_object.pk] = min(candidates, key=lambda approval: (approval.priority, approval.pk))
+        return approvals
+
+    @staticmethod
+    def _lock_approvals(approvals, errors):
+        """
+        Locks the selected approvals until the end of the transaction and drops the ones that are not pending anymore,
+        since they are approved by another transaction after they are selected.
+        """
+        if not approvals:
+            return
+        pending = set(TransitionApproval.objects.select_for_update().filter(
+            pk__in=[approval.pk for approval in approvals.values()], status=PENDING
+        ).order_by("pk").values_list("pk", flat=True))
+        for object_id, approval in list(approvals.items()):
+            if approval.pk not in pending:
+                del approvals[object_id]
+                errors[object_id] = RiverException(
+                    ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER, "The approval %s is already approved or cancelled" % approval.pk
+                )
+
+    def _cancel_impossible_future(self, approvals):
+        transitions = Transition.objects.filter(workflow=self.workflow, content_type=self.content_type)
+        object_transitions = transitions.filter(object_id=OuterRef("object_id"))
+
+        approved_transitions = defaultdict(list)
+        for object_id, approval in approvals.items():
+            approved_transitions[(approval.transition.destination_state_id, approval.transition.iteration)].append(approval.transition)
+
+        impossible_future = Q(pk__in=[])
+        for transitions_of_a_kind in approved_transitions.values():
+            impossible_future |= Q(
+                object_id__in=[transition.object_id for transition in transitions_of_a_kind],
+                iteration__gte=transitions_of_a_kind[0].iteration
+            ) & impossible_future_q(self.graph, transitions_of_a_kind[0], object_transitions)
+
+        cancelled_transitions = transitions.filter(status=PENDING).filter(impossible_future).exclude(
+            pk__in=[approval.transition_id for approval in approvals.values()]
+        )
+        TransitionApproval.objects.filter(transition__in=cancelled_transitions).update(status=CANCELLED)
+        cancelled_transitions.update(status=CANCELLED)
+
+    @staticmethod
+    def _complete_transitions(approvals):
+        transition_ids = set(approval.transition_id for approval in approvals.values())
+        not_completed = set(TransitionApproval.objects.filter(
+            transition_id__in=transition_ids, status=PENDING
+        ).values_list("transition_id", flat=True).distinct())
+
+        transited = {}
+        for object_id, approval in approvals.items():
+            if approval.transition_id not in not_completed:
+                approval.transition.status = DONE
+                transited[object_id] = approval.transition
+        if transited:
+            Transition.objects.filter(pk__in=[transition.pk for transition in transited.values()]).update(status=DONE)
+        return transited
+
+    def _build_next_transitions(self, workflow_objects, transited):
+        if not transited:
+            return
+        if self.graph.lazy:
+            materialize_next_transitions(self.workflow, self.content_type, transited)
+            return
+        next_transitions = defaultdict(set)
+        for object_id, source_state_id, status in Transition.objects.filter(
+                workflow=self.workflow,
+                content_type=self.content_type,
+                object_id__in=[str(object_id) for object_id in transited.keys()],
+                source_state_id__in=set(transition.destination_state_id for transition in transited.values())
+        ).values_list("object_id", "source_state_id", "status"):
+            next_transitions[(object_id, source_state_id)].add(status)
+
+        for workflow_object in workflow_objects:
+            transition = transited.get(workflow_object.pk)
+            if transition is None:
+                continue
+            statuses = next_transitions[(str(workflow_object.pk), transition.destination_state_id)]
+            if DONE in statuses and PENDING not in statuses:
+                getattr(workflow_object.river, self.field_name)._re_create_cycled_path(transition)
+
+    def _update_snapshots(self, approvals, snapshots, transited, now):
+        updated = []
+        for object_id, approval in approvals.items():
+            snapshot = snapshots[object_id]
+            if snapshot is None:
+                continue
+            snapshot.state_id = approval.transition.destination_state_id if object_id in transited else approval.transition.source_state_id
+            snapshot.iteration = approval.transition.iteration
+            snapshot.completed = self.graph.is_final(snapshot.state_id)
+            snapshot.last_approval = approval
+            if object_id in transited:
+                snapshot.last_transition_date = now
+            updated.append(snapshot)
+        WorkflowObjectSnapshot.objects.bulk_update(updated, ["state", "iteration", "completed", "last_approval", "last_transition_date"])
+
+    def _set_state(self, workflow_object, state_id):
+        setattr(workflow_object, self.field_name, self.graph.get_state(state_id))
+
+    def _on_final_state(self, workflow_object):
+        return self.graph.is_final(getattr(workflow_object, self.field_name + "_id"))
+
+    @staticmethod
+    def _entries(workflow_objects, approvals):
+        return [(workflow_object, approvals[workflow_object.pk]) for workflow_object in workflow_objects]
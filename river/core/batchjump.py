@@ -0,0 +1,153 @@
+import logging
+from collections import namedtuple, defaultdict
+from functools import reduce
+
+from django.db.models import Q
+from django.utils import timezone
+
+from river.core.approvalinbox import on_approvals_changed
+from river.core.batchapproval import get_snapshots
+from river.core.instanceworkflowobject import INSTANCE_WORKFLOW_OBJECTS, materialize_next_transitions
+from river.core.transitionbuilder import TransitionBuilder
+from river.core.workflowgraph import workflow_graph_cache
+from river.models import TransitionApproval, Transition, WorkflowObjectSnapshot, PENDING, JUMPED
+from river.utils.error_code import ErrorCode
+from river.utils.exceptions import RiverException
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JumpResult(namedtuple("JumpResult", ["workflow_object", "transition", "error"])):
+    """
+    The outcome of jumping one of the workflow objects of a batch. ``transition`` is the transition that the object
+    is jumped through and ``error`` is the ``RiverException`` that tells why the object couldn't be jumped.
+    """
+
+    @property
+    def jumped(self):
+        return self.error is None
+
+
+class BatchJump(object):
+    """
+    Jumps many workflow objects of the same workflow to a state at once. Whether a state can be jumped to is decided
+    on the workflow graph, the transitions to jump through are found with one query and all the skipped transitions
+    and approvals are marked with one ``UPDATE`` each, no matter how many of them are skipped. The state is only set on
+    the objects; writing it is left to the caller.
+    """
+
+    def __init__(self, workflow, content_type, field_name):
+        self.workflow = workflow
+        self.content_type = content_type
+        self.field_name = field_name
+        self.graph = workflow_graph_cache.get(workflow)
+
+    def jump(self, workflow_objects, state):
+        workflow_objects = list(workflow_objects)
+        reachable_objects = [
+            workflow_object for workflow_object in workflow_objects
+            if self.graph.can_reach(getattr(workflow_object, self.field_name + "_id"), state.pk)
+        ]
+
+        transitions = {}
+        if reachable_objects:
+            snapshots = get_snapshots(self.workflow, self.content_type, self.field_name, reachable_objects)
+            transitions = self._get_jumped_transitions(reachable_objects, state, snapshots)
+
+        if transitions:
+            jumped_transitions = Transition.objects.filter(
+                workflow=self.workflow, content_type=self.content_type, status=PENDING
+            ).filter(reduce(lambda agg, q: agg | q, [
+                Q(object_id__in=[str(object_id) for object_id in object_ids], iteration__lte=iteration)
+                for iteration, object_ids in self._by_iteration(transitions).items()
+            ]))
+            TransitionApproval.objects.filter(transition__in=jumped_transitions).update(status=JUMPED)
+            jumped_transitions.update(status=JUMPED)
+            if self.graph.lazy:
+                materialize_next_transitions(self.workflow, self.content_type, transitions)
+
+            now = timezone.now()
+            jumped_snapshots = []
+            for workflow_object in reachable_objects:
+                transition = transitions.get(workflow_object.pk)
+                if transition is None:
+                    continue
+                transition.status = JUMPED
+                setattr(workflow_object, self.field_name, state)
+                workflow_object.__dict__.pop(INSTANCE_WORKFLOW_OBJECTS, None)
+
+                snapshot = snapshots[workflow_object.pk]
+                if snapshot is not None:
+                    snapshot.state = state
+                    snapshot.iteration = transition.iteration
+                    snapshot.completed = self.graph.is_final(state.pk)
+                    snapshot.last_transition_date = now
+                    jumped_snapshots.append(snapshot)
+            WorkflowObjectSnapshot.objects.bulk_update(jumped_snapshots, ["state", "iteration", "completed", "last_transition_date"])
+            on_approvals_changed(self.workflow, self.content_type, {object_id: state.pk for object_id in transitions.keys()})
+
+        LOGGER.debug("%s of %s workflow objects are jumped to %s", len(transitions), len(workflow_objects), state)
+        return [
+            JumpResult(
+                workflow_object,
+                transitions.get(workflow_object.pk),
+                None if workflow_object.pk in transitions else RiverException(
+                    ErrorCode.STATE_IS_NOT_AVAILABLE_TO_BE_JUMPED,
+                    "This state is not available to be jumped in the future of this object"
+                )
+            )
+            for workflow_object in workflow_objects
+        ]
+
+    def _get_jumped_transitions(self, workflow_objects, state, snapshots):
+        """
+        The transitions of a lazy workflow are not there until the objects enter their source states. When an object
+        is not next to the state, the transition that enters the state is created at the iteration of the pending
+        transitions of the object to be jumped through.
+        """
+        pending_transitions = Transition.objects.filter(
+            workflow=self.workflow,
+            content_type=self.content_type,
+            object_id__in=[str(workflow_object.pk) for workflow_object in workflow_objects],
+            status=PENDING
+        )
+        if not self.graph.lazy:
+            pending_transitions = pending_transitions.filter(destination_state=state)
+        candidates = defaultdict(list)
+        for transition in pending_transitions.order_by("iteration"):
+            candidates[transition.object_id].append(transition)
+
+        transitions = {}
+        transition_builder = TransitionBuilder(self.workflow, self.content_type)
+        for workflow_object in workflow_objects:
+            snapshot = snapshots[workflow_object.pk]
+            recent_iteration = snapshot.iteration if snapshot else 0
+            transition = next((
+                transition for transition in candidates[str(workflow_object.pk)]
+                if transition.destination_state_id == state.pk and transition.iteration >= recent_iteration
+            ), None)
+            if transition is not None:
+                transitions[workflow_object.pk] = transition
+            elif self.graph.lazy:
+                self._add_entering_transition(transition_builder, workflow_object, state, candidates[str(workflow_object.pk)], recent_iteration)
+
+        object_ids = {str(workflow_object.pk): workflow_object.pk for workflow_object in workflow_objects}
+        for transition in transition_builder.build():
+            transitions[object_ids[transition.object_id]] = transition
+        return transitions
+
+    def _add_entering_transition(self, transition_builder, workflow_object, state, pending_transitions, recent_iteration):
+        reachable_state_ids = self.graph.reachable_state_ids(getattr(workflow_object, self.field_name + "_id"))
+        transition_meta = next((
+            transition_meta for transition_meta in self.graph.incoming(state.pk) if transition_meta.source_state_id in reachable_state_ids
+        ), None)
+        if transition_meta is not None:
+            iteration = max([transition.iteration for transition in pending_transitions], default=recent_iteration)
+            transition_builder.add_transition(workflow_object.pk, transition_meta, iteration)
+
+    @staticmethod
+    def _by_iteration(transitions):
+        object_ids = defaultdict(list)
+        for object_id, transition in transitions.items():
+            object_ids[transition.iteration].append(object_id)
+        return object_ids
@@ -1,7 +1,25 @@
+import logging
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import QuerySet, Exists, OuterRef, CharField
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+
+from river.config import app_config
+from river.core.approvalinbox import refresh_approval_inbox, on_approvals_changed
+from river.core.batchapproval import BatchApproval, ApprovalResult
+from river.core.batchjump import BatchJump, JumpResult
+from river.core.inboxcounts import invalidate_inbox_counts
+from river.core.transitionbuilder import TransitionBuilder
+from river.core.workflowcache import workflow_cache
+from river.core.workflowgraph import workflow_graph_cache
+from river.instrumentation import instrumented
+from river.models import State, Transition, WorkflowObjectSnapshot
+from river.utils.error_code import ErrorCode
+from river.utils.exceptions import RiverException
 
-from river.driver.orm_driver import OrmDriver
-from river.models import State, Workflow, TransitionMeta
+LOGGER = logging.getLogger(__name__)
 
 
 class ClassWorkflowObject(object):
@@ -9,39 +27,188 @@ class ClassWorkflowObject(object):
     def __init__(self, wokflow_object_class, field_name):
         self.wokflow_object_class = wokflow_object_class
         self.field_name = field_name
-        self.workflow = Workflow.objects.filter(field_name=self.field_name, content_type=self._content_type).first() # buggy
+        self.workflow = workflow_cache.get(self._content_type, self.field_name)
         self._cached_river_driver = None
 
     @property
     def _river_driver(self):
-        if self._cached_river_driver:
+        driver_class = import_string(app_config.DRIVER)
+        if isinstance(self._cached_river_driver, driver_class) and self._cached_river_driver.workflow == self.workflow:
             return self._cached_river_driver
-        self._cached_river_driver = OrmDriver(self.workflow, self.wokflow_object_class, self.field_name)
+        self._cached_river_driver = driver_class(self.workflow, self.wokflow_object_class, self.field_name)
         return self._cached_river_driver
 
-    def get_on_approval_objects(self, as_user):
-        approvals = self.get_available_approvals(as_user)
-        object_ids = list(approvals.values_list('object_id', flat=True))
-        return self.wokflow_object_class.objects.filter(pk__in=object_ids)
+    def get_on_approval_objects(self, as_user, after_pk=None, limit=None):
+        """
+        Returns a lazy queryset of the workflow objects that are waiting for the given user's approval, ordered by
+        their primary keys. The objects are filtered with a correlated ``Exists`` in the database, so the queryset can
+        be streamed with ``iterator(chunk_size)``. ``after_pk`` and ``limit`` page through it with a keyset cursor;
+        the next page starts after the primary key of the last object of the previous one.
+        """
+        workflow_objects = self._waiting_objects(as_user).order_by("pk")
+        if after_pk is not None:
+            workflow_objects = workflow_objects.filter(pk__gt=after_pk)
+        if limit is not None:
+            workflow_objects = workflow_objects[:limit]
+        return workflow_objects
+
+    def _waiting_objects(self, as_user, group_ids=None, permission_ids=None):
+        if not self.workflow:
+            return self.wokflow_object_class.objects.none()
 
+        if app_config.APPROVAL_INBOX:
+            approvals = self._river_driver.get_inbox(as_user, group_ids, permission_ids).filter(
+                object_id=Cast(OuterRef("pk"), CharField(max_length=50))
+            )
+        else:
+            approvals = self._river_driver.get_on_approval_approvals(as_user, group_ids, permission_ids)
+        return self.wokflow_object_class.objects.filter(Exists(approvals))
+
+    @instrumented("get_available_approvals", count_queries=False)
     def get_available_approvals(self, as_user, workflow=None):
         if workflow:
             self.workflow = workflow
-            
+
         return self._river_driver.get_available_approvals(as_user)
 
+    @instrumented("approve_many")
+    @transaction.atomic
+    def approve_many(self, workflow_objects, as_user, next_state=None, bulk=True):
+        """
+        Approves many workflow objects on behalf of the given user at once. The available approvals of the whole
+        batch are found with one query, the approvals and the transitions are updated with set based statements and
+        the new states are written with a single ``bulk_update``. The hooks are executed once per batch with all
+        the workflow objects and the transition approvals that they are interested in. An object that can't be
+        approved doesn't fail the others; a list of ``ApprovalResult`` in the order of the given objects is returned.
+
+        ``bulk_update`` neither calls ``save`` nor fires ``pre_save`` and ``post_save``. When ``bulk`` is ``False``,
+        the approved objects are saved one by one with ``save`` instead, like ``approve`` does. The snapshots and the
+        selected approvals are locked until the end of the transaction, so an approval that is approved concurrently
+        is reported as an error instead of being approved twice.
+        """
+        if not self.workflow:
+            return [
+                ApprovalResult(workflow_object, None, False, RiverException(
+                    ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER, "There is no workflow for the object %s" % workflow_object
+                ))
+                for workflow_object in workflow_objects
+            ]
+        return BatchApproval(self.workflow, self._content_type, self.field_name, self._river_driver).approve(
+            workflow_objects, as_user, next_state, bulk
+        )
+
+    @instrumented("jump_many")
+    @transaction.atomic
+    def jump_many(self, workflow_objects, state):
+        """
+        Forces many workflow objects to the given state at once, like the admin actions do. The transitions and the
+        approvals that are skipped are marked with one ``UPDATE`` each and the state is written with another one, so
+        the cost doesn't depend on how many objects there are or how many transitions they skip. ``pre_save`` and
+        ``post_save`` are not fired. A list of ``JumpResult`` in the order of the given objects is returned.
+        """
+        if not self.workflow:
+            return [
+                JumpResult(workflow_object, None, RiverException(
+                    ErrorCode.STATE_IS_NOT_AVAILABLE_TO_BE_JUMPED, "There is no workflow for the object %s" % workflow_object
+                ))
+                for workflow_object in workflow_objects
+            ]
+        results = BatchJump(self.workflow, self._content_type, self.field_name).jump(workflow_objects, state)
+        jumped_object_ids = [result.workflow_object.pk for result in results if result.jumped]
+        if jumped_object_ids:
+            self.wokflow_object_class.objects.filter(pk__in=jumped_object_ids).update(**{self.field_name: state})
+        return results
+
+    @instrumented("initialize_many")
+    def initialize_many(self, workflow_objects, batch_size=1000, workflow=None):
+        """
+        Initializes the workflow of many objects at once, like the ones that are created with ``bulk_create`` or imported
+        by other means that skip the ``post_save`` signal. Each batch sets the initial state with a single ``UPDATE``
+        and creates all the transitions and the approvals of the batch with bulk inserts. The objects whose
+        transitions are already created are skipped. Returns the number of the objects that are initialized.
+        """
+        workflow = workflow or self.workflow
+        if not workflow:
+            return 0
+
+        initialized = 0
+        for batch in self._batches(workflow_objects, batch_size):
+            initialized += self._initialize_batch(workflow, batch)
+        LOGGER.debug("%s workflow objects are initialized for the workflow %s", initialized, workflow.pk)
+        return initialized
+
+    def refresh_inbox(self, workflow_objects, batch_size=1000):
+        """
+        Builds the approval inbox rows of the given workflow objects again out of their approvals, like when
+        ``RIVER_APPROVAL_INBOX`` is enabled for a table that already has objects. Returns the number of the objects.
+        """
+        if not self.workflow:
+            return 0
+
+        refreshed = 0
+        for batch in self._batches(workflow_objects, batch_size):
+            refresh_approval_inbox(self.workflow, self._content_type, {
+                workflow_object.pk: getattr(workflow_object, self.field_name + "_id") for workflow_object in batch
+            })
+            refreshed += len(batch)
+        invalidate_inbox_counts(self.workflow)
+        return refreshed
+
+    def _batches(self, workflow_objects, batch_size):
+        if isinstance(workflow_objects, QuerySet):
+            last_pk = None
+            queryset = workflow_objects.order_by("pk")
+            while True:
+                batch = list((queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[:batch_size])
+                if not batch:
+                    return
+                yield batch
+                last_pk = batch[-1].pk
+        else:
+            workflow_objects = list(workflow_objects)
+            for i in range(0, len(workflow_objects), batch_size):
+                yield workflow_objects[i:i + batch_size]
+
+    @transaction.atomic
+    def _initialize_batch(self, workflow, batch):
+        object_ids = [workflow_object.pk for workflow_object in batch]
+        self.wokflow_object_class.objects.filter(pk__in=object_ids, **{self.field_name + "__isnull": True}) \
+            .update(**{self.field_name: workflow.initial_state_id})
+        for workflow_object in batch:
+            if getattr(workflow_object, self.field_name + "_id") is None:
+                setattr(workflow_object, self.field_name + "_id", workflow.initial_state_id)
+
+        already_initialized = set(Transition.objects.filter(
+            workflow=workflow,
+            content_type=self._content_type,
+            object_id__in=[str(object_id) for object_id in object_ids]
+        ).values_list("object_id", flat=True).distinct())
+
+        transition_builder = TransitionBuilder(workflow, self._content_type)
+        batch = [workflow_object for workflow_object in batch if str(workflow_object.pk) not in already_initialized]
+        for workflow_object in batch:
+            transition_builder.add_initial_transitions(workflow_object.pk, getattr(workflow_object, self.field_name + "_id"))
+        transition_builder.build()
+
+        states = {workflow_object.pk: getattr(workflow_object, self.field_name + "_id") for workflow_object in batch}
+        WorkflowObjectSnapshot.objects.initialize(workflow, self._content_type, states)
+        on_approvals_changed(workflow, self._content_type, states)
+        return len(batch)
+
     @property
     def initial_state(self):
-        workflow = Workflow.objects.filter(content_type=self._content_type, field_name=self.field_name).first()
+        workflow = workflow_cache.get(self._content_type, self.field_name)
         return workflow.initial_state if workflow else None
 
     @property
     def final_states(self):
-        all_states = TransitionMeta.objects.filter(workflow=self.workflow).values_list("source_state", "destination_state")
-        source_states = set([states[0] for states in all_states])
-        destination_states = set([states[1] for states in all_states])
-        final_states = destination_states - source_states
-        return State.objects.filter(pk__in=final_states)
+        if not self.workflow:
+            return State.objects.none()
+        return State.objects.filter(pk__in=self.graph.final_state_ids)
+
+    @property
+    def graph(self):
+        return workflow_graph_cache.get(self.workflow) if self.workflow else None
 
     @property
     def _content_type(self):
@@ -0,0 +1,137 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.db import transaction, close_old_connections
+
+from river.config import app_config
+
+LOGGER = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class HookExecutor(object):
+    """
+    Runs the hooks on a bounded pool of worker threads once the transaction that they are fired in is committed,
+    so that they neither run while the row locks are held nor at all when the transaction is rolled back.
+
+    The queue is bounded by ``RIVER_HOOK_QUEUE_SIZE``. When it stays full for ``RIVER_HOOK_QUEUE_TIMEOUT`` seconds,
+    the hook is run by the committing thread itself, which slows the producers down to the pace of the workers.
+    """
+
+    def __init__(self, workers=None, queue_size=None, queue_timeout=None):
+        self._workers = workers
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._queue = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._executed_inline = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def submit(self, hook, context):
+        transaction.on_commit(lambda: self._enqueue(hook, context))
+
+    def drain(self, timeout=None):
+        """
+        Waits for the queued hooks to be executed. Returns ``False`` if they are not done within ``timeout`` seconds.
+        """
+        with self._lock:
+            work_queue = self._queue
+        if work_queue is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with work_queue.all_tasks_done:
+            while work_queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                work_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=None):
+        """
+        Stops the workers once the queued hooks are executed. Only the pool is swapped out under the lock; the workers
+        need it to record their metrics, so they are stopped and joined outside of it.
+        """
+        drained = self.drain(timeout)
+        with self._lock:
+            threads, work_queue = self._threads, self._queue
+            self._threads, self._queue = [], None
+        try:
+            for _ in threads:
+                work_queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            LOGGER.warning("Hook queue is still full, %s hook workers are left running", len(threads))
+            return False
+        for thread in threads:
+            thread.join(timeout)
+        return drained
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "executed": self._executed,
+                "executed_inline": self._executed_inline,
+                "latency_total": self._total_latency,
+                "latency_max": self._max_latency,
+                "latency_avg": self._total_latency / self._executed if self._executed else 0.0,
+            }
+
+    def _enqueue(self, hook, context):
+        work_queue = self._start()
+        try:
+            work_queue.put((hook, context), timeout=self._get_queue_timeout())
+        except queue.Full:
+            LOGGER.warning("Hook queue is full, the hook %s is executed by the committing thread", hook.pk)
+            self._execute(hook, context, inline=True)
+
+    def _start(self):
+        with self._lock:
+            if self._queue is not None:
+                return self._queue
+            self._queue = queue.Queue(maxsize=self._queue_size or app_config.HOOK_QUEUE_SIZE)
+            for i in range(self._workers or app_config.HOOK_WORKERS):
+                thread = threading.Thread(target=self._work, args=(self._queue,), name="river-hook-worker-%s" % i, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            LOGGER.debug("%s hook workers are started", len(self._threads))
+            return self._queue
+
+    def _work(self, work_queue):
+        while True:
+            item = work_queue.get()
+            try:
+                if item is _STOP:
+                    return
+                close_old_connections()
+                self._execute(*item)
+            finally:
+                close_old_connections()
+                work_queue.task_done()
+
+    def _execute(self, hook, context, inline=False):
+        started = time.monotonic()
+        hook.execute(context)
+        latency = time.monotonic() - started
+        with self._lock:
+            self._executed += 1
+            if inline:
+                self._executed_inline += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+
+    def _get_queue_timeout(self):
+        return self._queue_timeout if self._queue_timeout is not None else app_config.HOOK_QUEUE_TIMEOUT
+
+
+hook_executor = HookExecutor()
+
+atexit.register(hook_executor.drain, 10)
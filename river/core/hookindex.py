@@ -0,0 +1,119 @@
+import logging
+from collections import defaultdict
+from types import MappingProxyType
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from river.core.hookregistry import hook_registry, ON_APPROVED, ON_TRANSIT, ON_COMPLETE
+from river.core.workflowgraph import PerWorkflowCache, workflow_graph_cache
+from river.models import Function
+from river.models.on_approved_hook import OnApprovedHook
+from river.models.on_complete_hook import OnCompleteHook
+from river.models.on_transit_hook import OnTransitHook
+
+LOGGER = logging.getLogger(__name__)
+
+HOOK_META_FIELDS = {
+    OnApprovedHook: "transition_approval_meta_id",
+    OnTransitHook: "transition_meta_id",
+    OnCompleteHook: None,
+}
+
+HOOK_MODELS = {
+    ON_APPROVED: OnApprovedHook,
+    ON_TRANSIT: OnTransitHook,
+    ON_COMPLETE: OnCompleteHook,
+}
+
+
+def _meta_id(hook):
+    meta_field = HOOK_META_FIELDS[type(hook)]
+    return getattr(hook, meta_field) if meta_field else None
+
+
+class HookIndex(object):
+    """
+    In memory index of the hooks of a workflow that are for all the workflow objects by ``(hook model, hook type,
+    meta)``. The hooks that are registered in the code come after the ones in the database. The hooks that are for a
+    specific workflow object can be as many as the objects, so they are not kept; they are looked up with a single
+    query, and only when the workflow has any of the hook model.
+    """
+
+    def __init__(self, workflow_id, hooks, code_hooks=(), object_hook_models=()):
+        self.workflow_id = workflow_id
+        index = defaultdict(list)
+        for hook in hooks:
+            index[(type(hook), hook.hook_type, _meta_id(hook))].append(hook)
+        for hook_kind, meta_id, code_hook in code_hooks:
+            index[(HOOK_MODELS[hook_kind], code_hook.hook_type, meta_id)].append(code_hook)
+        self._hooks = MappingProxyType({key: tuple(hooks) for key, hooks in index.items()})
+        self._object_hook_models = frozenset(object_hook_models)
+
+    @classmethod
+    def build(cls, workflow_id):
+        hooks = []
+        object_hook_models = []
+        for hook_model in HOOK_META_FIELDS.keys():
+            hooks.extend(hook_model.objects.filter(
+                workflow_id=workflow_id, object_id__isnull=True
+            ).select_related("callback_function").order_by("pk"))
+            if hook_model.objects.filter(workflow_id=workflow_id, object_id__isnull=False).exists():
+                object_hook_models.append(hook_model)
+
+        graph = workflow_graph_cache.get(workflow_id)
+        content_type = ContentType.objects.get_for_id(graph.content_type_id)
+        code_hooks = hook_registry.resolve(graph, "%s.%s.%s" % (content_type.app_label, content_type.model, graph.field_name))
+
+        LOGGER.debug("Hook index is built for the workflow %s", workflow_id)
+        return cls(workflow_id, hooks, code_hooks, object_hook_models)
+
+    def get_hooks(self, hook_model, hook_type, meta_id, content_type_id, object_id):
+        return self.get_shared_hooks(hook_model, hook_type, meta_id) + \
+               self.get_object_hooks(hook_model, hook_type, content_type_id, [object_id]).get((meta_id, str(object_id)), ())
+
+    def get_shared_hooks(self, hook_model, hook_type, meta_id):
+        return self._hooks.get((hook_model, hook_type, meta_id), ())
+
+    def get_object_hooks(self, hook_model, hook_type, content_type_id, object_ids):
+        """
+        Finds the hooks of the given workflow objects with a single query and maps them by ``(meta_id, object_id)``.
+        """
+        if hook_model not in self._object_hook_models:
+            return {}
+        object_hooks = defaultdict(tuple)
+        for hook in hook_model.objects.filter(
+                workflow_id=self.workflow_id,
+                hook_type=hook_type,
+                content_type_id=content_type_id,
+                object_id__in=[str(object_id) for object_id in object_ids]
+        ).select_related("callback_function").order_by("pk"):
+            object_hooks[(_meta_id(hook), hook.object_id)] += (hook,)
+        return object_hooks
+
+
+hook_index_cache = PerWorkflowCache(HookIndex.build)
+
+
+def _invalidate(workflow_id=None):
+    hook_index_cache.invalidate(workflow_id)
+    transaction.on_commit(lambda: hook_index_cache.invalidate(workflow_id))
+
+
+def _on_hook_changed(sender, instance, *args, **kwargs):
+    # The hooks of the workflow objects are looked up when they are executed; only a new one can make a workflow have
+    # them for the first time.
+    if not instance.object_id or kwargs.get("created"):
+        _invalidate(instance.workflow_id)
+
+
+def _on_function_changed(sender, instance, *args, **kwargs):
+    _invalidate()
+
+
+for _hook_model in HOOK_META_FIELDS.keys():
+    post_save.connect(_on_hook_changed, sender=_hook_model)
+    post_delete.connect(_on_hook_changed, sender=_hook_model)
+post_save.connect(_on_function_changed, sender=Function)
+post_delete.connect(_on_function_changed, sender=Function)
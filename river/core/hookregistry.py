@@ -0,0 +1,150 @@
+import threading
+from collections import namedtuple
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+
+ON_APPROVED = "on-approved"
+ON_TRANSIT = "on-transit"
+ON_COMPLETE = "on-complete"
+
+AFTER = "AFTER"
+
+Registration = namedtuple("Registration", ["hook_kind", "callback", "workflow", "source", "destination", "priority", "when"])
+
+
+class CodeHook(object):
+    """
+    A hook that calls a Python callable directly instead of a ``Function`` body. It looks like a hook model object
+    to the hook index, but it is for all the workflow objects and all the transitions and approvals of its metas.
+    """
+    pk = None
+    content_type_id = None
+    object_id = None
+    transition_id = None
+    transition_approval_id = None
+
+    def __init__(self, callback, hook_type):
+        self.callback = callback
+        self.hook_type = hook_type
+
+    def execute(self, context):
+        from river.instrumentation import instrumentation
+
+        instrumentation.run_hook(self.callback, context)
+
+    def __repr__(self):
+        return "<CodeHook %s.%s %s>" % (self.callback.__module__, self.callback.__qualname__, self.hook_type)
+
+
+class HookRegistry(object):
+    """
+    Hooks that are registered in the code with the ``on_approved``, ``on_transit`` and ``on_complete`` decorators.
+    They are resolved into the hook index of a workflow whenever it is built, by matching the workflow with
+    ``"app_label.model_name.field_name"`` and the states with their slugs.
+    """
+
+    def __init__(self):
+        self._registrations = []
+        self._lock = threading.Lock()
+
+    def register(self, hook_kind, callback, workflow, source=None, destination=None, priority=None, when=AFTER):
+        registration = Registration(hook_kind, callback, self._normalize(workflow), source, destination, priority, when)
+        if apps.ready:
+            self._validate(registration)
+        with self._lock:
+            self._registrations.append(registration)
+        self._invalidate()
+        return callback
+
+    def unregister(self, callback):
+        with self._lock:
+            self._registrations = [registration for registration in self._registrations if registration.callback != callback]
+        self._invalidate()
+
+    def validate(self):
+        for registration in list(self._registrations):
+            self._validate(registration)
+
+    def resolve(self, graph, workflow_label):
+        """
+        Returns ``(hook_kind, meta_id, code_hook)`` for each of the registered hooks that matches the given workflow.
+        ``meta_id`` is the transition meta id of an ``on-transit`` hook, the transition approval meta id of an
+        ``on-approved`` hook and ``None`` for an ``on-complete`` hook.
+        """
+        resolved = []
+        for registration in self._registrations:
+            if registration.workflow != workflow_label:
+                continue
+            code_hook = CodeHook(registration.callback, registration.when)
+            if registration.hook_kind == ON_COMPLETE:
+                resolved.append((ON_COMPLETE, None, code_hook))
+                continue
+            for transition_meta in graph.transition_metas:
+                if not self._matches(registration, graph, transition_meta):
+                    continue
+                if registration.hook_kind == ON_TRANSIT:
+                    resolved.append((ON_TRANSIT, transition_meta.pk, code_hook))
+                else:
+                    for transition_approval_meta in graph.approval_metas(transition_meta.pk):
+                        if registration.priority is None or registration.priority == transition_approval_meta.priority:
+                            resolved.append((ON_APPROVED, transition_approval_meta.pk, code_hook))
+        return resolved
+
+    @staticmethod
+    def _matches(registration, graph, transition_meta):
+        return (registration.source is None or graph.get_state(transition_meta.source_state_id).slug == registration.source) and \
+               (registration.destination is None or graph.get_state(transition_meta.destination_state_id).slug == registration.destination)
+
+    @staticmethod
+    def _normalize(workflow):
+        try:
+            app_label, model_name, field_name = workflow.split(".")
+        except ValueError:
+            raise ImproperlyConfigured("Workflow of a hook is supposed to be given as 'app_label.model_name.field_name', not '%s'" % workflow)
+        return "%s.%s.%s" % (app_label.lower(), model_name.lower(), field_name)
+
+    @staticmethod
+    def _validate(registration):
+        from river.core.workflowregistry import workflow_registry
+
+        app_label, model_name, field_name = registration.workflow.split(".")
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            raise ImproperlyConfigured("Model of the workflow %s of the hook %s doesn't exist" % (registration.workflow, registration.callback))
+        if field_name not in workflow_registry.workflows.get(id(model), ()):
+            raise ImproperlyConfigured("%s is not a state field of the hook %s" % (registration.workflow, registration.callback))
+
+    @staticmethod
+    def _invalidate():
+        if apps.ready:
+            from river.core.hookindex import hook_index_cache
+            hook_index_cache.invalidate()
+
+
+hook_registry = HookRegistry()
+
+
+def on_approved(workflow, source=None, destination=None, priority=None, when=AFTER):
+    """
+    Registers the decorated callable to be called with the hook context when an approval of the given workflow is
+    approved. The approvals can be narrowed down by the slugs of the states of their transitions and by priority.
+    """
+    return lambda callback: hook_registry.register(ON_APPROVED, callback, workflow, source, destination, priority, when)
+
+
+def on_transit(workflow, source=None, destination=None, when=AFTER):
+    """
+    Registers the decorated callable to be called with the hook context when a workflow object transits in the given
+    workflow. The transitions can be narrowed down by the slugs of their states.
+    """
+    return lambda callback: hook_registry.register(ON_TRANSIT, callback, workflow, source, destination, None, when)
+
+
+def on_complete(workflow, when=AFTER):
+    """
+    Registers the decorated callable to be called with the hook context when the given workflow is complete for a
+    workflow object.
+    """
+    return lambda callback: hook_registry.register(ON_COMPLETE, callback, workflow, None, None, None, when)
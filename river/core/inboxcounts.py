@@ -0,0 +1,122 @@
+import hashlib
+import logging
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, IntegerField, Value
+
+from river.config import app_config
+from river.core.workflowcache import workflow_cache
+from river.core.workflowregistry import workflow_registry
+from river.driver.river_driver import RiverDriver
+
+LOGGER = logging.getLogger(__name__)
+
+VERSION_KEY = "river:inbox_counts:version:%s"
+COUNTS_KEY = "river:inbox_counts:%s:%s"
+
+
+class InboxCounter(object):
+    """
+    Counts the workflow objects that are waiting for a user in every workflow of the ``workflow_registry`` with a
+    single query, which is a union of one grouped count per workflow.
+
+    When a cache of Django's cache framework is configured with ``RIVER_INBOX_COUNTS_CACHE``, the counts of a user are
+    kept there for ``RIVER_INBOX_COUNTS_TIMEOUT`` seconds. A version key is kept per workflow and the cache key of the
+    counts is made out of the versions of all the workflows, so bumping the version of a workflow on an approval write
+    makes all the processes count again on their next access.
+    """
+
+    def __init__(self, cache_alias=None):
+        self._cache_alias = cache_alias
+
+    def counts(self, as_user):
+        workflows = self._get_registered_workflows()
+        shared_cache = self._shared_cache
+        if shared_cache is None or not workflows:
+            return self._as_fields(workflows, self._count(as_user, workflows))
+
+        version_keys = [VERSION_KEY % workflow_id for workflow_id in sorted(workflows)]
+        versions = shared_cache.get_many(version_keys)
+        digest = hashlib.md5(",".join(
+            "%s=%s" % (version_key, versions.get(version_key, 0)) for version_key in version_keys
+        ).encode("utf-8")).hexdigest()
+        counts_key = COUNTS_KEY % (as_user.pk, digest)
+
+        counts = shared_cache.get(counts_key)
+        if counts is None:
+            counts = self._count(as_user, workflows)
+            shared_cache.set(counts_key, counts, timeout=app_config.INBOX_COUNTS_TIMEOUT)
+        return self._as_fields(workflows, counts)
+
+    def invalidate(self, workflow):
+        shared_cache = self._shared_cache
+        if shared_cache is None:
+            return
+        # It is bumped once more after the commit, so that the counts that are taken before it are not kept.
+        self._bump(shared_cache, workflow)
+        transaction.on_commit(lambda: self._bump(shared_cache, workflow))
+
+    @staticmethod
+    def _bump(shared_cache, workflow):
+        try:
+            shared_cache.incr(VERSION_KEY % workflow.pk)
+        except ValueError:
+            shared_cache.add(VERSION_KEY % workflow.pk, 1, timeout=None)
+        LOGGER.debug("Inbox counts of the workflow %s are invalidated", workflow.pk)
+
+    def _count(self, as_user, workflows):
+        group_ids = RiverDriver._get_group_ids(as_user)
+        permission_ids = RiverDriver._get_permission_ids(as_user)
+
+        queries = [
+            getattr(model.river, field_name)._waiting_objects(as_user, group_ids, permission_ids).order_by()
+            .annotate(river_workflow_id=Value(workflow_id, output_field=IntegerField()))
+            .values("river_workflow_id").annotate(river_count=Count("pk")).values_list("river_workflow_id", "river_count")
+            for workflow_id, (model, field_name) in workflows.items()
+        ]
+        if not queries:
+            return {}
+        union = queries[0].union(*queries[1:], all=True) if len(queries) > 1 else queries[0]
+        return dict(union)
+
+    @staticmethod
+    def _as_fields(workflows, counts):
+        return {workflows[workflow_id]: counts.get(workflow_id, 0) for workflow_id in workflows}
+
+    @staticmethod
+    def _get_registered_workflows():
+        workflows = {}
+        for class_id, field_names in workflow_registry.workflows.items():
+            model = workflow_registry.class_index[class_id]
+            if model._meta.apps is not apps:
+                # The historical models of the migrations are registered as well.
+                continue
+            content_type = ContentType.objects.get_for_model(model)
+            for field_name in field_names:
+                workflow = workflow_cache.get(content_type, field_name)
+                if workflow:
+                    workflows[workflow.pk] = (model, field_name)
+        return workflows
+
+    @property
+    def _shared_cache(self):
+        cache_alias = self._cache_alias or app_config.INBOX_COUNTS_CACHE
+        return caches[cache_alias] if cache_alias else None
+
+
+inbox_counter = InboxCounter()
+
+
+def inbox_counts(as_user):
+    """
+    Returns the number of the workflow objects that are waiting for the given user's approval by the model and the
+    field name of every workflow.
+    """
+    return inbox_counter.counts(as_user)
+
+
+def invalidate_inbox_counts(workflow):
+    inbox_counter.invalidate(workflow)
@@ -1,14 +1,17 @@
 import logging
-from functools import reduce
+from collections import defaultdict
 
-from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
-from django.db.models import Q, Max
+from django.db import transaction, connections, router
+from django.db.models import Q, Exists
 from django.utils import timezone
 
 from river.config import app_config
+from river.core.approvalinbox import on_approvals_changed
+from river.core.transitionbuilder import TransitionBuilder
+from river.core.workflowgraph import workflow_graph_cache
+from river.instrumentation import instrumented
 from river.models import (
-    TransitionApproval, PENDING, State, APPROVED, Workflow, CANCELLED, Transition, DONE, JUMPED
+    TransitionApproval, PENDING, State, APPROVED, Workflow, CANCELLED, Transition, DONE, WorkflowObjectSnapshot
 )
 from river.signals import ApproveSignal, TransitionSignal, OnCompleteSignal
 from river.utils.error_code import ErrorCode
@@ -17,67 +20,92 @@ from django.core.exceptions import ValidationError
 
 LOGGER = logging.getLogger(__name__)
 
+INSTANCE_WORKFLOW_OBJECTS = "_river_instance_workflow_objects"
+
+
+def impossible_future_q(graph, transition, transitions):
+    """
+    The condition of the pending transitions that can't be taken anymore once the given transition is taken.
+    They are the ones that go out of a state which is not reachable from the destination state on the workflow
+    graph, or all of them when the object cycles back to a state that it already left in ``transitions``,
+    since the path after that state is created again.
+    """
+    return ~Q(source_state_id__in=graph.reachable_state_ids(transition.destination_state_id)) | Q(Exists(
+        transitions.filter(source_state_id=transition.destination_state_id, status=DONE)
+    ))
+
+
+def materialize_next_transitions(workflow, content_type, transitions):
+    """
+    Creates the transitions that go out of the states that the workflow objects of a lazy workflow have just entered.
+    ``transitions`` maps the ids of the objects to the transitions that they entered the states through. What is
+    left pending out of the states that they left is cancelled, since it is created again when they come back.
+    """
+    left_behind = Transition.objects.filter(
+        workflow=workflow, content_type=content_type, object_id__in=[str(object_id) for object_id in transitions.keys()], status=PENDING
+    )
+    TransitionApproval.objects.filter(transition__in=left_behind).update(status=CANCELLED)
+    left_behind.update(status=CANCELLED)
+
+    transition_builder = TransitionBuilder(workflow, content_type)
+    for object_id, transition in transitions.items():
+        transition_builder.add_next_transitions(object_id, transition.destination_state_id, transition.iteration + 1)
+    transition_builder.build()
+
 
 class InstanceWorkflowObject:
     def __init__(self, workflow_object, field_name):
         self.workflow_object = workflow_object
         self.field_name = field_name
-        self.class_workflow = getattr(workflow_object.__class__.river, field_name)
         self.content_type = app_config.CONTENT_TYPE_CLASS.objects.get_for_model(workflow_object)
         self.workflow = workflow_object.workflow_obj
         self.initialized = False
+        self._cached_class_workflow = None
+        self._cached_snapshot = None
+
+    @property
+    def class_workflow(self):
+        if self._cached_class_workflow is None:
+            self._cached_class_workflow = getattr(self.workflow_object.__class__.river, self.field_name)
+        return self._cached_class_workflow
+
+    def refresh(self):
+        """
+        Resolves the workflow of the object again and forgets the cached state, so that the changes that are made
+        outside of this workflow object are seen.
+        """
+        self.workflow = self.workflow_object.workflow_obj
+        self.initialized = False
+        self._cached_class_workflow = None
+        self._cached_snapshot = None
+        self.workflow_object._state.fields_cache.pop(self.field_name, None)
 
+    @instrumented("initialize_approvals")
     @transaction.atomic
     def initialize_approvals(self):
         if self.initialized or not self.workflow:
             return
-        if self.workflow.transition_approvals.filter(
+        if self.workflow.transitions.filter(
           object_id=self.workflow_object.pk,
           content_type=self.content_type
         ).exists():
             return
         self._create_transition_approvals()
+        states = {self.workflow_object.pk: self.get_state_id() or self.workflow.initial_state_id}
+        WorkflowObjectSnapshot.objects.initialize(self.workflow, self.content_type, states)
+        on_approvals_changed(self.workflow, self.content_type, states)
+        self._cached_snapshot = None
         self.initialized = True
         LOGGER.debug("Transition approvals are initialized for the workflow object %s", self.workflow_object)
 
-    def _create_transition_approvals(self):
-        transition_meta_list = self.workflow.transition_metas.filter(source_state=self.workflow.initial_state)
-        iteration = 0
-        processed_transitions = set()
-
-        while transition_meta_list:
-            for transition_meta in transition_meta_list:
-                self._create_transition_with_approvals(transition_meta, iteration)
-                processed_transitions.add(transition_meta.pk)
-
-            transition_meta_list = self.workflow.transition_metas.filter(
-                source_state__in=transition_meta_list.values_list("destination_state", flat=True)
-            ).exclude(pk__in=processed_transitions)
-            iteration += 1
-
-    def _create_transition_with_approvals(self, transition_meta, iteration):
-      transition_data = {
-        "workflow" : self.workflow,
-        "workflow_object" : self.workflow_object,
-        "source_state" : transition_meta.source_state,
-        "destination_state" : transition_meta.destination_state,
-        "meta" : transition_meta,
-        "iteration" : iteration
-      }
-      transition = self.get_or_create(Transition, **transition_data)
-
-      for transition_approval_meta in transition_meta.transition_approval_meta.all():
-        transition_approval, created = TransitionApproval.objects.get_or_create(
-          workflow=self.workflow,
-          object_id=self.workflow_object.pk,
-          content_type=self.content_type,
-          transition=transition,
-          priority=transition_approval_meta.priority,
-          meta=transition_approval_meta
-        )
+    @property
+    def graph(self):
+        return workflow_graph_cache.get(self.workflow)
 
-        if created:
-          transition_approval.groups.add(*transition_approval_meta.groups.all())
+    def _create_transition_approvals(self):
+        transition_builder = TransitionBuilder(self.workflow, self.content_type)
+        transition_builder.add_initial_transitions(self.workflow_object.pk, self.get_state_id())
+        transition_builder.build()
 
     @property
     def on_initial_state(self):
@@ -85,58 +113,105 @@ class InstanceWorkflowObject:
 
     @property
     def on_final_state(self):
-        return self.class_workflow.final_states.filter(pk=self.get_state().pk).exists()
+        state_id = self.get_state_id()
+        return bool(self.workflow and state_id) and self.graph.is_final(state_id)
 
     @property
     def next_approvals(self):
         transitions = Transition.objects.filter(
             workflow=self.workflow,
+            content_type=self.content_type,
             object_id=self.workflow_object.pk,
-            source_state=self.get_state()
+            source_state=self.get_state_id()
         )
         return TransitionApproval.objects.filter(transition__in=transitions)
 
     @property
     def recent_approval(self):
-      approvals = getattr(self.workflow_object, self.field_name + "_transition_approvals").filter(
-        transaction_date__isnull=False)
-      if approvals.exists():
-        return approvals.latest('transaction_date')
-      return None
+        snapshot = self.snapshot
+        return snapshot.last_approval if snapshot else self._find_recent_approval()
 
+    def _find_recent_approval(self):
+        return getattr(self.workflow_object, self.field_name + "_transition_approvals").filter(
+            transaction_date__isnull=False
+        ).order_by("-transaction_date").first()
+
+    @property
+    def snapshot(self):
+        if self._cached_snapshot is None and self.workflow and self.workflow_object.pk is not None:
+            self._cached_snapshot = WorkflowObjectSnapshot.objects.select_related("last_approval").filter(
+                content_type=self.content_type,
+                object_id=self.workflow_object.pk,
+                workflow=self.workflow
+            ).first() or self._take_snapshot()
+        return self._cached_snapshot
+
+    def _take_snapshot(self):
+        recent_approval = self._find_recent_approval()
+        snapshot, _ = WorkflowObjectSnapshot.objects.get_or_create(
+            content_type=self.content_type,
+            object_id=self.workflow_object.pk,
+            workflow=self.workflow,
+            defaults={
+                "state_id": self.get_state_id(),
+                "iteration": recent_approval.transition.iteration if recent_approval else 0,
+                "last_approval": recent_approval,
+                "completed": self.on_final_state,
+                "last_transition_date": recent_approval.transaction_date if recent_approval else None,
+            }
+        )
+        return snapshot
+
+    def _lock_snapshot(self):
+        """
+        Reads the snapshot again with its row locked until the end of the transaction, so the concurrent approvals of
+        the same object neither read a stale last approval nor overwrite each other's snapshot updates.
+        """
+        if self.workflow and self.workflow_object.pk is not None:
+            # The last approval is joined with an outer join, which can't be locked; only the snapshot row is.
+            features = connections[router.db_for_write(WorkflowObjectSnapshot)].features
+            self._cached_snapshot = WorkflowObjectSnapshot.objects.select_related("last_approval").select_for_update(
+                of=("self",) if features.has_select_for_update_of else ()
+            ).filter(
+                content_type=self.content_type,
+                object_id=self.workflow_object.pk,
+                workflow=self.workflow
+            ).first()
+        return self.snapshot
+
+    def _update_snapshot(self, transition, has_transit, approval=None):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return
+        snapshot.state_id = self.get_state_id()
+        snapshot.iteration = transition.iteration
+        snapshot.completed = self.on_final_state
+        update_fields = ["state", "iteration", "completed", "date_updated"]
+        if approval:
+            snapshot.last_approval = approval
+            update_fields.append("last_approval")
+        if has_transit:
+            snapshot.last_transition_date = timezone.now()
+            update_fields.append("last_transition_date")
+        snapshot.save(update_fields=update_fields)
+
+    @instrumented("jump_to")
     @transaction.atomic
     def jump_to(self, state):
-        try:
-            recent_iteration = self.recent_approval.transition.iteration if self.recent_approval else 0
-            jumped_transition = self._get_jumped_transition(recent_iteration, state)
-            self._set_jumped_transitions_to_jumped(jumped_transition)
-            self.set_state(state)
-            self.workflow_object.save()
-        except Transition.DoesNotExist:
+        from river.core.batchjump import BatchJump
+
+        if not self.workflow:
             raise RiverException(
                 ErrorCode.STATE_IS_NOT_AVAILABLE_TO_BE_JUMPED,
                 "This state is not available to be jumped in the future of this object"
             )
+        result = BatchJump(self.workflow, self.content_type, self.field_name).jump([self.workflow_object], state)[0]
+        if result.error:
+            raise result.error
+        self._cached_snapshot = None
+        self.workflow_object.save(update_fields=[self.field_name])
 
-    def _get_jumped_transition(self, recent_iteration, state):
-        return getattr(self.workflow_object, self.field_name + "_transitions").filter(
-            iteration__gte=recent_iteration, destination_state=state, status=PENDING
-        ).earliest("iteration")
-
-    def _set_jumped_transitions_to_jumped(self, jumped_transition):
-        jumped_transitions = self._get_transitions_before(jumped_transition.iteration).filter(status=PENDING)
-        TransitionApproval.objects.filter(pk__in=jumped_transitions.values_list("transition_approvals__pk", flat=True)) \
-            .update(status=JUMPED)
-        jumped_transitions.update(status=JUMPED)
-
-    def _get_transitions_before(self, iteration):
-        return Transition.objects.filter(
-            workflow=self.workflow,
-            workflow_object=self.workflow_object,
-            iteration__lte=iteration
-        )
-
-
+    @instrumented("approve")
     @transaction.atomic
     def approve(self, as_user, groups, next_state=None):
         available_approvals = self.workflow_object.get_available_approvals(groups)
@@ -156,13 +231,15 @@ class InstanceWorkflowObject:
         self._process_approval(available_approvals.first(), as_user, next_state)
 
     def _process_approval(self, approval, as_user, next_state):
+        self._lock_snapshot()
+        transition_meta = self.graph.get_transition_meta(approval.transition_meta_id)
         transition_data = {
             "content_type" : self._content_type,
             "object_id" : self.workflow_object.pk,
-            "meta" : approval.transition_meta,
+            "meta" : transition_meta,
             "workflow" : self.workflow,
-            "source_state" : approval.transition_meta.source_state,
-            "destination_state" : approval.transition_meta.destination_state
+            "source_state" : transition_meta.source_state,
+            "destination_state" : transition_meta.destination_state
         }
         transition = self.get_or_create(Transition, **transition_data)
 
@@ -171,14 +248,16 @@ class InstanceWorkflowObject:
             "content_type" : self._content_type,
             "object_id" : self.workflow_object.pk,
             "meta" : approval,
-            "status" : PENDING,
             "transition" : transition
         }
         approval = self.get_or_create(TransitionApproval, **approval_data)
+        if approval.status != PENDING:
+            # It is approved by another transaction before the snapshot is locked.
+            raise ValidationError("There is no available approval for the user.")
         approval.status = APPROVED
         approval.transactioner = as_user
         approval.transaction_date = timezone.now()
-        approval.previous = self.recent_approval if self.recent_approval else None
+        approval.previous = self.recent_approval
         approval.save()
 
         if next_state:
@@ -191,12 +270,16 @@ class InstanceWorkflowObject:
             previous_state = self.get_state()
             self.set_state(approval.transition.destination_state)
             has_transit = True
-            if self._check_if_it_cycled(approval.transition):
+            if self.graph.lazy:
+                materialize_next_transitions(self.workflow, self.content_type, {self.workflow_object.pk: approval.transition})
+            elif self._check_if_it_cycled(approval.transition):
                 self._re_create_cycled_path(approval.transition)
             LOGGER.debug(
                 "Workflow object %s is proceeded for next transition. Transition: %s -> %s",
                 self.workflow_object, previous_state, self.get_state()
             )
+        self._update_snapshot(approval.transition, has_transit, approval)
+        on_approvals_changed(self.workflow, self.content_type, {self.workflow_object.pk: self.get_state_id()})
 
         with self._approve_signal(approval), self._transition_signal(has_transit, approval), self._on_complete_signal():
             self.workflow_object.save()
@@ -204,35 +287,15 @@ class InstanceWorkflowObject:
     @transaction.atomic
     def cancel_impossible_future(self, approved_approval):
         transition = approved_approval.transition
-        possible_transition_ids = self._get_possible_transition_ids(transition)
+        transitions = Transition.objects.filter(workflow=self.workflow, content_type=self.content_type, object_id=self.workflow_object.pk)
 
-        cancelled_transitions = Transition.objects.filter(
-            workflow=self.workflow,
-            object_id=self.workflow_object.pk,
-            status=PENDING,
-            iteration__gte=transition.iteration
-        ).exclude(pk__in=possible_transition_ids)
+        cancelled_transitions = transitions.filter(status=PENDING, iteration__gte=transition.iteration).exclude(pk=transition.pk).filter(
+            impossible_future_q(self.graph, transition, transitions)
+        )
 
         TransitionApproval.objects.filter(transition__in=cancelled_transitions).update(status=CANCELLED)
         cancelled_transitions.update(status=CANCELLED)
 
-    def _get_possible_transition_ids(self, transition):
-        possible_transition_ids = {transition.pk}
-        possible_next_states = {transition.destination_state.label}
-
-        while possible_next_states:
-            possible_transitions = Transition.objects.filter(
-                workflow=self.workflow,
-                object_id=self.workflow_object.pk,
-                status=PENDING,
-                source_state__label__in=possible_next_states
-            ).exclude(pk__in=possible_transition_ids)
-
-            possible_transition_ids.update(possible_transitions.values_list("pk", flat=True))
-            possible_next_states = set(possible_transitions.values_list("destination_state__label", flat=True))
-
-        return possible_transition_ids
-
     def _approve_signal(self, approval):
         return ApproveSignal(self.workflow_object, self.field_name, approval)
 
@@ -244,7 +307,7 @@ class InstanceWorkflowObject:
 
     @property
     def _content_type(self):
-        return ContentType.objects.get_for_model(self.workflow_object)
+        return self.content_type
 
     def _to_key(self, source_state):
         return f"{self.content_type.pk}{self.field_name}{source_state.label}"
@@ -257,73 +320,74 @@ class InstanceWorkflowObject:
         )
         return transitions.filter(status=DONE).exists() and not transitions.filter(status=PENDING).exists()
 
-    def _get_transition_images(self, source_states):
-        meta_max_iteration = Transition.objects.filter(
-            workflow=self.workflow,
-            workflow_object=self.workflow_object,
-            source_state__pk__in=source_states,
-        ).values_list("meta").annotate(max_iteration=Max("iteration"))
-
-        return Transition.objects.filter(
-            Q(workflow=self.workflow, object_id=self.workflow_object.pk) &
-            reduce(lambda agg, q: q | agg,
-                   [Q(meta__id=meta_id, iteration=max_iteration) for meta_id, max_iteration in meta_max_iteration],
-                   Q(pk=-1))
-        )
-
+    @instrumented("re_create_cycled_path")
     def _re_create_cycled_path(self, done_transition):
-        old_transitions = self._get_transition_images([done_transition.destination_state.pk])
-        iteration = done_transition.iteration + 1
-        regenerated_transitions = set()
-
-        while old_transitions.exists():
-            for old_transition in old_transitions:
-                cycled_transition = self._create_cycled_transition(old_transition, iteration)
-                self._create_cycled_approvals(old_transition, cycled_transition)
-
-            regenerated_transitions.add((old_transition.source_state, old_transition.destination_state))
-            old_transitions = self._get_transition_images(
-                old_transitions.values_list("destination_state__pk", flat=True)
-            ).exclude(
-                reduce(lambda agg, q: q | agg, [
-                    Q(source_state=source_state, destination_state=destination_state)
-                    for source_state, destination_state in regenerated_transitions
-                ], Q(pk=-1))
-            )
-            iteration += 1
-
-    def _create_cycled_transition(self, old_transition, iteration):
-        transition_data = {
-            "source_state" : old_transition.source_state,
-            "destination_state" : old_transition.destination_state,
-            "workflow" : old_transition.workflow,
-            "object_id" : old_transition.workflow_object.pk,
-            "content_type" : old_transition.content_type,
-            "status" : PENDING,
-            "iteration" : iteration,
-            "meta" : old_transition.meta
-        }
-        transition = self.get_or_create(Transition, **transition_data)
-        
-        return transition
-
-    def _create_cycled_approvals(self, old_transition, cycled_transition):
-        for old_approval in old_transition.transition_approvals.all():
-            cycled_approval = TransitionApproval.objects.create(
-                transition=cycled_transition,
-                workflow=old_approval.workflow,
-                object_id=old_approval.workflow_object.pk,
-                content_type=old_approval.content_type,
-                priority=old_approval.priority,
-                status=PENDING,
-                meta=old_approval.meta
-            )
-            cycled_approval.permissions.set(old_approval.permissions.all())
-            cycled_approval.groups.set(old_approval.groups.all())
+        """
+        Re-creates the transitions that can be taken again once the workflow object cycles back to the destination
+        state of the given transition. The path is walked on the workflow graph level by level, each level being
+        the next iteration, and the approvals are copied from the latest images of the transitions, so that the
+        whole path is written with a fixed number of queries no matter how long it is.
+        """
+        levels = []
+        visited = set()
+        state_ids = {done_transition.destination_state_id}
+        while state_ids:
+            level = [
+                transition_meta for state_id in state_ids for transition_meta in self.graph.outgoing(state_id)
+                if transition_meta.pk not in visited
+            ]
+            visited.update(transition_meta.pk for transition_meta in level)
+            if level:
+                levels.append(level)
+            state_ids = set(transition_meta.destination_state_id for transition_meta in level)
+
+        approval_sources = self._get_cycled_approval_sources(visited)
+        transition_builder = TransitionBuilder(self.workflow, self.content_type)
+        for iteration, level in enumerate(levels, start=done_transition.iteration + 1):
+            for transition_meta in level:
+                transition_builder.add_transition(
+                    self.workflow_object.pk, transition_meta, iteration, approval_sources.get(transition_meta.pk)
+                )
+        transition_builder.build()
+
+    def _get_cycled_approval_sources(self, transition_meta_ids):
+        images = {}
+        for pk, meta_id, iteration in Transition.objects.filter(
+                workflow=self.workflow,
+                content_type=self.content_type,
+                object_id=self.workflow_object.pk,
+                meta_id__in=transition_meta_ids
+        ).values_list("pk", "meta_id", "iteration"):
+            if meta_id not in images or images[meta_id][1] < iteration:
+                images[meta_id] = (pk, iteration)
+        image_metas = {pk: meta_id for meta_id, (pk, _) in images.items()}
+
+        approvals = list(TransitionApproval.objects.filter(
+            transition_id__in=image_metas.keys()
+        ).values_list("pk", "transition_id", "meta_id", "priority"))
+        approval_ids = [pk for pk, _, _, _ in approvals]
+        groups = defaultdict(list)
+        for approval_id, group_id in TransitionApproval.groups.through.objects.filter(
+                transitionapproval_id__in=approval_ids
+        ).values_list("transitionapproval_id", "group_id"):
+            groups[approval_id].append(group_id)
+        permissions = defaultdict(list)
+        for approval_id, permission_id in TransitionApproval.permissions.through.objects.filter(
+                transitionapproval_id__in=approval_ids
+        ).values_list("transitionapproval_id", "permission_id"):
+            permissions[approval_id].append(permission_id)
+
+        approval_sources = defaultdict(list)
+        for pk, transition_id, meta_id, priority in approvals:
+            approval_sources[image_metas[transition_id]].append((meta_id, priority, groups[pk], permissions[pk]))
+        return approval_sources
 
     def get_state(self):
         return getattr(self.workflow_object, self.field_name)
 
+    def get_state_id(self):
+        return getattr(self.workflow_object, self.field_name + "_id")
+
     def set_state(self, state):
         setattr(self.workflow_object, self.field_name, state)
 
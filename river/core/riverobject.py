@@ -1,7 +1,8 @@
 import inspect
+from functools import wraps
 
 from river.core.classworkflowobject import ClassWorkflowObject
-from river.core.instanceworkflowobject import InstanceWorkflowObject
+from river.core.instanceworkflowobject import InstanceWorkflowObject, INSTANCE_WORKFLOW_OBJECTS
 from river.core.workflowregistry import workflow_registry
 
 
@@ -18,11 +19,47 @@ class RiverObject(object):
             raise Exception("Workflow with name:%s doesn't exist for class:%s" % (field_name, cls.__name__))
         if self.is_class:
             return ClassWorkflowObject(self.owner, field_name)
-        else:
-            return InstanceWorkflowObject(self.owner, field_name)
+
+        instance_workflow_objects = self.owner.__dict__.setdefault(INSTANCE_WORKFLOW_OBJECTS, {})
+        if field_name not in instance_workflow_objects:
+            instance_workflow_objects[field_name] = InstanceWorkflowObject(self.owner, field_name)
+        return instance_workflow_objects[field_name]
+
+    def refresh(self):
+        """
+        Drops the workflow objects that are memoized on the model instance, so that the next access resolves
+        the workflow, the content type and the state again.
+        """
+        if not self.is_class:
+            for instance_workflow_object in self.owner.__dict__.pop(INSTANCE_WORKFLOW_OBJECTS, {}).values():
+                instance_workflow_object.refresh()
 
     def all(self, cls):
         return list([getattr(self, field_name) for field_name in workflow_registry.workflows[id(cls)]])
 
     def all_field_names(self, cls):  # pylint: disable=no-self-use
         return [field_name for field_name in workflow_registry.workflows[id(cls)]]
+
+
+def forget_workflow_objects(cls):
+    """
+    Makes the instances of the given model drop the workflow objects that are memoized on them when they are copied,
+    pickled or refreshed from the database, so that a memoized workflow object is neither shared with another instance
+    nor left with a stale state.
+    """
+    getstate = cls.__getstate__
+    refresh_from_db = cls.refresh_from_db
+
+    @wraps(getstate)
+    def __getstate__(self):
+        state = getstate(self)
+        state.pop(INSTANCE_WORKFLOW_OBJECTS, None)
+        return state
+
+    @wraps(refresh_from_db)
+    def _refresh_from_db(self, *args, **kwargs):
+        refresh_from_db(self, *args, **kwargs)
+        RiverObject(self).refresh()
+
+    cls.__getstate__ = __getstate__
+    cls.refresh_from_db = _refresh_from_db
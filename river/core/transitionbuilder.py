@@ -0,0 +1,146 @@
+import logging
+
+from django.db import connections, router
+
+from river.core.workflowgraph import workflow_graph_cache
+from river.models import Transition, TransitionApproval, PENDING
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TransitionBuilder(object):
+    """
+    Collects the transitions and the transition approvals of one or many workflow objects in memory and writes
+    them with a fixed number of bulk statements, no matter how big the workflow is or how many objects there are.
+    Rows that already exist are left as they are, so building the same transitions twice is harmless.
+    """
+
+    def __init__(self, workflow, content_type):
+        self.workflow = workflow
+        self.content_type = content_type
+        self.graph = workflow_graph_cache.get(workflow)
+        self._transitions = {}
+        self._approval_sources = {}
+
+    def add_initial_transitions(self, object_id, state_id=None):
+        """
+        Adds all the transitions of the workflow level by level, or only the ones that go out of the state of the
+        object when the workflow is lazy.
+        """
+        if self.graph.lazy:
+            self.add_next_transitions(object_id, state_id or self.graph.initial_state_id, 0)
+            return
+        for iteration, transition_metas in enumerate(self.graph.levels):
+            for transition_meta in transition_metas:
+                self.add_transition(object_id, transition_meta, iteration)
+
+    def add_next_transitions(self, object_id, state_id, iteration):
+        for transition_meta in self.graph.outgoing(state_id):
+            self.add_transition(object_id, transition_meta, iteration)
+
+    def add_transition(self, object_id, transition_meta, iteration, approval_sources=None):
+        """
+        ``approval_sources`` is a list of ``(meta_id, priority, group_ids, permission_ids)`` to create the approvals
+        from. When it is not given, the approvals are created out of the approval metas in the workflow graph.
+        """
+        key = (str(object_id), transition_meta.pk, iteration)
+        self._transitions[key] = Transition(
+            workflow=self.workflow,
+            content_type=self.content_type,
+            object_id=str(object_id),
+            meta=transition_meta,
+            source_state_id=transition_meta.source_state_id,
+            destination_state_id=transition_meta.destination_state_id,
+            iteration=iteration,
+            status=PENDING,
+        )
+        if approval_sources is not None:
+            self._approval_sources[key] = approval_sources
+
+    def build(self):
+        if not self._transitions:
+            return []
+
+        transitions = self._write(Transition, self._transitions, self._fetch_transitions)
+        approvals, groups, permissions = self._collect_approvals(transitions)
+        if approvals:
+            transition_ids = set(transition.pk for transition in transitions.values())
+            approval_ids = self._write(TransitionApproval, approvals, lambda: self._fetch_approval_ids(transition_ids))
+            self._write_m2m(TransitionApproval.groups.through, "group_id", approval_ids, groups)
+            self._write_m2m(TransitionApproval.permissions.through, "permission_id", approval_ids, permissions)
+
+        LOGGER.debug(
+            "%s transitions and %s transition approvals are built for the workflow %s", len(transitions), len(approvals), self.workflow.pk
+        )
+        return [transitions[key] for key in self._transitions.keys()]
+
+    def _fetch_transitions(self):
+        transitions = Transition.objects.filter(
+            workflow=self.workflow,
+            content_type=self.content_type,
+            object_id__in=set(object_id for object_id, _, _ in self._transitions.keys()),
+            meta_id__in=set(meta_id for _, meta_id, _ in self._transitions.keys()),
+            iteration__in=set(iteration for _, _, iteration in self._transitions.keys()),
+        )
+        return {(transition.object_id, transition.meta_id, transition.iteration): transition for transition in transitions}
+
+    def _collect_approvals(self, transitions):
+        approvals = {}
+        groups = {}
+        permissions = {}
+        for key, transition in transitions.items():
+            if key not in self._transitions:
+                continue
+            approval_sources = self._approval_sources.get(key)
+            if approval_sources is None:
+                approval_sources = [
+                    (transition_approval_meta.pk, transition_approval_meta.priority, self.graph.groups(transition_approval_meta.pk), ())
+                    for transition_approval_meta in self.graph.approval_metas(transition.meta_id)
+                ]
+
+            for meta_id, priority, group_ids, permission_ids in approval_sources:
+                approval_key = (transition.pk, meta_id)
+                approvals[approval_key] = TransitionApproval(
+                    workflow=self.workflow,
+                    content_type=self.content_type,
+                    object_id=transition.object_id,
+                    transition=transition,
+                    meta_id=meta_id,
+                    priority=priority,
+                    status=PENDING,
+                )
+                groups[approval_key] = group_ids
+                permissions[approval_key] = permission_ids
+        return approvals, groups, permissions
+
+    @staticmethod
+    def _fetch_approval_ids(transition_ids):
+        return {
+            (transition_id, meta_id): pk
+            for pk, transition_id, meta_id in TransitionApproval.objects.filter(
+                transition_id__in=transition_ids
+            ).values_list("pk", "transition_id", "meta_id")
+        }
+
+    def _write_m2m(self, through, field, approval_ids, related_ids):
+        rows = {
+            (approval_ids[approval_key], related_id): through(**{"transitionapproval_id": approval_ids[approval_key], field: related_id})
+            for approval_key, ids in related_ids.items()
+            for related_id in ids
+        }
+        if rows:
+            self._write(through, rows, lambda: set(through.objects.filter(
+                transitionapproval_id__in=set(approval_id for approval_id, _ in rows.keys())
+            ).values_list("transitionapproval_id", field)), refetch=False)
+
+    def _write(self, model, objects, fetch, refetch=True):
+        if self._supports_ignore_conflicts:
+            model.objects.bulk_create(objects.values(), ignore_conflicts=True)
+        else:
+            existing = fetch()
+            model.objects.bulk_create([obj for key, obj in objects.items() if key not in existing])
+        return fetch() if refetch else None
+
+    @property
+    def _supports_ignore_conflicts(self):
+        return connections[router.db_for_write(Transition)].features.supports_ignore_conflicts
@@ -0,0 +1,103 @@
+import logging
+import threading
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from river.config import app_config
+from river.models import State, Workflow
+
+LOGGER = logging.getLogger(__name__)
+
+VERSION_KEY = "river:workflow_cache:version"
+
+
+class SharedVersion(object):
+    """
+    Version of the workflow definitions that is kept in the cache of Django's cache framework that is configured
+    with ``RIVER_WORKFLOW_CACHE``, so that the processes can tell when another one changes them. It is a no-op
+    when no cache is configured.
+    """
+
+    def __init__(self, cache_alias=None):
+        self._cache_alias = cache_alias
+        self._version = None
+
+    def is_changed(self):
+        shared_cache = self._shared_cache
+        if shared_cache is None:
+            return False
+        version = shared_cache.get(VERSION_KEY, 0)
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+    def bump(self):
+        shared_cache = self._shared_cache
+        if shared_cache is not None:
+            try:
+                self._version = shared_cache.incr(VERSION_KEY)
+            except ValueError:
+                shared_cache.add(VERSION_KEY, 1, timeout=None)
+                self._version = shared_cache.get(VERSION_KEY)
+
+    @property
+    def _shared_cache(self):
+        cache_alias = self._cache_alias or app_config.WORKFLOW_CACHE
+        return caches[cache_alias] if cache_alias else None
+
+
+class WorkflowCache(object):
+    """
+    Process wide cache of the workflows, along with their initial states, by the content type and the field name
+    they are defined for. The cached workflows are shared, so they are supposed to be treated as read only.
+
+    Every process invalidates its own cache on model signals. When a cache of Django's cache framework is
+    configured with ``RIVER_WORKFLOW_CACHE``, a version key is kept there as well; bumping it on a change makes
+    all the other processes drop their caches on their next access.
+    """
+
+    def __init__(self, cache_alias=None):
+        self._shared_version = SharedVersion(cache_alias)
+        self._workflows = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, content_type, field_name):
+        if self._shared_version.is_changed():
+            self._clear()
+            LOGGER.debug("Workflow cache is synchronized to the shared version")
+        key = (content_type.pk, field_name)
+        try:
+            return self._workflows[key]
+        except KeyError:
+            generation = self._generation
+            workflow = Workflow.objects.select_related("initial_state").filter(content_type=content_type, field_name=field_name).first()
+            with self._lock:
+                if generation == self._generation:
+                    self._workflows[key] = workflow
+            return workflow
+
+    def invalidate(self):
+        self._clear()
+        self._shared_version.bump()
+
+    def _clear(self):
+        with self._lock:
+            self._generation += 1
+            self._workflows.clear()
+
+
+workflow_cache = WorkflowCache()
+
+
+def _invalidate(*args, **kwargs):
+    workflow_cache.invalidate()
+    transaction.on_commit(workflow_cache.invalidate)
+
+
+post_save.connect(_invalidate, sender=Workflow)
+post_delete.connect(_invalidate, sender=Workflow)
+post_save.connect(_invalidate, sender=State)
@@ -0,0 +1,229 @@
+import logging
+import threading
+from collections import defaultdict
+from types import MappingProxyType
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from river.core.workflowcache import SharedVersion
+from river.models import State, Workflow, TransitionMeta, TransitionApprovalMeta, LAZY
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WorkflowGraph(object):
+    """
+    Compiled and immutable view of a workflow definition. It is built once out of a few queries and is
+    then used by the engine to answer definition questions (next transitions, approval metas, groups,
+    final states, reachability) without hitting the database.
+
+    The reachability of the states is kept as a transitive closure where every state has an index and the
+    states that can be reached from it are the bits that are set in an integer.
+    """
+
+    def __init__(self, workflow, transition_metas, transition_approval_metas, approval_meta_groups):
+        self.workflow_id = workflow.pk
+        self.content_type_id = workflow.content_type_id
+        self.field_name = workflow.field_name
+        self.initial_state_id = workflow.initial_state_id
+        self.lazy = workflow.materialization == LAZY
+
+        states = {workflow.initial_state_id: workflow.initial_state}
+        outgoing = defaultdict(list)
+        incoming = defaultdict(list)
+        for transition_meta in transition_metas:
+            states[transition_meta.source_state_id] = transition_meta.source_state
+            states[transition_meta.destination_state_id] = transition_meta.destination_state
+            outgoing[transition_meta.source_state_id].append(transition_meta)
+            incoming[transition_meta.destination_state_id].append(transition_meta)
+
+        approval_metas = defaultdict(list)
+        for transition_approval_meta in transition_approval_metas:
+            approval_metas[transition_approval_meta.transition_meta_id].append(transition_approval_meta)
+
+        groups = defaultdict(set)
+        for transition_approval_meta_id, group_id in approval_meta_groups:
+            groups[transition_approval_meta_id].add(group_id)
+
+        self._states = MappingProxyType(states)
+        self._transition_metas = MappingProxyType({transition_meta.pk: transition_meta for transition_meta in transition_metas})
+        self._outgoing = MappingProxyType({state_id: tuple(metas) for state_id, metas in outgoing.items()})
+        self._incoming = MappingProxyType({state_id: tuple(metas) for state_id, metas in incoming.items()})
+        self._approval_metas = MappingProxyType({meta_id: tuple(metas) for meta_id, metas in approval_metas.items()})
+        self._approval_meta_groups = MappingProxyType({meta_id: frozenset(group_ids) for meta_id, group_ids in groups.items()})
+        self.final_state_ids = frozenset(set(incoming.keys()) - set(outgoing.keys()))
+        self.levels = self._compute_levels()
+
+        self._state_ids = tuple(sorted(states.keys()))
+        self._state_indexes = MappingProxyType({state_id: index for index, state_id in enumerate(self._state_ids)})
+        self._reachable = self._compute_closure()
+
+    @classmethod
+    def build(cls, workflow_id):
+        workflow = Workflow.objects.select_related("initial_state").get(pk=workflow_id)
+        transition_metas = list(
+            TransitionMeta.objects.filter(workflow_id=workflow_id).select_related("source_state", "destination_state").order_by("pk")
+        )
+        transition_approval_metas = list(
+            TransitionApprovalMeta.objects.filter(transition_meta__workflow_id=workflow_id).order_by("priority", "pk")
+        )
+        approval_meta_groups = TransitionApprovalMeta.groups.through.objects.filter(
+            transitionapprovalmeta__transition_meta__workflow_id=workflow_id
+        ).values_list("transitionapprovalmeta_id", "group_id")
+        LOGGER.debug("Workflow graph is compiled for the workflow %s", workflow_id)
+        return cls(workflow, transition_metas, transition_approval_metas, list(approval_meta_groups))
+
+    def _compute_levels(self):
+        levels = []
+        processed = set()
+        level = [meta for meta in self.outgoing(self.initial_state_id)]
+        while level:
+            levels.append(tuple(level))
+            processed.update(meta.pk for meta in level)
+            destinations = set(meta.destination_state_id for meta in level)
+            level = [
+                meta
+                for state_id in sorted(destinations)
+                for meta in self.outgoing(state_id)
+                if meta.pk not in processed
+            ]
+        return tuple(levels)
+
+    def _compute_closure(self):
+        reachable = [0] * len(self._state_ids)
+        for transition_meta in self.transition_metas:
+            reachable[self._state_indexes[transition_meta.source_state_id]] |= 1 << self._state_indexes[transition_meta.destination_state_id]
+        for k in range(len(reachable)):
+            bit = 1 << k
+            for i in range(len(reachable)):
+                if reachable[i] & bit:
+                    reachable[i] |= reachable[k]
+        return tuple(reachable)
+
+    def _to_state_ids(self, bits):
+        return frozenset(state_id for index, state_id in enumerate(self._state_ids) if bits >> index & 1)
+
+    @property
+    def initial_state(self):
+        return self._states[self.initial_state_id]
+
+    @property
+    def transition_metas(self):
+        return tuple(self._transition_metas.values())
+
+    def get_state(self, state_id):
+        return self._states[state_id]
+
+    def get_transition_meta(self, transition_meta_id):
+        return self._transition_metas[transition_meta_id]
+
+    def outgoing(self, state_id):
+        return self._outgoing.get(state_id, ())
+
+    def incoming(self, state_id):
+        return self._incoming.get(state_id, ())
+
+    def approval_metas(self, transition_meta_id):
+        return self._approval_metas.get(transition_meta_id, ())
+
+    def groups(self, transition_approval_meta_id):
+        return self._approval_meta_groups.get(transition_approval_meta_id, frozenset())
+
+    def is_final(self, state_id):
+        return state_id in self.final_state_ids
+
+    def can_reach(self, source_state_id, destination_state_id):
+        """
+        Tells if the destination state can be reached from the source state with one or more transitions.
+        """
+        if source_state_id not in self._state_indexes or destination_state_id not in self._state_indexes:
+            return False
+        return bool(self._reachable[self._state_indexes[source_state_id]] >> self._state_indexes[destination_state_id] & 1)
+
+    def reachable_state_ids(self, state_id):
+        """
+        The given state and all the states that can be reached from it.
+        """
+        if state_id not in self._state_indexes:
+            return frozenset([state_id])
+        index = self._state_indexes[state_id]
+        return self._to_state_ids(self._reachable[index] | 1 << index)
+
+
+class PerWorkflowCache(object):
+    """
+    Keeps what ``build`` returns for a workflow id until it is invalidated. Whatever is built while an invalidation
+    happens is not kept, since it might have been built out of the stale rows. It shares the version of the workflow
+    definitions with the ``WorkflowCache``, so an invalidation in a process makes the other processes drop theirs as
+    well when ``RIVER_WORKFLOW_CACHE`` is configured.
+    """
+
+    def __init__(self, build, cache_alias=None):
+        self._build = build
+        self._shared_version = SharedVersion(cache_alias)
+        self._items = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, workflow):
+        workflow_id = getattr(workflow, "pk", workflow)
+        if self._shared_version.is_changed():
+            self._clear()
+        item = self._items.get(workflow_id)
+        if item is None:
+            generation = self._generation
+            item = self._build(workflow_id)
+            with self._lock:
+                if generation == self._generation:
+                    self._items[workflow_id] = item
+        return item
+
+    def invalidate(self, workflow_id=None):
+        with self._lock:
+            self._generation += 1
+            if workflow_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(workflow_id, None)
+        self._shared_version.bump()
+
+    def _clear(self):
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+
+workflow_graph_cache = PerWorkflowCache(WorkflowGraph.build)
+
+
+def _invalidate(workflow_id=None):
+    workflow_graph_cache.invalidate(workflow_id)
+    transaction.on_commit(lambda: workflow_graph_cache.invalidate(workflow_id))
+
+
+def _on_workflow_changed(sender, instance, *args, **kwargs):
+    _invalidate(instance.pk)
+
+
+def _on_workflow_definition_changed(sender, instance, *args, **kwargs):
+    _invalidate(instance.workflow_id)
+
+
+def _on_state_changed(sender, instance, *args, **kwargs):
+    _invalidate()
+
+
+def _on_approval_meta_groups_changed(sender, instance, action, reverse, *args, **kwargs):
+    if action.startswith("post_"):
+        _invalidate(None if reverse else instance.workflow_id)
+
+
+post_save.connect(_on_workflow_changed, sender=Workflow)
+post_delete.connect(_on_workflow_changed, sender=Workflow)
+post_save.connect(_on_workflow_definition_changed, sender=TransitionMeta)
+post_delete.connect(_on_workflow_definition_changed, sender=TransitionMeta)
+post_save.connect(_on_workflow_definition_changed, sender=TransitionApprovalMeta)
+post_delete.connect(_on_workflow_definition_changed, sender=TransitionApprovalMeta)
+post_save.connect(_on_state_changed, sender=State)
+m2m_changed.connect(_on_approval_meta_groups_changed, sender=TransitionApprovalMeta.groups.through)
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from river.config import app_config
+
+LOGGER = logging.getLogger(__name__)
+
+VERSION_KEY = "river:authorization:version:%s"
+ENTRY_KEY = "river:authorization:%s"
+
+ALL_USERS = "users"
+
+
+class AuthorizationCache(object):
+    """
+    Memoizes the authorization lookups of the drivers, which are the groups and the permissions of the users. The
+    approvals themselves are still authorized by their own groups and permissions in the database, since they can
+    differ from the ones of their metas.
+
+    The entries are kept in a process wide LRU of ``RIVER_AUTHORIZATION_CACHE_SIZE`` entries for
+    ``RIVER_AUTHORIZATION_CACHE_TIMEOUT`` seconds. When a cache of Django's cache framework is configured with
+    ``RIVER_AUTHORIZATION_CACHE``, they are kept there as well along with the versions, so an invalidation in a process
+    is seen by all the others. Otherwise the other processes see a change once their entries expire. The versions are
+    bumped on the changes of the groups and the permissions of the users.
+    """
+
+    def __init__(self, cache_alias=None, size=None, timeout=None):
+        self._cache_alias = cache_alias
+        self._size = size
+        self._timeout = timeout
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_group_ids(self, as_user, lookup):
+        return self._get(("groups", as_user.pk) + self._get_versions("user:%s" % as_user.pk, ALL_USERS), lambda: lookup(as_user))
+
+    def get_permission_ids(self, as_user, lookup):
+        return self._get(("permissions", as_user.pk) + self._get_versions("user:%s" % as_user.pk, ALL_USERS), lambda: lookup(as_user))
+
+    def invalidate_user(self, user_id=None):
+        self._bump("user:%s" % user_id if user_id is not None else ALL_USERS)
+
+    def _get(self, key, compute):
+        timeout = self._timeout if self._timeout is not None else app_config.AUTHORIZATION_CACHE_TIMEOUT
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                value, expires = self._entries[key]
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        shared_cache = self._shared_cache
+        shared_key = ENTRY_KEY % ":".join(str(part) for part in key)
+        value = shared_cache.get(shared_key) if shared_cache is not None else None
+        if value is None:
+            value = compute()
+            if shared_cache is not None:
+                shared_cache.set(shared_key, value, timeout=timeout)
+
+        with self._lock:
+            self._entries[key] = (value, now + timeout if timeout is not None else None)
+            while len(self._entries) > (self._size or app_config.AUTHORIZATION_CACHE_SIZE):
+                self._entries.popitem(last=False)
+        return value
+
+    def _get_versions(self, *names):
+        shared_cache = self._shared_cache
+        if shared_cache is None:
+            return tuple(self._versions.get(name, 0) for name in names)
+        versions = shared_cache.get_many([VERSION_KEY % name for name in names])
+        return tuple(versions.get(VERSION_KEY % name, 0) for name in names)
+
+    def _bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+        shared_cache = self._shared_cache
+        if shared_cache is not None:
+            try:
+                shared_cache.incr(VERSION_KEY % name)
+            except ValueError:
+                shared_cache.add(VERSION_KEY % name, 1, timeout=None)
+        LOGGER.debug("Authorization cache of %s is invalidated", name)
+
+    @property
+    def _shared_cache(self):
+        cache_alias = self._cache_alias or app_config.AUTHORIZATION_CACHE
+        return caches[cache_alias] if cache_alias else None
+
+
+authorization_cache = AuthorizationCache()
+
+
+def _invalidate_user(user_id=None):
+    authorization_cache.invalidate_user(user_id)
+    transaction.on_commit(lambda: authorization_cache.invalidate_user(user_id))
+
+
+def _on_user_changed(sender, instance, *args, **kwargs):
+    _invalidate_user(instance.pk)
+
+
+def _on_user_m2m_changed(sender, instance, action, reverse, *args, **kwargs):
+    if action.startswith("post_"):
+        _invalidate_user(None if reverse else instance.pk)
+
+
+def _on_group_permissions_changed(sender, instance, action, *args, **kwargs):
+    if action.startswith("post_"):
+        _invalidate_user()
+
+
+post_save.connect(_on_user_changed, sender=app_config.USER_CLASS)
+post_delete.connect(_on_user_changed, sender=app_config.USER_CLASS)
+m2m_changed.connect(_on_user_m2m_changed, sender=app_config.GROUP_CLASS.user_set.through)
+m2m_changed.connect(_on_user_m2m_changed, sender=app_config.PERMISSION_CLASS.user_set.through)
+m2m_changed.connect(_on_group_permissions_changed, sender=app_config.GROUP_CLASS.permissions.through)
@@ -1,28 +1,64 @@
-from django.db.models import  Q
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Min, Exists, OuterRef, CharField
+from django.db.models.functions import Cast
+from django_cte import With
 
 from river.driver.river_driver import RiverDriver
-
+from river.models import TransitionApproval, PENDING
 
 
 class OrmDriver(RiverDriver):
+    """
+    Finds the pending approvals that the given user can approve, with a single query on any backend that
+    supports common table expressions. An approval is available when it has the highest priority among the
+    pending approvals of its transition, the user is authorized for it and the transition goes out of the
+    current state of its workflow object.
+    """
 
     def get_available_approvals(self, as_user):
-        # Get authorized transition approval metadata
-        authorized_approvals = self._authorized_approvals(as_user)
+        those_with_min_priority = With(
+            TransitionApproval.objects.filter(
+                workflow=self.workflow, content_type=self._content_type, status=PENDING
+            ).values("workflow", "object_id", "transition").annotate(min_priority=Min("priority")),
+            name="approvals_with_min_priority"
+        )
 
-        return authorized_approvals
+        workflow_objects = With(
+            self.wokflow_object_class.objects.annotate(
+                object_id_as_str=Cast("pk", CharField(max_length=200))
+            ).values("object_id_as_str", self.field_name),
+            name="workflow_object"
+        )
 
-    def _authorized_approvals(self, as_user):
-        group_q = Q()
-        for g in as_user.groups.all():
-            group_q = group_q | Q(groups__in=[g])
+        approvals_with_max_priority = those_with_min_priority.join(
+            self._authorized_approvals(as_user),
+            workflow_id=those_with_min_priority.col.workflow_id,
+            object_id=those_with_min_priority.col.object_id,
+            transition_id=those_with_min_priority.col.transition_id,
+            priority=those_with_min_priority.col.min_priority,
+        )
 
+        return workflow_objects.join(
+            approvals_with_max_priority,
+            object_id=workflow_objects.col.object_id_as_str,
+            transition__source_state_id=getattr(workflow_objects.col, self.field_name + "_id")
+        ).with_cte(those_with_min_priority).with_cte(workflow_objects)
 
-        from river.models import TransitionApprovalMeta
-        return TransitionApprovalMeta.objects.filter(
-            Q(workflow=self.workflow) &
-            (
-                    (Q(groups__isnull=True) | group_q)
-            )
+    def get_on_approval_approvals(self, as_user, group_ids=None, permission_ids=None):
+        those_with_higher_priority = TransitionApproval.objects.filter(
+            transition=OuterRef("transition"), status=PENDING, priority__lt=OuterRef("priority")
+        )
+        return self._authorized_approvals(as_user, group_ids, permission_ids).filter(
+            ~Exists(those_with_higher_priority),
+            object_id=Cast(OuterRef("pk"), CharField(max_length=200)),
+            transition__source_state_id=OuterRef(self.field_name + "_id"),
         )
 
+    def _authorized_approvals(self, as_user, group_ids=None, permission_ids=None):
+        group_ids = self._get_group_ids(as_user) if group_ids is None else group_ids
+        permission_ids = self._get_permission_ids(as_user) if permission_ids is None else permission_ids
+        return TransitionApproval.objects.authorized(as_user, group_ids, permission_ids, self._is_superuser(as_user)).filter(workflow=self.workflow, content_type=self._content_type, status=PENDING)
+
+    @property
+    def _content_type(self):
+        return ContentType.objects.get_for_model(self.wokflow_object_class)
@@ -1,5 +1,12 @@
 from abc import abstractmethod
 
+from django.contrib import auth
+from django.contrib.auth.models import Permission
+from django.db.models import Q
+
+from river.driver.authorizationcache import authorization_cache
+from river.models import ApprovalInbox
+
 
 class RiverDriver(object):
 
@@ -12,3 +19,54 @@ class RiverDriver(object):
     @abstractmethod
     def get_available_approvals(self, as_user):
         raise NotImplementedError()
+
+    def get_on_approval_approvals(self, as_user, group_ids=None, permission_ids=None):
+        """
+        The available approvals correlated to an outer query on the workflow objects, to be used in an ``Exists``
+        so that the workflow objects are filtered in the database without their ids being fetched first. The groups
+        and the permissions of the user are looked up unless they are given.
+        """
+        raise NotImplementedError()
+
+    def get_inbox(self, as_user, group_ids=None, permission_ids=None):
+        return ApprovalInbox.objects.authorized(
+            as_user,
+            self._get_group_ids(as_user) if group_ids is None else group_ids,
+            self._get_permission_ids(as_user) if permission_ids is None else permission_ids,
+            self._is_superuser(as_user),
+        ).filter(workflow=self.workflow, content_type_id=self.workflow.content_type_id)
+
+    @staticmethod
+    def _get_group_ids(as_user):
+        return authorization_cache.get_group_ids(as_user, RiverDriver._lookup_group_ids)
+
+    @staticmethod
+    def _get_permission_ids(as_user):
+        return authorization_cache.get_permission_ids(as_user, RiverDriver._lookup_permission_ids)
+
+    @staticmethod
+    def _is_superuser(as_user):
+        return as_user.is_active and as_user.is_superuser
+
+    @staticmethod
+    def _lookup_group_ids(as_user):
+        return list(as_user.groups.values_list("pk", flat=True))
+
+    @staticmethod
+    def _lookup_permission_ids(as_user):
+        # A superuser has all the permissions, so the permissions are not looked for at all for them.
+        if RiverDriver._is_superuser(as_user):
+            return []
+
+        permissions = set()
+        for backend in auth.get_backends():
+            if hasattr(backend, "get_all_permissions"):
+                permissions.update(backend.get_all_permissions(as_user))
+        if not permissions:
+            return []
+
+        permission_q = Q()
+        for permission in permissions:
+            app_label, codename = permission.split(".", 1)
+            permission_q = permission_q | Q(content_type__app_label=app_label, codename=codename)
+        return list(Permission.objects.filter(permission_q).values_list("pk", flat=True))
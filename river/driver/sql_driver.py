@@ -0,0 +1,111 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.db.models import CharField, OuterRef
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from river.driver.river_driver import RiverDriver
+from river.models import TransitionApproval, Transition, PENDING
+
+SQL_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+# The directories of the templates of the vendors whose names don't match ``connection.vendor``.
+VENDOR_DIRECTORIES = {
+    "microsoft": "mssql",
+}
+
+PARAMETER = re.compile(r"%\((\w+)\)s")
+
+# How a list is bound as a single parameter; an array on postgresql and a JSON array, which the templates read with
+# ``json_each``, ``JSON_TABLE`` or ``OPENJSON``, on the others.
+LIST_ENCODERS = {
+    "postgresql": list,
+}
+
+
+@lru_cache(maxsize=None)
+def load_template(vendor, name):
+    path = os.path.join(SQL_DIRECTORY, VENDOR_DIRECTORIES.get(vendor, vendor), name + ".sql")
+    if not os.path.exists(path):
+        raise ImproperlyConfigured("There is no %s SQL template for the database vendor %s" % (name, vendor))
+    with open(path) as template:
+        return template.read()
+
+
+def render(template, identifiers, parameters, vendor=None):
+    """
+    Puts the quoted identifiers in the ``{name}`` placeholders of the template and turns its ``%(name)s`` placeholders
+    into positional ones with the list of the parameters to be bound to them. A list parameter is bound as a single
+    parameter in the form the vendor takes it, so the statement stays the same whatever the number of the items is.
+    """
+    encode_list = LIST_ENCODERS.get(vendor, json.dumps)
+    params = []
+
+    def bind(match):
+        value = parameters[match.group(1)]
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = encode_list(sorted(value))
+        params.append(value)
+        return "%s"
+
+    sql = PARAMETER.sub(bind, template.format(**identifiers))
+    return sql, params
+
+
+class SqlDriver(RiverDriver):
+    """
+    Finds the available approvals with the hand written SQL template of the database vendor in ``river/sql``. The
+    values are bound as parameters, so the statements can be prepared and their plans can be cached by the database,
+    and the table and the column names are taken from the models and quoted by the database backend.
+    """
+
+    def get_available_approvals(self, as_user):
+        return TransitionApproval.objects.filter(pk__in=RawSQL(*self._get_available_approvals_sql(as_user)))
+
+    def get_on_approval_approvals(self, as_user, group_ids=None, permission_ids=None):
+        return TransitionApproval.objects.filter(
+            pk__in=RawSQL(*self._get_available_approvals_sql(as_user, group_ids, permission_ids)),
+            object_id=Cast(OuterRef("pk"), CharField(max_length=200)),
+        )
+
+    def _get_available_approvals_sql(self, as_user, group_ids=None, permission_ids=None):
+        group_ids = self._get_group_ids(as_user) if group_ids is None else group_ids
+        permission_ids = self._get_permission_ids(as_user) if permission_ids is None else permission_ids
+        vendor = self._connection.vendor
+        return render(load_template(vendor, "get_available_approvals"), self._identifiers, {
+            "workflow_id": self.workflow.pk if self.workflow else None,
+            "content_type_id": self._content_type.pk,
+            "pending": PENDING,
+            "transactioner_id": as_user.pk,
+            "group_ids": group_ids,
+            "is_superuser": int(self._is_superuser(as_user)),
+            "permission_ids": permission_ids,
+        }, vendor)
+
+    @property
+    def _identifiers(self):
+        quote_name = self._connection.ops.quote_name
+        workflow_object_meta = self.wokflow_object_class._meta
+        return {
+            "transition_approval": quote_name(TransitionApproval._meta.db_table),
+            "transition": quote_name(Transition._meta.db_table),
+            "approval_groups": quote_name(TransitionApproval.groups.through._meta.db_table),
+            "approval_permissions": quote_name(TransitionApproval.permissions.through._meta.db_table),
+            "workflow_object": quote_name(workflow_object_meta.db_table),
+            "workflow_object_pk": quote_name(workflow_object_meta.pk.column),
+            "state_field": quote_name(workflow_object_meta.get_field(self.field_name).column),
+        }
+
+    @property
+    def _connection(self):
+        return connections[router.db_for_read(TransitionApproval)]
+
+    @property
+    def _content_type(self):
+        return ContentType.objects.get_for_model(self.wokflow_object_class)
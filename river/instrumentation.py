@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from river.config import app_config
+
+LOGGER = logging.getLogger(__name__)
+
+OPERATIONS_TOTAL = "river_operations_total"
+OPERATION_ERRORS_TOTAL = "river_operation_errors_total"
+OPERATION_DURATION_SECONDS = "river_operation_duration_seconds"
+OPERATION_QUERIES_TOTAL = "river_operation_queries_total"
+
+
+class MetricsBackend(object):
+    """
+    The interface of the backends that the metrics of ``django-river`` are sent to. ``tags`` is a dict of strings.
+    """
+
+    def increment(self, name, value=1, tags=None):
+        raise NotImplementedError()
+
+    def timing(self, name, seconds, tags=None):
+        raise NotImplementedError()
+
+
+class NoopMetricsBackend(MetricsBackend):
+    """
+    Drops the metrics. The operations are not even measured when it is the backend.
+    """
+
+    def increment(self, name, value=1, tags=None):
+        pass
+
+    def timing(self, name, seconds, tags=None):
+        pass
+
+
+class InMemoryMetricsBackend(MetricsBackend):
+    """
+    Aggregates the metrics in the memory of the process. The counters are summed up and the timings are kept as their
+    count, sum and max. They can be exported in the text format of Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.timings = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def increment(self, name, value=1, tags=None):
+        with self._lock:
+            self.counters[(name, self._key(tags))] += value
+
+    def timing(self, name, seconds, tags=None):
+        with self._lock:
+            timing = self.timings[(name, self._key(tags))]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def get_counter(self, name, **tags):
+        return self.counters.get((name, self._key(tags)), 0)
+
+    def get_timing(self, name, **tags):
+        count, total, maximum = self.timings.get((name, self._key(tags)), (0, 0.0, 0.0))
+        return {"count": count, "sum": total, "max": maximum}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timings = sorted((key, list(value)) for key, value in self.timings.items())
+
+        lines = []
+        for name in sorted(set(name for (name, _), _ in counters)):
+            lines.append("# TYPE %s counter" % name)
+            lines.extend(
+                "%s%s %s" % (name, self._labels(tags), self._number(value))
+                for (counter_name, tags), value in counters if counter_name == name
+            )
+        for name in sorted(set(name for (name, _), _ in timings)):
+            lines.append("# TYPE %s summary" % name)
+            for (timing_name, tags), (count, total, _) in timings:
+                if timing_name == name:
+                    lines.append("%s_count%s %s" % (name, self._labels(tags), count))
+                    lines.append("%s_sum%s %s" % (name, self._labels(tags), self._number(total)))
+            lines.append("# TYPE %s_max gauge" % name)
+            lines.extend(
+                "%s_max%s %s" % (name, self._labels(tags), self._number(maximum))
+                for (timing_name, tags), (_, _, maximum) in timings if timing_name == name
+            )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    @staticmethod
+    def _key(tags):
+        return tuple(sorted((tags or {}).items()))
+
+    @staticmethod
+    def _labels(tags):
+        if not tags:
+            return ""
+        return "{%s}" % ",".join(
+            '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in tags
+        )
+
+    @staticmethod
+    def _number(value):
+        return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Instrumentation(object):
+    """
+    Measures the operations of ``django-river`` and sends the number of their calls and errors, their durations and
+    the number of SQL queries that they run to the backend that ``RIVER_METRICS_BACKEND`` points to. The metrics
+    are tagged with the operation, the model of the workflow and the field name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backend = None
+        self._backend_setting = None
+
+    @property
+    def backend(self):
+        setting = app_config.METRICS_BACKEND
+        if self._backend is None or setting is not self._backend_setting:
+            with self._lock:
+                if self._backend is None or setting is not self._backend_setting:
+                    self._backend = self._load_backend(setting)
+                    self._backend_setting = setting
+        return self._backend
+
+    @staticmethod
+    def _load_backend(setting):
+        if setting is None:
+            return NoopMetricsBackend()
+        if isinstance(setting, str):
+            return import_string(setting)()
+        return setting
+
+    @contextmanager
+    def instrument(self, operation, workflow=None, field_name=None, count_queries=True, **tags):
+        backend = self.backend
+        if isinstance(backend, NoopMetricsBackend):
+            yield
+            return
+
+        tags = dict(tags, operation=operation, **self._workflow_tags(workflow, field_name))
+        query_counter = QueryCounter() if count_queries else None
+        started = time.perf_counter()
+        try:
+            if query_counter is None:
+                yield
+            else:
+                with connection.execute_wrapper(query_counter):
+                    yield
+        except Exception:
+            backend.increment(OPERATION_ERRORS_TOTAL, tags=tags)
+            raise
+        finally:
+            backend.timing(OPERATION_DURATION_SECONDS, time.perf_counter() - started, tags=tags)
+            backend.increment(OPERATIONS_TOTAL, tags=tags)
+            if query_counter is not None:
+                backend.increment(OPERATION_QUERIES_TOTAL, query_counter.count, tags=tags)
+
+    def run_hook(self, callback, context):
+        """
+        Runs the callback of a hook as the ``hook`` operation. A failing hook is counted as an error and logged, but
+        it doesn't fail the operation that fired it.
+        """
+        try:
+            with self.instrument("hook", context["hook"]["payload"]["workflow"], hook_type=context["hook"]["type"]):
+                callback(context)
+        except Exception as e:
+            LOGGER.exception(e)
+
+    def instrumented(self, operation, count_queries=True):
+        """
+        Instruments a method of the workflow objects, which have ``workflow`` and ``field_name`` attributes. The
+        methods that return lazy querysets are only measured for building them; their queries run later, so they
+        are instrumented with ``count_queries=False``.
+        """
+
+        def decorator(method):
+            @wraps(method)
+            def wrapper(workflow_object, *args, **kwargs):
+                with self.instrument(operation, workflow_object.workflow, workflow_object.field_name, count_queries):
+                    return method(workflow_object, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def _workflow_tags(workflow, field_name):
+        if workflow is None:
+            return {"workflow": "", "field_name": field_name or ""}
+        content_type = ContentType.objects.get_for_id(workflow.content_type_id)
+        return {"workflow": "%s.%s" % (content_type.app_label, content_type.model), "field_name": field_name or workflow.field_name}
+
+
+instrumentation = Instrumentation()
+instrumented = instrumentation.instrumented
@@ -0,0 +1,72 @@
+import json
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from river.core.workflowregistry import workflow_registry
+from river.models import Workflow
+
+
+class Command(BaseCommand):
+    help = "Times initializing, approving, jumping, the inbox and the bulk paths on a generated workflow and a generated " \
+           "population of objects, and compares the query counts and the wall times with a baseline. Everything " \
+           "that is created is rolled back. It needs the test requirements."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", nargs="?", default="tests.ModelWithWorkflowObject", help="The model to benchmark in app_label.ModelName format")
+        parser.add_argument("field_name", nargs="?", default="my_field", help="The state field to benchmark")
+        parser.add_argument("--objects", type=int, nargs="+", default=[10000], help="The sizes of the populations to run with")
+        parser.add_argument("--states", type=int, default=5, help="How many states are in the workflow")
+        parser.add_argument("--fan-out", type=int, default=1, help="How many next states each state has")
+        parser.add_argument("--approvals", type=int, default=1, help="How many approvals with increasing priorities each transition needs")
+        parser.add_argument("--cycles", type=int, default=0, help="How many of the states are returned to from their next state")
+        parser.add_argument("--sample", type=int, default=100, help="How many objects the single object paths are run with")
+        parser.add_argument("--batch-size", type=int, default=1000, help="How many objects are given to the bulk paths at once")
+        parser.add_argument("--output", help="The file to write the results to as JSON")
+        parser.add_argument("--baseline", help="The JSON file of an earlier run to compare with")
+        parser.add_argument("--threshold", type=float, default=0.2, help="How much slower than the baseline is tolerated, like 0.2 for 20%%")
+
+    def handle(self, *args, **options):
+        try:
+            from rivertest.bench import Benchmark, WorkflowShape, compare
+        except (ImportError, RuntimeError) as e:
+            raise CommandError("The test requirements are needed to run the benchmarks; %s" % e)
+
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        if id(model) not in workflow_registry.workflows:
+            raise CommandError("%s does not have any state field" % options["model"])
+        if options["field_name"] not in workflow_registry.get_class_fields(model):
+            raise CommandError("%s is not a state field of %s" % (options["field_name"], options["model"]))
+        if Workflow.objects.filter(content_type=ContentType.objects.get_for_model(model), field_name=options["field_name"]).exists():
+            raise CommandError("%s.%s already has a workflow" % (options["model"], options["field_name"]))
+
+        shape = WorkflowShape(options["states"], options["fan_out"], options["approvals"], options["cycles"])
+        if shape.states < 2 or shape.fan_out < 1 or shape.approvals < 1 or not 0 <= shape.cycles <= shape.states - 2:
+            raise CommandError("There must be at least two states, one next state and one approval, and fewer cycles than states - 1")
+
+        benchmark = Benchmark(model, options["field_name"], shape, batch_size=options["batch_size"], sample=options["sample"])
+        report = {"database": connection.vendor, "workflow": shape._asdict(), "runs": []}
+        for objects in options["objects"]:
+            operations = benchmark.run(objects)
+            report["runs"].append({"objects": objects, "operations": operations})
+            for operation, measurement in operations.items():
+                self.stdout.write("%s objects %-24s queries=%-8s seconds=%.4f%s" % (
+                    objects, operation, measurement["queries"], measurement["seconds"],
+                    " error=%s" % measurement["error"] if "error" in measurement else ""
+                ))
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                regressions = compare(report, json.load(baseline), options["threshold"])
+            if regressions:
+                raise CommandError("Regressed against the baseline;\n%s" % "\n".join(regressions))
+            self.stdout.write("No regression against the baseline")
@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+
+from river.core.workflowregistry import workflow_registry
+
+
+class Command(BaseCommand):
+    help = "Initializes the workflows of the existing objects of a model that were created without going through post_save, " \
+           "like the ones that are created with bulk_create or imported into the table directly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="The model to initialize in app_label.ModelName format")
+        parser.add_argument("field_names", nargs="*", help="The state fields to initialize. All of them are initialized when none is given")
+        parser.add_argument("--batch-size", type=int, default=1000, help="How many objects are initialized in one go")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if id(model) not in workflow_registry.workflows:
+            raise CommandError("%s does not have any state field" % options["model"])
+
+        field_names = options["field_names"] or sorted(workflow_registry.get_class_fields(model))
+        for field_name in field_names:
+            if field_name not in workflow_registry.get_class_fields(model):
+                raise CommandError("%s is not a state field of %s" % (field_name, options["model"]))
+
+            initialized = getattr(model.river, field_name).initialize_many(model.objects.all(), batch_size=options["batch_size"])
+            self.stdout.write("%s objects are initialized for %s.%s" % (initialized, options["model"], field_name))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('river', '0010_remove_duplicate_transitions_and_approvals'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='transition',
+            unique_together={('content_type', 'object_id', 'workflow', 'meta', 'iteration')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='transitionapproval',
+            unique_together={('transition', 'meta')},
+        ),
+    ]
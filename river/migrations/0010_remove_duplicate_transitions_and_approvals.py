@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:46
+
+from django.db import migrations
+from django.db.models import Count
+
+PENDING = 'pending'
+
+
+def _duplicates(queryset, fields):
+    """
+    Maps the pk that is kept of every group of the rows that have the same values of the given fields to the pks of
+    the other rows of the group. The first row of a group that is not pending anymore is kept, so the history of the
+    approvals is not lost, and the lowest pk is kept when all of them are pending.
+    """
+    duplicates = {}
+    for group in queryset.order_by().values(*fields).annotate(count=Count('pk')).filter(count__gt=1):
+        rows = list(queryset.filter(**{field: group[field] for field in fields}).order_by('pk').values_list('pk', 'status'))
+        kept = next((pk for pk, status in rows if status != PENDING), rows[0][0])
+        duplicates[kept] = [pk for pk, _ in rows if pk != kept]
+    return duplicates
+
+
+def remove_duplicates(apps, schema_editor):
+    Transition = apps.get_model('river', 'Transition')
+    TransitionApproval = apps.get_model('river', 'TransitionApproval')
+    OnTransitHook = apps.get_model('river', 'OnTransitHook')
+    OnApprovedHook = apps.get_model('river', 'OnApprovedHook')
+
+    for kept, duplicates in _duplicates(Transition.objects.all(), ['content_type', 'object_id', 'workflow', 'meta', 'iteration']).items():
+        TransitionApproval.objects.filter(transition__in=duplicates).update(transition_id=kept)
+        OnTransitHook.objects.filter(transition__in=duplicates).update(transition_id=kept)
+        Transition.objects.filter(pk__in=duplicates).delete()
+
+    for kept, duplicates in _duplicates(TransitionApproval.objects.filter(meta__isnull=False), ['transition', 'meta']).items():
+        OnApprovedHook.objects.filter(transition_approval__in=duplicates).update(transition_approval_id=kept)
+        # The approvals that follow a removed one would be cascaded with it; the first of them follows the kept one
+        # unless it is already followed, and the others are detached.
+        following = list(TransitionApproval.objects.filter(previous__in=duplicates).order_by('pk').values_list('pk', flat=True))
+        if following and not TransitionApproval.objects.filter(previous=kept).exists():
+            TransitionApproval.objects.filter(pk=following.pop(0)).update(previous_id=kept)
+        TransitionApproval.objects.filter(pk__in=following).update(previous=None)
+        TransitionApproval.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0009_featuresetting_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0010_alter_transition_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transition',
+            index=models.Index(fields=['content_type', 'object_id', 'workflow', 'status', 'iteration'], name='river_trans_object_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transition',
+            index=models.Index(fields=['content_type', 'object_id', 'workflow', 'source_state'], name='river_trans_object_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transition',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['content_type', 'object_id', 'workflow', 'iteration'], name='river_trans_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(fields=['content_type', 'object_id', 'workflow', 'status'], name='river_ta_object_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(fields=['content_type', 'object_id', 'transaction_date'], name='river_ta_object_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionapproval',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['workflow', 'object_id', 'transition', 'priority'], name='river_ta_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('river', '0011_transition_and_approval_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowObjectSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Date Created')),
+                ('date_updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Date Updated')),
+                ('object_id', models.CharField(max_length=50, verbose_name='Related Object')),
+                ('iteration', models.IntegerField(default=0, verbose_name='Iteration')),
+                ('completed', models.BooleanField(default=False, verbose_name='Completed')),
+                ('last_transition_date', models.DateTimeField(blank=True, null=True, verbose_name='Last Transition Date')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='Content Type')),
+                ('last_approval', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='river.transitionapproval', verbose_name='Last Approval')),
+                ('state', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='river.state', verbose_name='State')),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workflow_object_snapshots', to='river.workflow', verbose_name='Workflow')),
+            ],
+            options={
+                'verbose_name': 'Workflow Object Snapshot',
+                'verbose_name_plural': 'Workflow Object Snapshots',
+                'unique_together': {('content_type', 'object_id', 'workflow')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('river', '0012_workflowobjectsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflow',
+            name='materialization',
+            field=models.CharField(choices=[('eager', 'Eager'), ('lazy', 'Lazy')], default='eager', help_text='Eager creates the transitions and the approvals of the whole workflow when an object is created. Lazy creates the ones that go out of a state only when an object enters that state.', max_length=20, verbose_name='Materialization'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('river', '0013_workflow_materialization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Date Created')),
+                ('date_updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Date Updated')),
+                ('object_id', models.CharField(max_length=50, verbose_name='Related Object')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype', verbose_name='Content Type')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auth.group', verbose_name='Group')),
+                ('permission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auth.permission', verbose_name='Permission')),
+                ('transition_approval', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='river.transitionapproval', verbose_name='Transition Approval')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_inbox', to='river.workflow', verbose_name='Workflow')),
+            ],
+            options={
+                'verbose_name': 'Approval Inbox',
+                'verbose_name_plural': 'Approval Inboxes',
+                'indexes': [models.Index(fields=['content_type', 'workflow', 'object_id'], name='river_inbox_object_idx'), models.Index(fields=['group', 'workflow', 'object_id'], name='river_inbox_group_idx'), models.Index(fields=['permission', 'workflow', 'object_id'], name='river_inbox_permission_idx'), models.Index(fields=['user', 'workflow', 'object_id'], name='river_inbox_user_idx')],
+            },
+        ),
+    ]
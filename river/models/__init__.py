@@ -5,6 +5,8 @@ from .transitionmeta import *
 from .transitionapprovalmeta import *
 from .transition import *
 from .transitionapproval import *
+from .workflowobjectsnapshot import *
+from .approvalinbox import *
 from .function import *
 from .on_approved_hook import *
 from .on_transit_hook import *
@@ -0,0 +1,55 @@
+from django.db.models import CASCADE
+
+try:
+    from django.contrib.contenttypes.fields import GenericForeignKey
+except ImportError:
+    from django.contrib.contenttypes.generic import GenericForeignKey
+
+from django.db import models
+try:
+    # Try to import gettext_lazy for Django 3.0 and newer
+    from django.utils.translation import gettext_lazy as _
+except ImportError:
+    # Fall back to ugettext_lazy for older Django versions
+    from django.utils.translation import ugettext_lazy as _
+
+from river.config import app_config
+from river.models import Workflow
+from river.models.base_model import BaseModel
+from river.models.managers.approvalinbox import ApprovalInboxManager
+from river.models.transitionapproval import TransitionApproval
+
+
+class ApprovalInbox(BaseModel):
+    """
+    Denormalized list of the transition approvals that can be approved right now, which are the pending ones with the
+    highest priority on the transitions that go out of the current states of the workflow objects. There is a row for
+    each group and permission pair that an approval requires. It is updated in the same transaction with every
+    initialization, approval and jump when ``RIVER_APPROVAL_INBOX`` is enabled, so the objects that wait for a user
+    are found with index lookups instead of going through all the approvals.
+    """
+
+    class Meta:
+        app_label = 'river'
+        verbose_name = _("Approval Inbox")
+        verbose_name_plural = _("Approval Inboxes")
+        indexes = [
+            models.Index(fields=['content_type', 'workflow', 'object_id'], name='river_inbox_object_idx'),
+            models.Index(fields=['group', 'workflow', 'object_id'], name='river_inbox_group_idx'),
+            models.Index(fields=['permission', 'workflow', 'object_id'], name='river_inbox_permission_idx'),
+            models.Index(fields=['user', 'workflow', 'object_id'], name='river_inbox_user_idx'),
+        ]
+
+    objects = ApprovalInboxManager()
+
+    content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
+    object_id = models.CharField(max_length=50, verbose_name=_('Related Object'))
+    workflow_object = GenericForeignKey('content_type', 'object_id')
+
+    workflow = models.ForeignKey(Workflow, verbose_name=_("Workflow"), related_name='approval_inbox', on_delete=CASCADE)
+    transition_approval = models.ForeignKey(TransitionApproval, verbose_name=_("Transition Approval"), related_name='+', on_delete=CASCADE)
+    group = models.ForeignKey(app_config.GROUP_CLASS, verbose_name=_('Group'), related_name='+', null=True, blank=True, on_delete=CASCADE)
+    permission = models.ForeignKey(
+        app_config.PERMISSION_CLASS, verbose_name=_('Permission'), related_name='+', null=True, blank=True, on_delete=CASCADE
+    )
+    user = models.ForeignKey(app_config.USER_CLASS, verbose_name=_('User'), related_name='+', null=True, blank=True, on_delete=CASCADE)
@@ -4,9 +4,9 @@ from django.contrib.contenttypes.models import ContentType
 from django.db.models import CASCADE
 from django.db.models.signals import post_save, post_delete
 
-from river.core.riverobject import RiverObject
+from river.core.riverobject import RiverObject, forget_workflow_objects
 from river.core.workflowregistry import workflow_registry
-from river.models import OnApprovedHook, OnTransitHook, OnCompleteHook
+from river.models import OnApprovedHook, OnTransitHook, OnCompleteHook, WorkflowObjectSnapshot
 
 try:
     from django.contrib.contenttypes.fields import GenericRelation
@@ -53,6 +53,7 @@ class StateField(models.ForeignKey):
 
         if id(cls) not in workflow_registry.workflows:
             self._add_to_class(cls, "river", river)
+            forget_workflow_objects(cls)
 
         super(StateField, self).contribute_to_class(cls, name, *args, **kwargs)
 
@@ -82,3 +83,4 @@ def _on_workflow_object_deleted(sender, instance, *args, **kwargs):
     OnApprovedHook.objects.filter(object_id=instance.pk, content_type=ContentType.objects.get_for_model(instance.__class__)).delete()
     OnTransitHook.objects.filter(object_id=instance.pk, content_type=ContentType.objects.get_for_model(instance.__class__)).delete()
     OnCompleteHook.objects.filter(object_id=instance.pk, content_type=ContentType.objects.get_for_model(instance.__class__)).delete()
+    WorkflowObjectSnapshot.objects.filter(object_id=instance.pk, content_type=ContentType.objects.get_for_model(instance.__class__)).delete()
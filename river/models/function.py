@@ -1,5 +1,7 @@
 import inspect
 import re
+import threading
+from collections import OrderedDict
 
 from django.db import models
 from django.db.models.signals import pre_save
@@ -10,9 +12,51 @@ except ImportError:
     # Fall back to ugettext_lazy for older Django versions
     from django.utils.translation import ugettext_lazy as _
 
+from river.config import app_config
 from river.models import BaseModel
 
-loaded_functions = {}
+
+class FunctionCache(object):
+    """
+    Least recently used cache of the compiled callables of the functions by ``(pk, version)``. A function body is
+    compiled once per version; saving a function bumps its version, so its stale callable is never served again
+    and eventually gets evicted. The body is kept along to tell apart a function that reuses the pk of a function
+    whose creation is rolled back.
+    """
+
+    def __init__(self, size=None):
+        self._size = size
+        self._callables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, function):
+        if function.pk is None:
+            return function.compile()
+
+        key = (function.pk, function.version)
+        with self._lock:
+            entry = self._callables.get(key)
+            if entry is not None and entry[0] == function.body:
+                self._callables.move_to_end(key)
+                return entry[1]
+
+        func = function.compile()
+        with self._lock:
+            self._callables[key] = (function.body, func)
+            self._callables.move_to_end(key)
+            while len(self._callables) > (self._size or app_config.FUNCTION_CACHE_SIZE):
+                self._callables.popitem(last=False)
+        return func
+
+    def clear(self):
+        with self._lock:
+            self._callables.clear()
+
+    def __len__(self):
+        return len(self._callables)
+
+
+function_cache = FunctionCache()
 
 
 class Function(BaseModel):
@@ -24,19 +68,16 @@ class Function(BaseModel):
         return "%s - %s" % (self.name, "v%s" % self.version)
 
     def get(self):
-        func = loaded_functions.get(self.name, None)
-        if not func or func["version"] != self.version:
-            func = {"function": self._load(), "version": self.version}
-            loaded_functions[self.pk] = func
-        return func["function"]
+        return function_cache.get(self)
 
-    def _load(self):
+    def compile(self):
         func_body = "def _wrapper(context):\n"
         for line in self.body.split("\n"):
             func_body += "\t" + line + "\n"
         func_body += "\thandle(context)\n"
-        exec(func_body)
-        return eval("_wrapper")
+        namespace = {}
+        exec(compile(func_body, "<river function %s v%s>" % (self.name, self.version), "exec"), namespace)
+        return namespace["_wrapper"]
 
 
 def on_pre_save(sender, instance, *args, **kwargs):
@@ -1,5 +1,3 @@
-import logging
-
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.db.models import PROTECT, CASCADE
@@ -11,6 +9,7 @@ except ImportError:
     # Fall back to ugettext_lazy for older Django versions
     from django.utils.translation import ugettext_lazy as _
 
+from river.instrumentation import instrumentation
 from river.models import Workflow, GenericForeignKey, BaseModel
 from river.models.function import Function
 
@@ -22,8 +21,6 @@ HOOK_TYPES = [
     (AFTER, _('After')),
 ]
 
-LOGGER = logging.getLogger(__name__)
-
 
 class Hook(BaseModel):
     class Meta:
@@ -39,7 +36,4 @@ class Hook(BaseModel):
     hook_type = models.CharField(_('When?'), choices=HOOK_TYPES, max_length=50)
 
     def execute(self, context):
-        try:
-            self.callback_function.get()(context)
-        except Exception as e:
-            LOGGER.exception(e)
+        instrumentation.run_hook(lambda hook_context: self.callback_function.get()(hook_context), context)
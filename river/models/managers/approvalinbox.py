@@ -0,0 +1,16 @@
+from django.db.models import Q
+
+from river.models.managers.rivermanager import RiverManager
+
+
+class ApprovalInboxManager(RiverManager):
+    def authorized(self, as_user, group_ids, permission_ids, is_superuser=False):
+        """
+        The inbox rows that the given user can approve with the given groups and permissions, following the same rules
+        with the transition approvals; a row that has a group or a permission requires it and a row that has a user is
+        only for that user. A superuser has all the permissions, so the permissions are not checked for them.
+        """
+        authorized = (Q(user__isnull=True) | Q(user=as_user)) & (Q(group__isnull=True) | Q(group_id__in=group_ids))
+        if not is_superuser:
+            authorized &= Q(permission__isnull=True) | Q(permission_id__in=permission_ids)
+        return self.filter(authorized)
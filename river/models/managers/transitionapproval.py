@@ -1,3 +1,4 @@
+from django.db.models import Q, Exists, OuterRef
 from django_cte import CTEManager
 
 from river.config import app_config
@@ -23,3 +24,17 @@ class TransitionApprovalManager(RiverManager if app_config.IS_MSSQL else CTEMana
             kwarg['object_id'] = workflow_object.pk
 
         return super(TransitionApprovalManager, self).update_or_create(*args, **kwarg)
+
+    def authorized(self, as_user, group_ids, permission_ids, is_superuser=False):
+        """
+        The transition approvals that the given user can approve with the given groups and permissions; an approval
+        that has groups or permissions requires one of them and an approval that has a transactioner is only for them.
+        A superuser has all the permissions, so the permissions are not checked for them.
+        """
+        approval_groups = self.model.groups.through.objects.filter(transitionapproval=OuterRef("pk"))
+        approval_permissions = self.model.permissions.through.objects.filter(transitionapproval=OuterRef("pk"))
+        authorized = (Q(transactioner__isnull=True) | Q(transactioner=as_user)) & \
+                     (~Exists(approval_groups) | Exists(approval_groups.filter(group_id__in=group_ids)))
+        if not is_superuser:
+            authorized &= ~Exists(approval_permissions) | Exists(approval_permissions.filter(permission_id__in=permission_ids))
+        return self.filter(authorized)
@@ -0,0 +1,22 @@
+from django.db import connections, router
+
+from river.models.managers.rivermanager import RiverManager
+
+
+class WorkflowObjectSnapshotManager(RiverManager):
+    def initialize(self, workflow, content_type, states):
+        """
+        Creates the snapshots of the workflow objects at the beginning of their workflow. ``states`` maps the ids of
+        the workflow objects to their current state ids. The ones whose snapshots already exist are left as they are.
+        """
+        supports_ignore_conflicts = connections[router.db_for_write(self.model)].features.supports_ignore_conflicts
+        states = {str(object_id): state_id for object_id, state_id in states.items()}
+        if not supports_ignore_conflicts:
+            for object_id in self.filter(workflow=workflow, content_type=content_type, object_id__in=list(states.keys())) \
+                    .values_list("object_id", flat=True):
+                states.pop(object_id, None)
+
+        return self.bulk_create([
+            self.model(workflow=workflow, content_type=content_type, object_id=object_id, state_id=state_id, iteration=0)
+            for object_id, state_id in states.items()
+        ], ignore_conflicts=supports_ignore_conflicts)
@@ -1,6 +1,6 @@
 import logging
 
-from django.db.models import CASCADE, PROTECT
+from django.db.models import CASCADE, PROTECT, Q
 
 from river.models import State, Workflow, TransitionMeta
 
@@ -41,6 +41,14 @@ class Transition(BaseModel):
         app_label = 'river'
         verbose_name = _("Transition")
         verbose_name_plural = _("Transitions")
+        unique_together = [('content_type', 'object_id', 'workflow', 'meta', 'iteration')]
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'workflow', 'status', 'iteration'], name='river_trans_object_status_idx'),
+            models.Index(fields=['content_type', 'object_id', 'workflow', 'source_state'], name='river_trans_object_source_idx'),
+            models.Index(
+                fields=['content_type', 'object_id', 'workflow', 'iteration'], condition=Q(status=PENDING), name='river_trans_pending_idx'
+            ),
+        ]
 
     objects = TransitionApprovalManager()
     content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
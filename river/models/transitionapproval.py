@@ -1,6 +1,6 @@
 import logging
 
-from django.db.models import CASCADE, PROTECT, SET_NULL
+from django.db.models import CASCADE, PROTECT, SET_NULL, Q
 from mptt.fields import TreeOneToOneField
 
 from river.models import TransitionApprovalMeta, Workflow
@@ -43,6 +43,14 @@ class TransitionApproval(BaseModel):
         app_label = 'river'
         verbose_name = _("Transition Approval")
         verbose_name_plural = _("Transition Approvals")
+        unique_together = [('transition', 'meta')]
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'workflow', 'status'], name='river_ta_object_status_idx'),
+            models.Index(fields=['content_type', 'object_id', 'transaction_date'], name='river_ta_object_date_idx'),
+            models.Index(
+                fields=['workflow', 'object_id', 'transition', 'priority'], condition=Q(status=PENDING), name='river_ta_pending_idx'
+            ),
+        ]
 
     objects = TransitionApprovalManager()
 
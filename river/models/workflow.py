@@ -12,6 +12,14 @@ from river.config import app_config
 from river.models import BaseModel, State
 from river.models.managers.workflowmetada import WorkflowManager
 
+EAGER = "eager"
+LAZY = "lazy"
+
+MATERIALIZATIONS = [
+    (EAGER, _("Eager")),
+    (LAZY, _("Lazy")),
+]
+
 
 class Workflow(BaseModel):
     class Meta:
@@ -34,6 +42,16 @@ class Workflow(BaseModel):
         related_name="workflow_this_set_as_initial_state",
         on_delete=PROTECT,
     )
+    materialization = models.CharField(
+        _("Materialization"),
+        choices=MATERIALIZATIONS,
+        max_length=20,
+        default=EAGER,
+        help_text=_(
+            "Eager creates the transitions and the approvals of the whole workflow when an object is created. "
+            "Lazy creates the ones that go out of a state only when an object enters that state."
+        ),
+    )
 
     def natural_key(self):
         return self.content_type, self.field_name
@@ -0,0 +1,48 @@
+from django.db.models import CASCADE, SET_NULL
+
+try:
+    from django.contrib.contenttypes.fields import GenericForeignKey
+except ImportError:
+    from django.contrib.contenttypes.generic import GenericForeignKey
+
+from django.db import models
+try:
+    # Try to import gettext_lazy for Django 3.0 and newer
+    from django.utils.translation import gettext_lazy as _
+except ImportError:
+    # Fall back to ugettext_lazy for older Django versions
+    from django.utils.translation import ugettext_lazy as _
+
+from river.config import app_config
+from river.models import State, Workflow
+from river.models.base_model import BaseModel
+from river.models.managers.workflowobjectsnapshot import WorkflowObjectSnapshotManager
+from river.models.transitionapproval import TransitionApproval
+
+
+class WorkflowObjectSnapshot(BaseModel):
+    """
+    Denormalized status of a workflow object in a workflow. It is updated in the same transaction with every
+    approval and jump, so the status of an object can be told without going through its transitions and approvals.
+    """
+
+    class Meta:
+        app_label = 'river'
+        verbose_name = _("Workflow Object Snapshot")
+        verbose_name_plural = _("Workflow Object Snapshots")
+        unique_together = [('content_type', 'object_id', 'workflow')]
+
+    objects = WorkflowObjectSnapshotManager()
+
+    content_type = models.ForeignKey(app_config.CONTENT_TYPE_CLASS, verbose_name=_('Content Type'), on_delete=CASCADE)
+    object_id = models.CharField(max_length=50, verbose_name=_('Related Object'))
+    workflow_object = GenericForeignKey('content_type', 'object_id')
+
+    workflow = models.ForeignKey(Workflow, verbose_name=_("Workflow"), related_name='workflow_object_snapshots', on_delete=CASCADE)
+    state = models.ForeignKey(State, verbose_name=_("State"), related_name='+', null=True, blank=True, on_delete=SET_NULL)
+    iteration = models.IntegerField(default=0, verbose_name=_('Iteration'))
+    last_approval = models.ForeignKey(
+        TransitionApproval, verbose_name=_("Last Approval"), related_name='+', null=True, blank=True, on_delete=SET_NULL
+    )
+    completed = models.BooleanField(default=False, verbose_name=_('Completed'))
+    last_transition_date = models.DateTimeField(null=True, blank=True, verbose_name=_('Last Transition Date'))
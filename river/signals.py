@@ -1,6 +1,12 @@
 import logging
+from collections import OrderedDict
+
 from django.contrib.contenttypes.models import ContentType
 from django.dispatch import Signal
+
+from river.config import app_config
+from river.core.hookexecutor import hook_executor
+from river.core.hookindex import hook_index_cache
 from river.models.hook import BEFORE, AFTER
 from river.models.on_approved_hook import OnApprovedHook
 from river.models.on_complete_hook import OnCompleteHook
@@ -17,28 +23,41 @@ post_approve = Signal()
 LOGGER = logging.getLogger(__name__)
 
 
+def _get_hook_scope(transition_approval, transition_approval_field):
+    if transition_approval_field == 'transition':
+        return transition_approval.transition.meta_id, transition_approval.transition_id
+    elif transition_approval_field == 'transition_approval':
+        return transition_approval.meta_id, transition_approval.pk
+    return None, None
+
+
 class SignalHandler:
+    hook_type = None
+
     def __init__(self, workflow_object, field_name, transition_approval=None):
         self.workflow_object = workflow_object
         self.field_name = field_name
         self.transition_approval = transition_approval
         self.content_type = ContentType.objects.get_for_model(workflow_object.__class__)
-        self.workflow = workflow_object.workflow_obj
+        self.workflow = getattr(workflow_object.river, field_name).workflow
 
     def execute_hooks(self, hook_model, when, transition_approval_field):
-        # TODO: Implement this
-        # hooks = hook_model.objects.filter(
-        #     (Q(object_id__isnull=True) | Q(object_id=self.workflow_object.pk, content_type=self.content_type)) &
-        #     (Q(**{transition_approval_field: self.transition_approval}) | Q(**{transition_approval_field: None})) &
-        #     Q(workflow__field_name=self.field_name, hook_type=when)
-        # )
-        # for hook in hooks:
-        #     hook.execute(self.get_context(when))
-        pass
+        if not self.workflow:
+            return
+        meta_id, scope_id = _get_hook_scope(self.transition_approval, transition_approval_field)
+        hooks = hook_index_cache.get(self.workflow).get_hooks(hook_model, when, meta_id, self.content_type.pk, self.workflow_object.pk)
+        for hook in hooks:
+            if transition_approval_field and getattr(hook, transition_approval_field + "_id") not in (None, scope_id):
+                continue
+            if when == AFTER and app_config.DEFERRED_HOOKS:
+                hook_executor.submit(hook, self.get_context(when))
+            else:
+                hook.execute(self.get_context(when))
 
     def get_context(self, when):
         context = {
             "hook": {
+                "type": self.hook_type,
                 "when": when,
                 "payload": {
                     "workflow": self.workflow,
@@ -52,6 +71,8 @@ class SignalHandler:
 
 
 class TransitionSignal(SignalHandler):
+    hook_type = "on-transit"
+
     def __init__(self, status, workflow_object, field_name, transition_approval):
         super().__init__(workflow_object, field_name, transition_approval)
         self.status = status
@@ -70,6 +91,8 @@ class TransitionSignal(SignalHandler):
 
 
 class ApproveSignal(SignalHandler):
+    hook_type = "on-approved"
+
     def __enter__(self):
         self.execute_hooks(OnApprovedHook, BEFORE, 'transition_approval')
         LOGGER.debug(
@@ -86,6 +109,8 @@ class ApproveSignal(SignalHandler):
 
 
 class OnCompleteSignal(SignalHandler):
+    hook_type = "on-complete"
+
     def __init__(self, workflow_object, field_name):
         super().__init__(workflow_object, field_name)
         self.status = getattr(self.workflow_object.river, self.field_name).on_final_state
@@ -99,3 +124,67 @@ class OnCompleteSignal(SignalHandler):
         if self.status:
             self.execute_hooks(OnCompleteHook, AFTER, None)
             LOGGER.debug(f"Signal fired after workflow of {self.workflow_object} is complete")
+
+
+class BatchSignal(object):
+    """
+    Executes the hooks of the workflow objects that are approved together. Each hook is executed once with all the
+    workflow objects and the transition approvals of the batch that it is interested in, instead of once per object.
+    ``entries`` is a list of ``(workflow_object, transition_approval)``.
+    """
+
+    hook_types = {
+        OnApprovedHook: ("on-approved", 'transition_approval'),
+        OnTransitHook: ("on-transit", 'transition'),
+        OnCompleteHook: ("on-complete", None),
+    }
+
+    def __init__(self, hook_model, workflow, entries):
+        self.hook_model = hook_model
+        self.workflow = workflow
+        self.entries = entries
+        self.hook_type, self.transition_approval_field = self.hook_types[hook_model]
+
+    def __enter__(self):
+        self.execute_hooks(BEFORE)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.execute_hooks(AFTER)
+
+    def execute_hooks(self, when):
+        if not self.workflow or not self.entries:
+            return
+        hook_index = hook_index_cache.get(self.workflow)
+        content_type = ContentType.objects.get_for_model(self.entries[0][0].__class__)
+        batches = OrderedDict()
+        object_hooks = hook_index.get_object_hooks(
+            self.hook_model, when, content_type.pk, [workflow_object.pk for workflow_object, _ in self.entries]
+        )
+        for workflow_object, transition_approval in self.entries:
+            meta_id, scope_id = _get_hook_scope(transition_approval, self.transition_approval_field)
+            hooks = hook_index.get_shared_hooks(self.hook_model, when, meta_id) + object_hooks.get((meta_id, str(workflow_object.pk)), ())
+            for hook in hooks:
+                if self.transition_approval_field and getattr(hook, self.transition_approval_field + "_id") not in (None, scope_id):
+                    continue
+                batches.setdefault(id(hook), (hook, []))[1].append((workflow_object, transition_approval))
+
+        for hook, entries in batches.values():
+            if when == AFTER and app_config.DEFERRED_HOOKS:
+                hook_executor.submit(hook, self.get_context(when, entries))
+            else:
+                hook.execute(self.get_context(when, entries))
+        LOGGER.debug(f"Signal fired {when.lower()} {self.hook_type} for a batch of {len(self.entries)} workflow objects")
+
+    def get_context(self, when, entries):
+        return {
+            "hook": {
+                "type": self.hook_type,
+                "when": when,
+                "batch": True,
+                "payload": {
+                    "workflow": self.workflow,
+                    "workflow_objects": [workflow_object for workflow_object, _ in entries],
+                    "transition_approvals": [transition_approval for _, transition_approval in entries],
+                }
+            }
+        }
@@ -0,0 +1,28 @@
+SELECT ta.id
+FROM {transition_approval} ta
+         INNER JOIN {transition} t ON t.id = ta.transition_id
+         INNER JOIN {workflow_object} wo
+                    ON (
+                            CAST(wo.{workflow_object_pk} AS VARCHAR) = ta.object_id
+                            AND wo.{state_field} = t.source_state_id
+                        )
+WHERE ta.workflow_id = %(workflow_id)s
+  AND ta.content_type_id = %(content_type_id)s
+  AND ta.status = %(pending)s
+  AND (ta.transactioner_id IS NULL OR ta.transactioner_id = %(transactioner_id)s)
+  AND (
+        NOT EXISTS(SELECT 1 FROM {approval_groups} tag WHERE tag.transitionapproval_id = ta.id)
+        OR EXISTS(SELECT 1 FROM {approval_groups} tag WHERE tag.transitionapproval_id = ta.id AND tag.group_id = ANY(%(group_ids)s))
+    )
+  AND (
+        %(is_superuser)s = 1
+        OR NOT EXISTS(SELECT 1 FROM {approval_permissions} tap WHERE tap.transitionapproval_id = ta.id)
+        OR EXISTS(SELECT 1 FROM {approval_permissions} tap WHERE tap.transitionapproval_id = ta.id AND tap.permission_id = ANY(%(permission_ids)s))
+    )
+  AND NOT EXISTS(
+        SELECT 1
+        FROM {transition_approval} hp
+        WHERE hp.transition_id = ta.transition_id
+          AND hp.status = %(pending)s
+          AND hp.priority < ta.priority
+    )
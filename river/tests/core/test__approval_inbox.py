@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, empty
+
+from river.models import ApprovalInbox, TransitionApproval
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+@override_settings(RIVER_APPROVAL_INBOX=True)
+class ApprovalInboxTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.team_leaders = GroupObjectFactory()
+        self.managers = GroupObjectFactory()
+        self.directors = GroupObjectFactory()
+        self.team_leader = UserObjectFactory(groups=[self.team_leaders])
+        self.manager = UserObjectFactory(groups=[self.managers])
+        self.director = UserObjectFactory(groups=[self.directors])
+        self.state1, self.state2, self.state3, self.state4 = RawState("state1"), RawState("state2"), RawState("state3"), RawState("state4")
+
+    def _build_flow(self, objects):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_objects(objects) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_group(self.team_leaders).build(),
+                AuthorizationPolicyBuilder().with_group(self.managers).with_priority(1).build(),
+            ]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.directors).build()]) \
+            .with_transition(self.state3, self.state4, [AuthorizationPolicyBuilder().build()]) \
+            .build()
+
+    def _on_approval_objects(self, user):
+        return ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=user)
+
+    def _approve(self, workflow_object, user):
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=workflow_object.pk)
+        workflow_object.river.my_field.approve(as_user=user, groups=list(user.groups.all()))
+        return workflow_object
+
+    def test_shouldPutTheObjectsInTheInboxOfTheGroupWithTheHighestPriority(self):
+        flow = self._build_flow(2)
+
+        assert_that(ApprovalInbox.objects.all(), has_length(2))
+        assert_that(self._on_approval_objects(self.team_leader), contains_inanyorder(*flow.objects))
+        assert_that(self._on_approval_objects(self.manager), empty())
+        assert_that(self._on_approval_objects(self.director), empty())
+
+    def test_shouldMoveTheObjectsThroughTheInboxesAsTheyAreApproved(self):
+        flow = self._build_flow(2)
+
+        self._approve(flow.objects[0], self.team_leader)
+        assert_that(self._on_approval_objects(self.team_leader), contains_inanyorder(flow.objects[1]))
+        assert_that(self._on_approval_objects(self.manager), contains_inanyorder(flow.objects[0]))
+
+        self._approve(flow.objects[0], self.manager)
+        assert_that(self._on_approval_objects(self.manager), empty())
+        assert_that(self._on_approval_objects(self.director), contains_inanyorder(flow.objects[0]))
+
+        self._approve(flow.objects[0], self.director)
+        assert_that(self._on_approval_objects(self.director), contains_inanyorder(flow.objects[0]))
+        assert_that(self._on_approval_objects(self.team_leader), contains_inanyorder(*flow.objects))
+        assert_that(self._on_approval_objects(self.manager), contains_inanyorder(flow.objects[0]))
+
+        self._approve(flow.objects[0], self.manager)
+        assert_that(self._on_approval_objects(self.manager), empty())
+        assert_that(ApprovalInbox.objects.filter(object_id=flow.objects[0].pk), empty())
+
+    def test_shouldUpdateTheInboxWhenManyObjectsAreApprovedOrJumped(self):
+        flow = self._build_flow(3)
+
+        ModelWithWorkflowObject.river.my_field.approve_many(flow.objects[:2], as_user=self.team_leader)
+        assert_that(self._on_approval_objects(self.manager), contains_inanyorder(*flow.objects[:2]))
+
+        ModelWithWorkflowObject.river.my_field.jump_many(flow.objects[1:], flow.get_state(self.state2))
+        assert_that(self._on_approval_objects(self.manager), contains_inanyorder(flow.objects[0]))
+        assert_that(self._on_approval_objects(self.team_leader), empty())
+        assert_that(self._on_approval_objects(self.director), contains_inanyorder(*flow.objects[1:]))
+
+    def test_shouldFindTheSameObjectsWithTheApprovals(self):
+        flow = self._build_flow(4)
+        self._approve(flow.objects[0], self.team_leader)
+        self._approve(flow.objects[1], self.team_leader)
+        self._approve(flow.objects[1], self.manager)
+
+        for user in [self.team_leader, self.manager, self.director]:
+            with override_settings(RIVER_APPROVAL_INBOX=False):
+                expected = list(self._on_approval_objects(user))
+            assert_that(list(self._on_approval_objects(user)), contains_inanyorder(*expected))
+
+    def test_shouldRefreshTheInboxOfTheExistingObjects(self):
+        with override_settings(RIVER_APPROVAL_INBOX=False):
+            flow = self._build_flow(3)
+            self._approve(flow.objects[0], self.team_leader)
+        assert_that(ApprovalInbox.objects.all(), empty())
+
+        out = StringIO()
+        call_command("river_refresh_inbox", "tests.ModelWithWorkflowObject", "--batch-size", "2", stdout=out)
+
+        assert_that(out.getvalue(), equal_to("The inbox of 3 objects is refreshed for tests.ModelWithWorkflowObject.my_field\n"))
+        assert_that(self._on_approval_objects(self.team_leader), contains_inanyorder(*flow.objects[1:]))
+        assert_that(self._on_approval_objects(self.manager), contains_inanyorder(flow.objects[0]))
+        assert_that(
+            [inbox.transition_approval for inbox in ApprovalInbox.objects.filter(object_id=flow.objects[0].pk)],
+            equal_to([TransitionApproval.objects.get(object_id=flow.objects[0].pk, meta__groups=self.managers)])
+        )
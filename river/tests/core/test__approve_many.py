@@ -0,0 +1,195 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, none, is_not, all_of, has_entry, has_entries, has_properties
+
+from river.core.batchapproval import BatchApproval
+from river.models import TransitionApproval, Transition, WorkflowObjectSnapshot, APPROVED, PENDING, CANCELLED, DONE
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.hooking.base_hooking_test import BaseHookingTest
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+from river.utils.error_code import ErrorCode
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class ApproveManyTest(BaseHookingTest):
+
+    def setUp(self):
+        super(ApproveManyTest, self).setUp()
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group2])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+        self.state4 = RawState("state4")
+
+    def _flow_builder(self, objects):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_objects(objects)
+
+    def _build_flow(self, objects):
+        return self._flow_builder(objects) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().with_group(self.group1).build()]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.group2).build()]) \
+            .build()
+
+    def test_shouldApproveAndTransitAllTheObjects(self):
+        flow = self._build_flow(3)
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+
+        assert_that(results, has_length(3))
+        for workflow_object, result in zip(flow.objects, results):
+            assert_that(result.workflow_object, equal_to(workflow_object))
+            assert_that(result.approved, equal_to(True))
+            assert_that(result.transited, equal_to(True))
+            assert_that(result.error, none())
+            assert_that(result.transition_approval.transactioner, equal_to(self.user1))
+            assert_that(workflow_object.my_field, equal_to(flow.get_state(self.state2)))
+
+        assert_that(
+            ModelWithWorkflowObject.objects.filter(my_field=flow.get_state(self.state2)),
+            contains_inanyorder(*flow.objects)
+        )
+        assert_that(TransitionApproval.objects.filter(workflow=flow.workflow, status=APPROVED), has_length(3))
+        assert_that(Transition.objects.filter(workflow=flow.workflow, status=DONE), has_length(3))
+
+        for workflow_object in flow.objects:
+            snapshot = WorkflowObjectSnapshot.objects.get(workflow=flow.workflow, object_id=workflow_object.pk)
+            assert_that(snapshot.state, equal_to(flow.get_state(self.state2)))
+            assert_that(workflow_object.river.my_field.recent_approval.transactioner, equal_to(self.user1))
+
+    def test_shouldSaveTheObjectsOneByOneWhenNotInBulk(self):
+        flow = self._build_flow(2)
+        saved = []
+
+        def on_saved(sender, instance, **kwargs):
+            saved.append(instance)
+
+        post_save.connect(on_saved, sender=ModelWithWorkflowObject)
+        try:
+            ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+            assert_that(saved, has_length(0))
+
+            ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user2, bulk=False)
+            assert_that(saved, contains_inanyorder(*flow.objects))
+        finally:
+            post_save.disconnect(on_saved, sender=ModelWithWorkflowObject)
+
+        assert_that(ModelWithWorkflowObject.objects.filter(my_field=flow.get_state(self.state3)), contains_inanyorder(*flow.objects))
+
+    def test_shouldReportTheObjectsThatCanNotBeApproved(self):
+        flow = self._build_flow(3)
+        ModelWithWorkflowObject.river.my_field.approve_many(flow.objects[:1], as_user=self.user1)
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+
+        assert_that(results[0].approved, equal_to(False))
+        assert_that(results[0].error.code, equal_to(ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER))
+        assert_that(results[0].transition_approval, none())
+        assert_that(flow.objects[0].my_field, equal_to(flow.get_state(self.state2)))
+        assert_that(results[1].approved, equal_to(True))
+        assert_that(results[2].approved, equal_to(True))
+
+    def test_shouldNotApproveAnApprovalThatIsAlreadyApprovedAfterItIsSelected(self):
+        flow = self._flow_builder(2) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+                AuthorizationPolicyBuilder().with_priority(1).with_group(self.group2).build(),
+            ]) \
+            .build()
+        selected_approvals = TransitionApproval.objects.filter(workflow=flow.workflow, priority=0)
+        stale_driver = type("StaleDriver", (object,), {"get_available_approvals": lambda driver, as_user: selected_approvals.all()})()
+        flow.objects[0].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+        approved = TransitionApproval.objects.get(workflow=flow.workflow, object_id=flow.objects[0].pk, priority=0)
+
+        results = BatchApproval(flow.workflow, self.content_type, "my_field", stale_driver).approve(flow.objects, as_user=self.user2)
+
+        assert_that(results[0].approved, equal_to(False))
+        assert_that(results[0].error.code, equal_to(ErrorCode.NO_AVAILABLE_NEXT_STATE_FOR_USER))
+        assert_that(results[1].approved, equal_to(True))
+        assert_that(TransitionApproval.objects.get(pk=approved.pk), has_properties(transactioner=self.user1, previous=none()))
+        assert_that(TransitionApproval.objects.filter(object_id=flow.objects[0].pk, status=APPROVED), has_length(1))
+        assert_that(
+            WorkflowObjectSnapshot.objects.get(workflow=flow.workflow, object_id=flow.objects[0].pk).last_approval,
+            equal_to(approved)
+        )
+
+    def test_shouldRequireTheNextStateWhenThereAreMultipleDestinations(self):
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group1).build()]
+        flow = self._flow_builder(2) \
+            .with_transition(self.state1, self.state2, authorization_policies) \
+            .with_transition(self.state1, self.state3, authorization_policies) \
+            .with_transition(self.state3, self.state4, authorization_policies) \
+            .build()
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+        assert_that([result.error.code for result in results], equal_to([ErrorCode.NEXT_STATE_IS_REQUIRED] * 2))
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(
+            flow.objects, as_user=self.user1, next_state=flow.get_state(self.state4)
+        )
+        assert_that([result.error.code for result in results], equal_to([ErrorCode.INVALID_NEXT_STATE_FOR_USER] * 2))
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(
+            flow.objects, as_user=self.user1, next_state=flow.get_state(self.state3)
+        )
+        assert_that([result.approved for result in results], equal_to([True, True]))
+        for workflow_object in flow.objects:
+            assert_that(workflow_object.my_field, equal_to(flow.get_state(self.state3)))
+            assert_that(Transition.objects.filter(workflow_object=workflow_object, workflow=flow.workflow, status=CANCELLED), has_length(1))
+            assert_that(Transition.objects.filter(workflow_object=workflow_object, workflow=flow.workflow, status=PENDING), has_length(1))
+
+    def test_shouldNotTransitUntilAllThePrioritiesAreApproved(self):
+        flow = self._flow_builder(2) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+                AuthorizationPolicyBuilder().with_priority(1).with_group(self.group2).build(),
+            ]) \
+            .build()
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+        assert_that([result.transited for result in results], equal_to([False, False]))
+        assert_that([workflow_object.my_field for workflow_object in flow.objects], equal_to([flow.get_state(self.state1)] * 2))
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user2)
+        assert_that([result.transited for result in results], equal_to([True, True]))
+        assert_that([workflow_object.my_field for workflow_object in flow.objects], equal_to([flow.get_state(self.state2)] * 2))
+        for result in results:
+            assert_that(result.transition_approval.previous, is_not(none()))
+
+    def test_shouldApproveABatchWithTheSameNumberOfQueriesWhateverTheBatchSizeIs(self):
+        flow = self._build_flow(13)
+        ModelWithWorkflowObject.river.my_field.approve_many(flow.objects[:1], as_user=self.user1)
+
+        with CaptureQueriesContext(connection) as small_batch_context:
+            ModelWithWorkflowObject.river.my_field.approve_many(flow.objects[1:3], as_user=self.user1)
+        with CaptureQueriesContext(connection) as big_batch_context:
+            ModelWithWorkflowObject.river.my_field.approve_many(flow.objects[3:], as_user=self.user1)
+
+        assert_that(len(big_batch_context.captured_queries), equal_to(len(small_batch_context.captured_queries)))
+
+    def test_shouldExecuteTheHooksOncePerBatch(self):
+        flow = self._build_flow(3)
+        self.hook_post_approve(flow.workflow, flow.transitions_approval_metas[0])
+        self.hook_post_transition(flow.workflow, flow.transitions_metas[0])
+
+        ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+
+        output = self.get_output()
+        assert_that(output, has_length(2))
+        assert_that([context["hook"]["type"] for context in output], contains_inanyorder("on-approved", "on-transit"))
+        for context in output:
+            assert_that(context["hook"], has_entries(batch=True, when="AFTER"))
+            assert_that(context["hook"]["payload"], all_of(
+                has_entry("workflow", flow.workflow),
+                has_entry("workflow_objects", equal_to(flow.objects)),
+            ))
+            assert_that(context["hook"]["payload"]["transition_approvals"], has_length(3))
@@ -0,0 +1,123 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, empty
+
+from river.driver.authorizationcache import AuthorizationCache, authorization_cache
+from river.models import TransitionApproval
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "river-authorization"}}
+
+
+class AuthorizationCacheTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group1])
+        self.state1, self.state2 = RawState("state1"), RawState("state2")
+        self.lookups = []
+
+    def _build_flow(self, objects=2):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().with_group(self.group1).build()]) \
+            .with_objects(objects) \
+            .build()
+
+    def _lookup(self, *args):
+        self.lookups.append(args)
+        return frozenset([len(self.lookups)])
+
+    def _available_approvals(self, user):
+        return ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=user)
+
+    def test_shouldNotQueryTheGroupsOfAUserTwice(self):
+        self._build_flow()
+        list(self._available_approvals(self.user1))
+
+        with self.assertNumQueries(1):
+            assert_that(list(self._available_approvals(self.user1)), has_length(2))
+
+    def test_shouldInvalidateTheGroupsOfAUserWhenTheyChange(self):
+        self._build_flow()
+        user = UserObjectFactory()
+        assert_that(list(self._available_approvals(user)), empty())
+
+        user.groups.add(self.group1)
+        assert_that(list(self._available_approvals(user)), has_length(2))
+
+        self.group1.user_set.remove(user)
+        assert_that(list(self._available_approvals(user)), empty())
+
+    def test_shouldAuthorizeAnApprovalByItsOwnGroups(self):
+        flow = self._build_flow()
+        user = UserObjectFactory(groups=[self.group2])
+        assert_that(list(self._available_approvals(user)), empty())
+
+        approval = TransitionApproval.objects.get(object_id=flow.objects[0].pk)
+        approval.groups.set([self.group2])
+
+        assert_that(list(self._available_approvals(user)), contains_inanyorder(approval))
+        assert_that(list(self._available_approvals(self.user1)), contains_inanyorder(
+            TransitionApproval.objects.get(object_id=flow.objects[1].pk)
+        ))
+
+    @override_settings(RIVER_APPROVAL_INBOX=True)
+    def test_shouldAuthorizeAnApprovalByItsOwnGroupsInTheInbox(self):
+        flow = self._build_flow()
+        user = UserObjectFactory(groups=[self.group2])
+
+        TransitionApproval.objects.get(object_id=flow.objects[0].pk).groups.set([self.group2])
+        ModelWithWorkflowObject.river.my_field.refresh_inbox(flow.objects)
+
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=user), contains_inanyorder(flow.objects[0]))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1), contains_inanyorder(flow.objects[1]))
+
+    def test_shouldExpireTheEntriesOfTheProcess(self):
+        cache = AuthorizationCache(timeout=0.05)
+
+        cache.get_group_ids(self.user1, self._lookup)
+        cache.get_group_ids(self.user1, self._lookup)
+        assert_that(self.lookups, has_length(1))
+
+        time.sleep(0.1)
+        cache.get_group_ids(self.user1, self._lookup)
+        assert_that(self.lookups, has_length(2))
+
+    def test_shouldEvictTheLeastRecentlyUsedEntries(self):
+        cache = AuthorizationCache(size=2)
+        user3 = UserObjectFactory()
+
+        cache.get_group_ids(self.user1, self._lookup)
+        cache.get_group_ids(self.user2, self._lookup)
+        cache.get_group_ids(self.user1, self._lookup)
+        cache.get_group_ids(user3, self._lookup)
+        cache.get_group_ids(self.user1, self._lookup)
+        cache.get_group_ids(self.user2, self._lookup)
+
+        assert_that([args[0] for args in self.lookups], equal_to([self.user1, self.user2, user3, self.user2]))
+
+    @override_settings(CACHES=LOCMEM_CACHES, RIVER_AUTHORIZATION_CACHE="default")
+    def test_shouldShareTheEntriesAndTheInvalidationsBetweenTheProcessesThroughTheDjangoCache(self):
+        one, another = AuthorizationCache(), AuthorizationCache()
+
+        one.get_group_ids(self.user1, self._lookup)
+        another.get_group_ids(self.user1, self._lookup)
+        assert_that(self.lookups, has_length(1))
+
+        one.invalidate_user(self.user1.pk)
+        another.get_group_ids(self.user1, self._lookup)
+        assert_that(self.lookups, has_length(2))
+
+        authorization_cache.invalidate_user()
+        one.get_group_ids(self.user1, self._lookup)
+        assert_that(self.lookups, has_length(3))
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, has_length, greater_than, contains_string, has_entries, calling, raises, has_key, is_not
+
+from river.models import Workflow, State, Transition
+from river.tests.models import ModelWithWorkflowObject
+
+OPERATIONS = [
+    "initialize_many", "initialize_approvals", "get_available_approvals", "get_on_approval_objects",
+    "approve", "jump_to", "approve_many", "jump_many",
+]
+SHAPE = ["--states", "4", "--fan-out", "2", "--approvals", "2", "--cycles", "1", "--sample", "2", "--batch-size", "3"]
+
+
+# noinspection PyMethodMayBeStatic
+class RiverBenchTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.report_path = os.path.join(self.directory, "report.json")
+        self.baseline_path = os.path.join(self.directory, "baseline.json")
+
+    def tearDown(self):
+        for path in [self.report_path, self.baseline_path]:
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(self.directory)
+
+    def _bench(self, *args):
+        out = StringIO()
+        call_command("river_bench", "--objects", "5", *(SHAPE + list(args)), stdout=out)
+        return out.getvalue()
+
+    def _write_baseline(self, queries, seconds):
+        with open(self.report_path) as report_file:
+            baseline = json.load(report_file)
+        for operation in baseline["runs"][0]["operations"].values():
+            operation["queries"] = queries
+            operation["seconds"] = seconds
+        with open(self.baseline_path, "w") as baseline_file:
+            json.dump(baseline, baseline_file)
+
+    def test_shouldTimeEveryPathAndRollEverythingBack(self):
+        self._bench("--output", self.report_path)
+
+        with open(self.report_path) as report_file:
+            report = json.load(report_file)
+        assert_that(report["workflow"], equal_to({"states": 4, "fan_out": 2, "approvals": 2, "cycles": 1}))
+        assert_that(report["runs"], has_length(1))
+        assert_that(report["runs"][0]["objects"], equal_to(5))
+        assert_that(sorted(report["runs"][0]["operations"]), equal_to(sorted(OPERATIONS)))
+        for operation in report["runs"][0]["operations"].values():
+            assert_that(operation, is_not(has_key("error")))
+            assert_that(operation["queries"], greater_than(0))
+            assert_that(operation["calls"], greater_than(0))
+        assert_that(report["runs"][0]["operations"]["approve_many"], has_entries(objects=5, calls=2))
+        assert_that(report["runs"][0]["operations"]["approve"], has_entries(objects=2, calls=2))
+
+        assert_that(Workflow.objects.all(), has_length(0))
+        assert_that(State.objects.all(), has_length(0))
+        assert_that(Transition.objects.all(), has_length(0))
+        assert_that(ModelWithWorkflowObject.objects.all(), has_length(0))
+        assert_that(ModelWithWorkflowObject.river.my_field.workflow, equal_to(None))
+
+    def test_shouldPassWhenThereIsNoRegressionAgainstTheBaseline(self):
+        self._bench("--output", self.report_path)
+        self._write_baseline(queries=1000000, seconds=1000000)
+
+        assert_that(self._bench("--baseline", self.baseline_path), contains_string("No regression against the baseline"))
+
+    def test_shouldFailWhenTheQueriesOrTheTimesRegressAgainstTheBaseline(self):
+        self._bench("--output", self.report_path)
+        self._write_baseline(queries=0, seconds=0)
+
+        assert_that(calling(self._bench).with_args("--baseline", self.baseline_path), raises(CommandError, "approve_many with 5 objects runs"))
+        assert_that(calling(self._bench).with_args("--baseline", self.baseline_path), raises(CommandError, "jump_to with 5 objects takes"))
+
+    def test_shouldNotCompareWithTheBaselineOfAnotherWorkflow(self):
+        self._bench("--output", self.report_path)
+        self._write_baseline(queries=1000000, seconds=1000000)
+
+        assert_that(
+            calling(self._bench).with_args("--baseline", self.baseline_path, "--states", "5"),
+            raises(CommandError, "The baseline is run on a different workflow")
+        )
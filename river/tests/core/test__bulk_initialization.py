@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder
+
+from river.models import Transition, TransitionApproval, PENDING
+from river.models.factories import GroupObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class BulkInitializationTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+
+    def _build_flow(self, size, prefix):
+        authorization_policies = [
+            AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+            AuthorizationPolicyBuilder().with_priority(1).with_groups([self.group1, self.group2]).build(),
+        ]
+        flow_builder = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_objects(0)
+        for i in range(size):
+            flow_builder.with_transition(RawState("%s_%s" % (prefix, i)), RawState("%s_%s" % (prefix, i + 1)), authorization_policies)
+        return flow_builder.build()
+
+    def test_shouldInitializeAllTheTransitionsAndApprovals(self):
+        flow = self._build_flow(3, "s")
+
+        workflow_object = ModelWithWorkflowObjectFactory().model
+
+        transitions = Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object)
+        assert_that(transitions, has_length(3))
+        assert_that(list(transitions.order_by("iteration").values_list("iteration", flat=True)), equal_to([0, 1, 2]))
+
+        approvals = TransitionApproval.objects.filter(workflow=flow.workflow, workflow_object=workflow_object, status=PENDING)
+        assert_that(approvals, has_length(6))
+        for approval in approvals:
+            assert_that(approval.priority, equal_to(approval.meta.priority))
+            assert_that(list(approval.groups.all()), contains_inanyorder(*approval.meta.groups.all()))
+
+    def test_shouldBeIdempotent(self):
+        flow = self._build_flow(3, "s")
+
+        workflow_object = ModelWithWorkflowObjectFactory().model
+        workflow_object.river.my_field._create_transition_approvals()
+
+        assert_that(Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object), has_length(3))
+        assert_that(TransitionApproval.objects.filter(workflow=flow.workflow, workflow_object=workflow_object), has_length(6))
+        assert_that(TransitionApproval.groups.through.objects.filter(transitionapproval__workflow=flow.workflow), has_length(9))
+
+    def test_shouldInitializeWithTheSameNumberOfQueriesWhateverTheWorkflowSizeIs(self):
+        self._build_flow(2, "small")
+        ModelWithWorkflowObjectFactory()
+        with CaptureQueriesContext(connection) as small_workflow_context:
+            ModelWithWorkflowObjectFactory()
+
+        ModelWithWorkflowObject.river.my_field.workflow.delete()
+        self._build_flow(40, "big")
+        ModelWithWorkflowObjectFactory()
+        with CaptureQueriesContext(connection) as big_workflow_context:
+            ModelWithWorkflowObjectFactory()
+
+        assert_that(len(big_workflow_context.captured_queries), equal_to(len(small_workflow_context.captured_queries)))
+
+    def test_shouldInitializeObjectsThatAreCreatedInBulk(self):
+        flow = self._build_flow(3, "s")
+
+        ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject() for _ in range(10)])
+        workflow_objects = ModelWithWorkflowObject.objects.all()
+        assert_that(Transition.objects.filter(workflow=flow.workflow), has_length(0))
+
+        initialized = ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects, batch_size=4)
+
+        assert_that(initialized, equal_to(10))
+        assert_that(ModelWithWorkflowObject.objects.filter(my_field=flow.workflow.initial_state), has_length(10))
+        assert_that(Transition.objects.filter(workflow=flow.workflow), has_length(30))
+        assert_that(TransitionApproval.objects.filter(workflow=flow.workflow, status=PENDING), has_length(60))
+
+        assert_that(ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects, batch_size=4), equal_to(0))
+        assert_that(Transition.objects.filter(workflow=flow.workflow), has_length(30))
+
+    def test_shouldInitializeABatchWithTheSameNumberOfQueriesWhateverTheBatchSizeIs(self):
+        self._build_flow(3, "s")
+
+        ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject() for _ in range(11)])
+        workflow_objects = list(ModelWithWorkflowObject.objects.all())
+        ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects[:1])
+
+        with CaptureQueriesContext(connection) as small_batch_context:
+            ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects[1:3])
+        with CaptureQueriesContext(connection) as big_batch_context:
+            ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects[3:])
+
+        assert_that(len(big_batch_context.captured_queries), equal_to(len(small_batch_context.captured_queries)))
+        assert_that(workflow_objects[10].my_field, equal_to(ModelWithWorkflowObject.river.my_field.initial_state))
+
+    def test_shouldInitializeExistingObjectsWithTheManagementCommand(self):
+        flow = self._build_flow(2, "s")
+
+        ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject() for _ in range(5)])
+
+        out = StringIO()
+        call_command("river_initialize", "tests.ModelWithWorkflowObject", "--batch-size", "2", stdout=out)
+
+        assert_that(out.getvalue(), equal_to("5 objects are initialized for tests.ModelWithWorkflowObject.my_field\n"))
+        assert_that(ModelWithWorkflowObject.objects.filter(my_field=flow.workflow.initial_state), has_length(5))
+        assert_that(Transition.objects.filter(workflow=flow.workflow), has_length(10))
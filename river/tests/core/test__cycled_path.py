@@ -0,0 +1,112 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder
+
+from river.models import Transition, TransitionApproval, PENDING, DONE
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class CycledPathTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+
+    def _build_cycle(self, size):
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        cycle_states = [RawState("cycle_state_%s" % i) for i in range(size)]
+        flow_builder = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model)
+        for source_state, destination_state in zip(cycle_states, cycle_states[1:] + cycle_states[:1]):
+            flow_builder.with_transition(source_state, destination_state, authorization_policies)
+        flow_builder.with_transition(cycle_states[-1], RawState("final_state"), authorization_policies)
+        return flow_builder.build(), cycle_states
+
+    def _go_around(self, flow, cycle_states):
+        workflow_object = flow.objects[0]
+        for _ in cycle_states[1:]:
+            ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user)
+        return workflow_object
+
+    def test_shouldReCreateTheCycledPathWithTheNextIterations(self):
+        flow, cycle_states = self._build_cycle(3)
+        workflow_object = self._go_around(flow, cycle_states)
+
+        closing_approval = TransitionApproval.objects.filter(
+            workflow=flow.workflow, workflow_object=workflow_object, transition__destination_state=flow.get_state(cycle_states[0])
+        ).get()
+        extra_group = GroupObjectFactory()
+        closing_approval.groups.add(extra_group)
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(
+            [workflow_object], as_user=self.user, next_state=flow.get_state(cycle_states[0])
+        )
+        assert_that(results[0].transited, equal_to(True))
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(cycle_states[0])))
+
+        pending_transitions = Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object, status=PENDING)
+        assert_that(
+            list(pending_transitions.values_list("source_state__label", "destination_state__label", "iteration")),
+            contains_inanyorder(
+                ("cycle_state_0", "cycle_state_1", 3),
+                ("cycle_state_1", "cycle_state_2", 4),
+                ("cycle_state_2", "cycle_state_0", 5),
+                ("cycle_state_2", "final_state", 5),
+            )
+        )
+        cycled_closing_approval = TransitionApproval.objects.filter(
+            workflow=flow.workflow, workflow_object=workflow_object, transition__iteration=5,
+            transition__destination_state=flow.get_state(cycle_states[0])
+        ).get()
+        assert_that(cycled_closing_approval.status, equal_to(PENDING))
+        assert_that(list(cycled_closing_approval.groups.all()), contains_inanyorder(self.group, extra_group))
+
+        ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user)
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(cycle_states[1])))
+        assert_that(Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object, status=DONE), has_length(4))
+
+    def test_shouldReCreateTheCycledPathWithTheSameNumberOfQueriesWhateverTheCycleLengthIs(self):
+        flow, cycle_states = self._build_cycle(3)
+        workflow_object = self._go_around(flow, cycle_states)
+        closing_transition = Transition.objects.filter(
+            workflow=flow.workflow, workflow_object=workflow_object, destination_state=flow.get_state(cycle_states[0])
+        ).get()
+        with CaptureQueriesContext(connection) as short_cycle_context:
+            workflow_object.river.my_field._re_create_cycled_path(closing_transition)
+
+        ModelWithWorkflowObject.river.my_field.workflow.delete()
+        flow, cycle_states = self._build_cycle(12)
+        workflow_object = self._go_around(flow, cycle_states)
+        closing_transition = Transition.objects.filter(
+            workflow=flow.workflow, workflow_object=workflow_object, destination_state=flow.get_state(cycle_states[0])
+        ).get()
+        with CaptureQueriesContext(connection) as long_cycle_context:
+            workflow_object.river.my_field._re_create_cycled_path(closing_transition)
+
+        assert_that(Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object), has_length(26))
+        assert_that(len(long_cycle_context.captured_queries), equal_to(len(short_cycle_context.captured_queries)))
+
+    def test_shouldKeepThePathAheadWhenTheCycleIsEnteredFromAnotherState(self):
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        state_a, state_b, state_c, state_d = RawState("state_a"), RawState("state_b"), RawState("state_c"), RawState("state_d")
+        flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(state_a, state_b, authorization_policies) \
+            .with_transition(state_a, state_c, authorization_policies) \
+            .with_transition(state_b, state_c, authorization_policies) \
+            .with_transition(state_c, state_b, authorization_policies) \
+            .with_transition(state_c, state_d, authorization_policies) \
+            .build()
+        workflow_object = flow.objects[0]
+
+        for state in [state_c, state_b, state_c, state_d]:
+            results = ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user, next_state=flow.get_state(state))
+            assert_that(results[0].transited, equal_to(True))
+            assert_that(workflow_object.my_field, equal_to(flow.get_state(state)))
@@ -0,0 +1,97 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, has_entries
+
+import river
+from river.core.workflowcache import workflow_cache
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject, ModelWithTwoStateFields, BasicTestModel
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "river-inbox-counts"}}
+
+
+class InboxCountsTest(TestCase):
+
+    def setUp(self):
+        workflow_cache.invalidate()
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group2])
+        self.state1, self.state2, self.state3 = RawState("state1"), RawState("state2"), RawState("state3")
+
+    def tearDown(self):
+        workflow_cache.invalidate()
+
+    def _build_flow(self, model, field_name, objects):
+        return FlowBuilder(field_name, ContentType.objects.get_for_model(model)) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().with_group(self.group1).build()]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.group2).build()]) \
+            .with_objects(objects) \
+            .build()
+
+    def _build_flows(self):
+        self._build_flow(ModelWithWorkflowObject, "my_field", 3)
+        self._build_flow(ModelWithTwoStateFields, "status1", 0)
+        self._build_flow(BasicTestModel, "my_field", 0)
+
+    def test_shouldCountTheObjectsWaitingForTheUserInEveryWorkflowInASingleQuery(self):
+        self._build_flows()
+        river.inbox_counts(self.user1)
+
+        # The groups and the permissions of the user are cached by the first call.
+        with self.assertNumQueries(1):
+            counts = river.inbox_counts(self.user1)
+        assert_that(counts, equal_to({
+            (ModelWithWorkflowObject, "my_field"): 3,
+            (ModelWithTwoStateFields, "status1"): 0,
+            (BasicTestModel, "my_field"): 0,
+        }))
+        assert_that(river.inbox_counts(self.user2), has_entries({(ModelWithWorkflowObject, "my_field"): 0}))
+
+    def test_shouldCountTheSameObjectsWithTheListing(self):
+        self._build_flows()
+        workflow_object = ModelWithWorkflowObject.objects.first()
+        workflow_object.river.my_field.approve(as_user=self.user1, groups=[self.group1])
+
+        for user in [self.user1, self.user2]:
+            counts = river.inbox_counts(user)
+            for model, field_name in [(ModelWithWorkflowObject, "my_field"), (ModelWithTwoStateFields, "status1"), (BasicTestModel, "my_field")]:
+                assert_that(
+                    counts[(model, field_name)],
+                    equal_to(getattr(model.river, field_name).get_on_approval_objects(as_user=user).count())
+                )
+
+    @override_settings(CACHES=LOCMEM_CACHES, RIVER_INBOX_COUNTS_CACHE="default")
+    def test_shouldCacheTheCountsUntilAnApprovalIsWritten(self):
+        self._build_flows()
+        assert_that(river.inbox_counts(self.user1)[(ModelWithWorkflowObject, "my_field")], equal_to(3))
+
+        with self.assertNumQueries(0):
+            assert_that(river.inbox_counts(self.user1)[(ModelWithWorkflowObject, "my_field")], equal_to(3))
+
+        workflow_object = ModelWithWorkflowObject.objects.first()
+        workflow_object.river.my_field.approve(as_user=self.user1, groups=[self.group1])
+        assert_that(river.inbox_counts(self.user1)[(ModelWithWorkflowObject, "my_field")], equal_to(2))
+
+        ModelWithWorkflowObject.river.my_field.jump_many(ModelWithWorkflowObject.objects.all(), workflow_object.my_field)
+        assert_that(river.inbox_counts(self.user1)[(ModelWithWorkflowObject, "my_field")], equal_to(0))
+        assert_that(river.inbox_counts(self.user2)[(ModelWithWorkflowObject, "my_field")], equal_to(3))
+
+    @override_settings(RIVER_APPROVAL_INBOX=True)
+    def test_shouldCountTheObjectsInTheInbox(self):
+        self._build_flows()
+
+        workflow_object = ModelWithWorkflowObject.objects.first()
+        workflow_object.river.my_field.approve(as_user=self.user1, groups=[self.group1])
+
+        assert_that(river.inbox_counts(self.user1), equal_to({
+            (ModelWithWorkflowObject, "my_field"): 2,
+            (ModelWithTwoStateFields, "status1"): 0,
+            (BasicTestModel, "my_field"): 0,
+        }))
+        assert_that(river.inbox_counts(self.user2), has_entries({(ModelWithWorkflowObject, "my_field"): 1}))
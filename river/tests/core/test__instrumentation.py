@@ -0,0 +1,118 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase, RequestFactory, override_settings
+from hamcrest import assert_that, equal_to, greater_than, contains_string, calling, raises, is_, instance_of, empty, is_not
+
+from river.instrumentation import (
+    instrumentation, InMemoryMetricsBackend, NoopMetricsBackend, OPERATIONS_TOTAL, OPERATION_QUERIES_TOTAL,
+    OPERATION_DURATION_SECONDS, OPERATION_ERRORS_TOTAL
+)
+from river.models import Function, OnApprovedHook
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.models.hook import AFTER
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+from river.views import prometheus_metrics
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+TAGS = {"workflow": "tests.modelwithworkflowobject", "field_name": "my_field"}
+
+
+class InstrumentationTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().with_group(self.group).build()]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.group).build()]) \
+            .with_objects(0) \
+            .build()
+        self.backend = InMemoryMetricsBackend()
+
+    def test_shouldNotMeasureAnythingByDefault(self):
+        assert_that(instrumentation.backend, is_(instance_of(NoopMetricsBackend)))
+        with instrumentation.instrument("approve"):
+            assert_that(connection.execute_wrappers, is_(empty()))
+
+    def test_shouldCountTheOperationsAndTheirQueries(self):
+        with override_settings(RIVER_METRICS_BACKEND=self.backend):
+            workflow_object = ModelWithWorkflowObjectFactory().model
+            ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user)
+            workflow_object.river.my_field.jump_to(self.flow.get_state(self.state3))
+            ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user)
+
+        for operation in ["initialize_approvals", "approve_many", "jump_to"]:
+            assert_that(self.backend.get_counter(OPERATIONS_TOTAL, operation=operation, **TAGS), equal_to(1))
+            assert_that(self.backend.get_counter(OPERATION_QUERIES_TOTAL, operation=operation, **TAGS), greater_than(0))
+            assert_that(self.backend.get_timing(OPERATION_DURATION_SECONDS, operation=operation, **TAGS)["count"], equal_to(1))
+        assert_that(self.backend.get_counter(OPERATIONS_TOTAL, operation="get_available_approvals", **TAGS), equal_to(1))
+        # The queryset is lazy, so its queries are not run by the operation.
+        assert_that(self.backend.render_prometheus(), is_not(contains_string('operation_queries_total{field_name="my_field",operation="get_available_approvals"')))
+
+    def test_shouldMeasureEachHookRun(self):
+        function = Function.objects.create(name="noop", body="def handle(context):\n    pass\n")
+        OnApprovedHook.objects.create(
+            workflow=self.flow.workflow,
+            callback_function=function,
+            transition_approval_meta=self.flow.transitions_approval_metas[0],
+            hook_type=AFTER,
+        )
+        workflow_object = ModelWithWorkflowObjectFactory().model
+
+        with override_settings(RIVER_METRICS_BACKEND=self.backend):
+            ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user)
+
+        assert_that(self.backend.get_counter(OPERATIONS_TOTAL, operation="hook", hook_type="on-approved", **TAGS), equal_to(1))
+
+    def test_shouldCountTheErrorsOfTheHooks(self):
+        function = Function.objects.create(name="failing", body="def handle(context):\n    raise ValueError()\n")
+        OnApprovedHook.objects.create(
+            workflow=self.flow.workflow,
+            callback_function=function,
+            transition_approval_meta=self.flow.transitions_approval_metas[0],
+            hook_type=AFTER,
+        )
+        workflow_object = ModelWithWorkflowObjectFactory().model
+
+        with override_settings(RIVER_METRICS_BACKEND=self.backend):
+            ModelWithWorkflowObject.river.my_field.approve_many([workflow_object], as_user=self.user)
+
+        assert_that(self.backend.get_counter(OPERATION_ERRORS_TOTAL, operation="hook", hook_type="on-approved", **TAGS), equal_to(1))
+        assert_that(self.backend.get_counter(OPERATIONS_TOTAL, operation="hook", hook_type="on-approved", **TAGS), equal_to(1))
+
+    def test_shouldCountTheErrors(self):
+        with override_settings(RIVER_METRICS_BACKEND=self.backend):
+            assert_that(calling(self._fail), raises(ValueError))
+
+        assert_that(self.backend.get_counter(OPERATION_ERRORS_TOTAL, operation="failing", **TAGS), equal_to(1))
+        assert_that(self.backend.get_counter(OPERATIONS_TOTAL, operation="failing", **TAGS), equal_to(1))
+
+    def _fail(self):
+        with instrumentation.instrument("failing", self.flow.workflow):
+            raise ValueError()
+
+    def test_shouldRenderTheMetricsInThePrometheusFormat(self):
+        with override_settings(RIVER_METRICS_BACKEND=self.backend):
+            ModelWithWorkflowObjectFactory()
+            response = prometheus_metrics(RequestFactory().get("/metrics"))
+
+        assert_that(response.status_code, equal_to(200))
+        assert_that(response["Content-Type"], contains_string("text/plain; version=0.0.4"))
+        content = response.content.decode()
+        assert_that(content, contains_string("# TYPE river_operations_total counter\n"))
+        assert_that(content, contains_string(
+            'river_operations_total{field_name="my_field",operation="initialize_approvals",workflow="tests.modelwithworkflowobject"} 1\n'
+        ))
+        assert_that(content, contains_string("# TYPE river_operation_duration_seconds summary\n"))
+        assert_that(content, contains_string('river_operation_duration_seconds_count{field_name="my_field",operation="initialize_approvals"'))
+
+    def test_shouldNotRenderTheMetricsOfTheNoopBackend(self):
+        assert_that(calling(prometheus_metrics).with_args(RequestFactory().get("/metrics")), raises(Http404))
@@ -0,0 +1,91 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, none, is_not
+
+from river.models import Transition, TransitionApproval, WorkflowObjectSnapshot, PENDING, JUMPED
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+from river.utils.error_code import ErrorCode
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class JumpManyTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+
+    def _build_chain(self, size, objects, prefix="state"):
+        states = [RawState("%s_%s" % (prefix, i)) for i in range(size + 1)]
+        flow_builder = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_objects(objects)
+        for source_state, destination_state in zip(states, states[1:]):
+            flow_builder.with_transition(source_state, destination_state, [AuthorizationPolicyBuilder().build()])
+        return flow_builder.build(), states
+
+    def test_shouldJumpAllTheObjectsToTheState(self):
+        flow, states = self._build_chain(4, 3)
+
+        results = ModelWithWorkflowObject.river.my_field.jump_many(flow.objects, flow.get_state(states[3]))
+
+        assert_that(results, has_length(3))
+        for workflow_object, result in zip(flow.objects, results):
+            assert_that(result.jumped, equal_to(True))
+            assert_that(result.transition.destination_state, equal_to(flow.get_state(states[3])))
+            assert_that(workflow_object.my_field, equal_to(flow.get_state(states[3])))
+            assert_that(ModelWithWorkflowObject.objects.get(pk=workflow_object.pk).my_field, equal_to(flow.get_state(states[3])))
+
+            transitions = Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object)
+            assert_that(transitions.filter(status=JUMPED), has_length(3))
+            assert_that(transitions.filter(status=PENDING), has_length(1))
+            assert_that(TransitionApproval.objects.filter(workflow=flow.workflow, workflow_object=workflow_object, status=JUMPED), has_length(3))
+
+            snapshot = WorkflowObjectSnapshot.objects.get(workflow=flow.workflow, object_id=workflow_object.pk)
+            assert_that(snapshot.state, equal_to(flow.get_state(states[3])))
+            assert_that(snapshot.iteration, equal_to(2))
+
+    def test_shouldReportTheObjectsThatCanNotBeJumped(self):
+        flow, states = self._build_chain(4, 2)
+        flow.objects[0].river.my_field.jump_to(flow.get_state(states[3]))
+
+        results = ModelWithWorkflowObject.river.my_field.jump_many(flow.objects, flow.get_state(states[2]))
+
+        assert_that(results[0].jumped, equal_to(False))
+        assert_that(results[0].transition, none())
+        assert_that(results[0].error.code, equal_to(ErrorCode.STATE_IS_NOT_AVAILABLE_TO_BE_JUMPED))
+        assert_that(flow.objects[0].my_field, equal_to(flow.get_state(states[3])))
+        assert_that(results[1].jumped, equal_to(True))
+        assert_that(results[1].transition, is_not(none()))
+        assert_that(flow.objects[1].my_field, equal_to(flow.get_state(states[2])))
+
+    def test_shouldJumpWithTheSameNumberOfQueriesWhateverIsSkipped(self):
+        flow, states = self._build_chain(12, 13)
+        ModelWithWorkflowObject.river.my_field.jump_many(flow.objects[:1], flow.get_state(states[1]))
+
+        with CaptureQueriesContext(connection) as short_jump_context:
+            ModelWithWorkflowObject.river.my_field.jump_many(flow.objects[1:3], flow.get_state(states[1]))
+        with CaptureQueriesContext(connection) as long_jump_context:
+            ModelWithWorkflowObject.river.my_field.jump_many(flow.objects[3:], flow.get_state(states[12]))
+
+        assert_that(len(long_jump_context.captured_queries), equal_to(len(short_jump_context.captured_queries)))
+
+    def test_shouldWriteOnlyTheStateFieldWhenAnObjectIsJumped(self):
+        flow, states = self._build_chain(12, 2)
+        flow.objects[0].river.my_field.jump_to(flow.get_state(states[1]))
+
+        with CaptureQueriesContext(connection) as short_jump_context:
+            flow.objects[0].river.my_field.jump_to(flow.get_state(states[2]))
+        with CaptureQueriesContext(connection) as long_jump_context:
+            flow.objects[1].river.my_field.jump_to(flow.get_state(states[12]))
+
+        assert_that(len(long_jump_context.captured_queries), equal_to(len(short_jump_context.captured_queries)))
+        object_updates = [
+            query["sql"] for query in long_jump_context.captured_queries
+            if query["sql"].startswith('UPDATE "%s"' % ModelWithWorkflowObject._meta.db_table)
+        ]
+        assert_that(object_updates, has_length(1))
+        assert_that(object_updates[0].split(" WHERE ")[0].count(" = "), equal_to(1))
+        assert_that(ModelWithWorkflowObject.objects.get(pk=flow.objects[1].pk).my_field, equal_to(flow.get_state(states[12])))
@@ -0,0 +1,142 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, has_item, all_of, has_property
+
+from river.models import Transition, TransitionApproval, WorkflowObjectSnapshot, PENDING, DONE, CANCELLED, JUMPED, LAZY
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class LazyMaterializationTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+
+    def _build_flow(self, raw_transitions, objects=1):
+        flow_builder = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_materialization(LAZY) \
+            .with_objects(objects)
+        for source_state, destination_state in raw_transitions:
+            flow_builder.with_transition(source_state, destination_state, [AuthorizationPolicyBuilder().with_group(self.group).build()])
+        return flow_builder.build()
+
+    def _build_chain(self, size, objects=1):
+        states = [RawState("state_%s" % i) for i in range(size + 1)]
+        return self._build_flow(zip(states, states[1:]), objects), states
+
+    def _transitions(self, flow, workflow_object):
+        return Transition.objects.filter(workflow=flow.workflow, object_id=workflow_object.pk)
+
+    def _approve(self, workflow_object, next_state=None):
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=workflow_object.pk)
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group], next_state=next_state)
+        return workflow_object
+
+    def _assert_pending(self, flow, workflow_object, *expected):
+        assert_that(
+            [(transition.source_state, transition.destination_state, transition.iteration)
+             for transition in self._transitions(flow, workflow_object).filter(status=PENDING)],
+            contains_inanyorder(*[(flow.get_state(source), flow.get_state(destination), iteration) for source, destination, iteration in expected])
+        )
+
+    def test_shouldCreateOnlyTheTransitionsOutOfTheInitialStateWhenAnObjectIsCreated(self):
+        flow, states = self._build_chain(5)
+        workflow_object = flow.objects[0]
+
+        assert_that(self._transitions(flow, workflow_object), has_length(1))
+        assert_that(TransitionApproval.objects.filter(workflow=flow.workflow, object_id=workflow_object.pk), has_length(1))
+        self._assert_pending(flow, workflow_object, (states[0], states[1], 0))
+        assert_that(workflow_object.river.my_field.next_approvals, has_length(1))
+
+    def test_shouldCreateTheTransitionsOutOfAStateWhenTheObjectEntersIt(self):
+        flow, states = self._build_chain(3)
+
+        workflow_object = self._approve(flow.objects[0])
+
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(states[1])))
+        assert_that(self._transitions(flow, workflow_object), has_length(2))
+        self._assert_pending(flow, workflow_object, (states[1], states[2], 1))
+        assert_that(workflow_object.river.my_field.next_approvals, has_length(1))
+
+        workflow_object = self._approve(workflow_object)
+        workflow_object = self._approve(workflow_object)
+
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(True))
+        assert_that(self._transitions(flow, workflow_object).filter(status=DONE), has_length(3))
+        assert_that(self._transitions(flow, workflow_object).filter(status=PENDING), has_length(0))
+        assert_that(WorkflowObjectSnapshot.objects.get(workflow=flow.workflow, object_id=workflow_object.pk).iteration, equal_to(2))
+
+    def test_shouldCancelTheOtherBranchesWhenTheNextStateIsGiven(self):
+        state1, state2, state3, state4 = RawState("state1"), RawState("state2"), RawState("state3"), RawState("state4")
+        flow = self._build_flow([(state1, state2), (state1, state3), (state3, state4)])
+        self._assert_pending(flow, flow.objects[0], (state1, state2, 0), (state1, state3, 0))
+
+        workflow_object = self._approve(flow.objects[0], next_state=flow.get_state(state3))
+
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(state3)))
+        assert_that(self._transitions(flow, workflow_object).filter(status=CANCELLED), has_length(1))
+        assert_that(self._transitions(flow, workflow_object).get(status=CANCELLED).destination_state, equal_to(flow.get_state(state2)))
+        self._assert_pending(flow, workflow_object, (state3, state4, 1))
+
+    def test_shouldCreateTheTransitionsAgainWhenTheObjectCyclesBack(self):
+        in_review, approved, rejected, closed = RawState("in_review"), RawState("approved"), RawState("rejected"), RawState("closed")
+        flow = self._build_flow([(in_review, approved), (in_review, rejected), (rejected, in_review), (approved, closed)])
+
+        workflow_object = self._approve(flow.objects[0], next_state=flow.get_state(rejected))
+        workflow_object = self._approve(workflow_object)
+
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(in_review)))
+        self._assert_pending(flow, workflow_object, (in_review, approved, 2), (in_review, rejected, 2))
+        approvals = ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user)
+        assert_that(approvals, has_length(2))
+
+        workflow_object = self._approve(workflow_object, next_state=flow.get_state(approved))
+        workflow_object = self._approve(workflow_object)
+
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(True))
+        assert_that(self._transitions(flow, workflow_object).filter(status=DONE), has_length(4))
+        assert_that(self._transitions(flow, workflow_object).filter(status=PENDING), has_length(0))
+
+    def test_shouldCreateTheTransitionThatIsJumpedThroughAndTheOnesOutOfTheState(self):
+        flow, states = self._build_chain(5)
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=flow.objects[0].pk)
+
+        workflow_object.river.my_field.jump_to(flow.get_state(states[3]))
+
+        assert_that(ModelWithWorkflowObject.objects.get(pk=workflow_object.pk).my_field, equal_to(flow.get_state(states[3])))
+        jumped = self._transitions(flow, workflow_object).filter(status=JUMPED)
+        assert_that(jumped, contains_inanyorder(
+            all_of(has_property("destination_state", flow.get_state(states[1])), has_property("iteration", 0)),
+            all_of(has_property("destination_state", flow.get_state(states[3])), has_property("iteration", 0)),
+        ))
+        self._assert_pending(flow, workflow_object, (states[3], states[4], 1))
+
+        workflow_object = self._approve(workflow_object)
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(states[4])))
+        self._assert_pending(flow, workflow_object, (states[4], states[5], 2))
+
+    def test_shouldInitializeApproveAndJumpManyObjects(self):
+        flow, states = self._build_chain(4, objects=0)
+        ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject() for _ in range(3)])
+        workflow_objects = list(ModelWithWorkflowObject.objects.all())
+
+        ModelWithWorkflowObject.river.my_field.initialize_many(workflow_objects)
+        assert_that(Transition.objects.filter(workflow=flow.workflow), has_length(3))
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(workflow_objects, as_user=self.user)
+        assert_that([result.transited for result in results], equal_to([True, True, True]))
+        for workflow_object in workflow_objects:
+            self._assert_pending(flow, workflow_object, (states[1], states[2], 1))
+
+        results = ModelWithWorkflowObject.river.my_field.jump_many(workflow_objects, flow.get_state(states[3]))
+        assert_that([result.jumped for result in results], equal_to([True, True, True]))
+        for workflow_object in workflow_objects:
+            assert_that(ModelWithWorkflowObject.objects.get(pk=workflow_object.pk).my_field, equal_to(flow.get_state(states[3])))
+            self._assert_pending(flow, workflow_object, (states[3], states[4], 2))
+            assert_that(self._transitions(flow, workflow_object).filter(status=JUMPED), has_item(has_property("destination_state", flow.get_state(states[3]))))
@@ -0,0 +1,93 @@
+import copy
+import pickle
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, same_instance, is_not
+
+from river.models import State
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class MemoizationTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, authorization_policies) \
+            .with_transition(self.state2, self.state3, authorization_policies) \
+            .build()
+
+    def test_shouldMemoizeTheWorkflowObjectOnTheModelInstance(self):
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=self.flow.objects[0].pk)
+
+        instance_workflow = workflow_object.river.my_field
+        assert_that(workflow_object.river.my_field, same_instance(instance_workflow))
+        assert_that(workflow_object.river.all(ModelWithWorkflowObject)[0], same_instance(instance_workflow))
+        assert_that(ModelWithWorkflowObject.objects.get(pk=workflow_object.pk).river.my_field, is_not(same_instance(instance_workflow)))
+
+    def test_shouldNotQueryTheDatabaseOnRepeatedAccesses(self):
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=self.flow.objects[0].pk)
+        workflow_object.river.my_field.get_state()
+        workflow_object.river.my_field.on_final_state
+
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                assert_that(workflow_object.river.my_field.workflow, equal_to(self.flow.workflow))
+                assert_that(workflow_object.river.my_field.content_type, equal_to(self.content_type))
+                assert_that(workflow_object.river.my_field.get_state(), equal_to(self.flow.get_state(self.state1)))
+                assert_that(workflow_object.river.my_field.on_final_state, equal_to(False))
+
+    def test_shouldResolveTheWorkflowAndTheStateAgainOnRefresh(self):
+        workflow_object = self.flow.objects[0]
+        instance_workflow = workflow_object.river.my_field
+        assert_that(instance_workflow.get_state(), equal_to(self.flow.get_state(self.state1)))
+
+        State.objects.filter(pk=self.flow.get_state(self.state1).pk).update(description="changed")
+        assert_that(instance_workflow.get_state().description, is_not(equal_to("changed")))
+
+        workflow_object.river.refresh()
+        assert_that(workflow_object.river.my_field, is_not(same_instance(instance_workflow)))
+        assert_that(workflow_object.river.my_field.get_state().description, equal_to("changed"))
+
+    def test_shouldNotShareTheMemoizedWorkflowObjectWithACopy(self):
+        workflow_object = self.flow.objects[0]
+        instance_workflow = workflow_object.river.my_field
+
+        for other in [copy.copy(workflow_object), pickle.loads(pickle.dumps(workflow_object))]:
+            assert_that(other.river.my_field, is_not(same_instance(instance_workflow)))
+            assert_that(other.river.my_field.workflow_object, same_instance(other))
+        assert_that(workflow_object.river.my_field, same_instance(instance_workflow))
+
+    def test_shouldResolveTheStateAgainWhenTheObjectIsRefreshedFromTheDatabase(self):
+        workflow_object = self.flow.objects[0]
+        instance_workflow = workflow_object.river.my_field
+        assert_that(instance_workflow.get_state(), equal_to(self.flow.get_state(self.state1)))
+
+        ModelWithWorkflowObject.objects.filter(pk=workflow_object.pk).update(my_field=self.flow.get_state(self.state2))
+        workflow_object.refresh_from_db()
+
+        assert_that(workflow_object.river.my_field, is_not(same_instance(instance_workflow)))
+        assert_that(workflow_object.river.my_field.get_state(), equal_to(self.flow.get_state(self.state2)))
+
+    def test_shouldApproveThroughTheMemoizedWorkflowObject(self):
+        workflow_object = self.flow.objects[0]
+
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+
+        assert_that(workflow_object.my_field, equal_to(self.flow.get_state(self.state3)))
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(True))
+        assert_that(ModelWithWorkflowObject.objects.get(pk=workflow_object.pk).my_field, equal_to(self.flow.get_state(self.state3)))
@@ -0,0 +1,121 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from hamcrest import assert_that, has_length, contains_inanyorder, equal_to, contains_string
+
+from river.models import TransitionApproval, PENDING
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class OrmDriverTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group2])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+
+    def _build_flow(self, objects):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+                AuthorizationPolicyBuilder().with_priority(1).with_group(self.group2).build(),
+            ]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.group1).build()]) \
+            .with_objects(objects) \
+            .build()
+
+    def _approval(self, flow, workflow_object, transition_meta, approval_meta):
+        return TransitionApproval.objects.filter(
+            workflow=flow.workflow,
+            workflow_object=workflow_object,
+            transition__meta=transition_meta,
+            meta=approval_meta
+        ).get()
+
+    def test_shouldReturnOnlyTheApprovalsWithTheHighestPriorityOfTheCurrentState(self):
+        flow = self._build_flow(2)
+
+        available_approvals = ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user1)
+        assert_that(list(available_approvals), contains_inanyorder(*[
+            self._approval(flow, workflow_object, flow.transitions_metas[0], flow.transitions_approval_metas[0])
+            for workflow_object in flow.objects
+        ]))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user2), has_length(0))
+
+        workflow_object = flow.objects[0]
+        workflow_object.river.my_field.approve(as_user=self.user1, groups=[self.group1])
+
+        available_approvals = ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user2)
+        assert_that(list(available_approvals), contains_inanyorder(
+            self._approval(flow, workflow_object, flow.transitions_metas[0], flow.transitions_approval_metas[1])
+        ))
+
+        workflow_object.river.my_field.approve(as_user=self.user2, groups=[self.group2])
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(self.state2)))
+
+        available_approvals = ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user1)
+        assert_that(list(available_approvals), contains_inanyorder(
+            self._approval(flow, workflow_object, flow.transitions_metas[1], flow.transitions_approval_metas[2]),
+            self._approval(flow, flow.objects[1], flow.transitions_metas[0], flow.transitions_approval_metas[0]),
+        ))
+
+    def test_shouldNotReturnTheApprovalsThatAreAssignedToAnotherTransactioner(self):
+        flow = self._build_flow(1)
+
+        approval = self._approval(flow, flow.objects[0], flow.transitions_metas[0], flow.transitions_approval_metas[0])
+        approval.transactioner = UserObjectFactory(groups=[self.group1])
+        approval.save()
+
+        assert_that(ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user1), has_length(0))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=approval.transactioner), has_length(1))
+
+    def test_shouldFindTheAvailableApprovalsInASingleQuery(self):
+        self._build_flow(20)
+
+        available_approvals = ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user1)
+        with self.assertNumQueries(1):
+            assert_that(list(available_approvals), has_length(20))
+            assert_that(set(approval.status for approval in available_approvals), contains_inanyorder(PENDING))
+
+    def test_shouldReturnTheObjectsThatAreWaitingForTheUser(self):
+        flow = self._build_flow(3)
+
+        flow.objects[0].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1), contains_inanyorder(*flow.objects[1:]))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user2), contains_inanyorder(flow.objects[0]))
+
+    def test_shouldFilterTheObjectsThatAreWaitingForTheUserInTheDatabase(self):
+        flow = self._build_flow(5)
+
+        on_approval_objects = ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1)
+        assert_that(str(on_approval_objects.query), contains_string("EXISTS"))
+        with self.assertNumQueries(1):
+            assert_that(list(on_approval_objects.iterator(chunk_size=2)), equal_to(sorted(flow.objects, key=lambda workflow_object: workflow_object.pk)))
+
+    def test_shouldPageThroughTheObjectsThatAreWaitingForTheUserWithAKeysetCursor(self):
+        flow = self._build_flow(5)
+        flow.objects[2].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+
+        pages, after_pk = [], None
+        while True:
+            page = list(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1, after_pk=after_pk, limit=2))
+            if not page:
+                break
+            pages.append(page)
+            after_pk = page[-1].pk
+
+        assert_that([len(page) for page in pages], equal_to([2, 2]))
+        assert_that(
+            [workflow_object for page in pages for workflow_object in page],
+            equal_to(sorted([workflow_object for workflow_object in flow.objects if workflow_object != flow.objects[2]], key=lambda workflow_object: workflow_object.pk))
+        )
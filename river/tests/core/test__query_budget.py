@@ -0,0 +1,125 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, less_than_or_equal_to, has_length
+
+from river.core.workflowcache import workflow_cache
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+WORKFLOW_SIZES = [3, 6, 12]
+OBJECT_COUNTS = [2, 20]
+
+# The most queries each API is allowed to run once the process caches are warm, not counting the savepoints.
+BUDGETS = {
+    "initialize_approvals": 7,
+    "approve": 18,
+    "approve_with_next_state": 21,
+    "jump_to": 6,
+    "get_available_approvals": 1,
+    "get_on_approval_objects": 1,
+    "on_final_state": 0,
+}
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Pins the number of the queries of every public API and checks that it doesn't grow with the size of the workflow or
+    the number of the workflow objects, so that an N+1 query pattern fails the build instead of slipping in.
+    """
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+
+    def _build_flow(self, size, objects):
+        states = [RawState("state_%s" % i) for i in range(size + 1)]
+        flow_builder = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_objects(objects) \
+            .with_transition(states[0], states[1], [AuthorizationPolicyBuilder().with_group(self.group).build()])
+        for index in range(1, size):
+            for destination_state in states[index + 1:index + 3]:
+                flow_builder.with_transition(states[index], destination_state, [AuthorizationPolicyBuilder().with_group(self.group).build()])
+        return flow_builder.build(), states
+
+    def _count_queries(self, size, objects, prepare, operation):
+        try:
+            with transaction.atomic():
+                flow, states = self._build_flow(size, objects)
+                counts = []
+                # The first run warms the process caches up.
+                for workflow_object in flow.objects[:2]:
+                    workflow_object = prepare(flow, states, workflow_object)
+                    with CaptureQueriesContext(connection) as context:
+                        operation(flow, states, workflow_object)
+                    counts.append(len([query for query in context.captured_queries if "SAVEPOINT" not in query["sql"]]))
+                transaction.set_rollback(True)
+        finally:
+            workflow_cache.invalidate()
+        return counts[-1]
+
+    def assert_within_budget(self, api, operation, prepare=None):
+        prepare = prepare or (lambda flow, states, workflow_object: ModelWithWorkflowObject.objects.get(pk=workflow_object.pk))
+        counts = {
+            (size, objects): self._count_queries(size, objects, prepare, operation)
+            for size in WORKFLOW_SIZES for objects in OBJECT_COUNTS
+        }
+        reason = "%s runs %s queries by (workflow size, object count)" % (api, counts)
+        assert_that(max(counts.values()), less_than_or_equal_to(BUDGETS[api]), reason)
+        assert_that(set(counts.values()), has_length(1), reason)
+
+    def _approve(self, flow, states, workflow_object):
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        return ModelWithWorkflowObject.objects.get(pk=workflow_object.pk)
+
+    def test_shouldInitializeApprovalsWithinTheBudget(self):
+        self.assert_within_budget(
+            "initialize_approvals",
+            lambda flow, states, workflow_object: workflow_object.river.my_field.initialize_approvals(),
+            prepare=lambda flow, states, workflow_object: ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject()])[0]
+        )
+
+    def test_shouldApproveWithinTheBudget(self):
+        self.assert_within_budget(
+            "approve",
+            lambda flow, states, workflow_object: workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        )
+
+    def test_shouldApproveWithTheNextStateWithinTheBudget(self):
+        self.assert_within_budget(
+            "approve_with_next_state",
+            lambda flow, states, workflow_object: workflow_object.river.my_field.approve(
+                as_user=self.user, groups=[self.group], next_state=flow.get_state(states[3])
+            ),
+            prepare=self._approve
+        )
+
+    def test_shouldJumpWithinTheBudget(self):
+        self.assert_within_budget(
+            "jump_to",
+            lambda flow, states, workflow_object: workflow_object.river.my_field.jump_to(flow.get_state(states[-1]))
+        )
+
+    def test_shouldGetTheAvailableApprovalsWithinTheBudget(self):
+        self.assert_within_budget(
+            "get_available_approvals",
+            lambda flow, states, workflow_object: list(ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user))
+        )
+
+    def test_shouldGetTheObjectsOnApprovalWithinTheBudget(self):
+        self.assert_within_budget(
+            "get_on_approval_objects",
+            lambda flow, states, workflow_object: list(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user))
+        )
+
+    def test_shouldTellIfItIsOnTheFinalStateWithinTheBudget(self):
+        self.assert_within_budget(
+            "on_final_state",
+            lambda flow, states, workflow_object: workflow_object.river.my_field.on_final_state,
+            prepare=self._approve
+        )
@@ -0,0 +1,111 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, empty, is_not, contains_string, calling, raises
+
+from river.driver.orm_driver import OrmDriver
+from river.driver.sql_driver import SqlDriver, render, load_template
+from river.models import TransitionApproval
+from river.models.factories import GroupObjectFactory, UserObjectFactory, PermissionObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+@override_settings(RIVER_DRIVER="river.driver.sql_driver.SqlDriver")
+class SqlDriverTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group2])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+
+    def _build_flow(self, objects):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+                AuthorizationPolicyBuilder().with_priority(1).with_group(self.group2).build(),
+            ]) \
+            .with_transition(self.state2, self.state3, [AuthorizationPolicyBuilder().with_group(self.group1).build()]) \
+            .with_objects(objects) \
+            .build()
+
+    def _drivers(self, flow):
+        return [driver_class(flow.workflow, ModelWithWorkflowObject, "my_field") for driver_class in [OrmDriver, SqlDriver]]
+
+    def test_shouldBeSelectedWithTheSetting(self):
+        self._build_flow(1)
+        assert_that(type(ModelWithWorkflowObject.river.my_field._river_driver), equal_to(SqlDriver))
+
+    def test_shouldFindTheSameApprovalsWithTheOrmDriver(self):
+        flow = self._build_flow(3)
+        flow.objects[0].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+        flow.objects[1].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+        flow.objects[1].river.my_field.approve(as_user=self.user2, groups=[self.group2])
+
+        for user in [self.user1, self.user2, UserObjectFactory()]:
+            orm_driver, sql_driver = self._drivers(flow)
+            assert_that(list(sql_driver.get_available_approvals(user)), contains_inanyorder(*orm_driver.get_available_approvals(user)))
+
+        assert_that(list(ModelWithWorkflowObject.river.my_field.get_available_approvals(as_user=self.user1)), has_length(2))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1), contains_inanyorder(flow.objects[1], flow.objects[2]))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user2), contains_inanyorder(flow.objects[0]))
+
+    def test_shouldApproveManyWithTheSqlDriver(self):
+        flow = self._build_flow(2)
+
+        results = ModelWithWorkflowObject.river.my_field.approve_many(flow.objects, as_user=self.user1)
+
+        assert_that([result.approved for result in results], equal_to([True, True]))
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user1), empty())
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=self.user2), contains_inanyorder(*flow.objects))
+
+    def test_shouldNotCheckThePermissionsOfASuperuser(self):
+        flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().build()]) \
+            .with_objects(1) \
+            .build()
+        TransitionApproval.objects.get(workflow=flow.workflow).permissions.add(PermissionObjectFactory())
+        superuser = UserObjectFactory(is_superuser=True)
+
+        assert_that(SqlDriver._get_permission_ids(superuser), empty())
+        for driver in self._drivers(flow):
+            assert_that(list(driver.get_available_approvals(superuser)), has_length(1))
+            assert_that(list(driver.get_available_approvals(self.user1)), empty())
+        assert_that(ModelWithWorkflowObject.river.my_field.get_on_approval_objects(as_user=superuser), contains_inanyorder(flow.objects[0]))
+
+    def test_shouldBindTheValuesAsParameters(self):
+        flow = self._build_flow(1)
+        sql, params = SqlDriver(flow.workflow, ModelWithWorkflowObject, "my_field")._get_available_approvals_sql(self.user1)
+
+        assert_that(sql, is_not(contains_string("IN (%s)" % self.group1.pk)))
+        assert_that(sql, contains_string('INNER JOIN "tests_modelwithworkflowobject" wo'))
+        assert_that(params, equal_to([
+            flow.workflow.pk, self.content_type.pk, "pending", self.user1.pk, "[%s]" % self.group1.pk, 0, "[]", "pending"
+        ]))
+
+    def test_shouldBindAListAsASingleParameter(self):
+        template = "{table} IN (%(ids)s) AND NOT IN (%(none)s) AND x = %(x)s"
+        parameters = {"ids": [3, 1], "none": [], "x": "a"}
+
+        assert_that(render(template, {"table": '"t"'}, parameters, "sqlite"), equal_to(('"t" IN (%s) AND NOT IN (%s) AND x = %s', ["[1, 3]", "[]", "a"])))
+        assert_that(render(template, {"table": '"t"'}, parameters, "postgresql"), equal_to(('"t" IN (%s) AND NOT IN (%s) AND x = %s', [[1, 3], [], "a"])))
+
+    def test_shouldRenderTheSameStatementWhateverTheNumberOfTheGroupsIs(self):
+        flow = self._build_flow(1)
+        driver = SqlDriver(flow.workflow, ModelWithWorkflowObject, "my_field")
+
+        sql, _ = driver._get_available_approvals_sql(self.user1)
+        assert_that(driver._get_available_approvals_sql(UserObjectFactory(groups=[self.group1, self.group2]))[0], equal_to(sql))
+        assert_that(driver._get_available_approvals_sql(UserObjectFactory())[0], equal_to(sql))
+
+    def test_shouldFailWhenThereIsNoTemplateForTheVendor(self):
+        assert_that(calling(load_template).with_args("oracle", "get_available_approvals"), raises(ImproperlyConfigured))
@@ -0,0 +1,66 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, same_instance, is_not, none
+
+from river.core.workflowcache import WorkflowCache, workflow_cache
+from river.models.factories import StateObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class WorkflowCacheTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        workflow_cache.invalidate()
+
+    def _build_flow(self):
+        return FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [AuthorizationPolicyBuilder().build()]) \
+            .with_objects(0) \
+            .build()
+
+    def test_shouldNotQueryTheWorkflowOnceItIsCached(self):
+        flow = self._build_flow()
+        ModelWithWorkflowObject.river.my_field.initial_state
+
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                assert_that(ModelWithWorkflowObject.river.my_field.workflow, equal_to(flow.workflow))
+                assert_that(ModelWithWorkflowObject.river.my_field.initial_state, equal_to(flow.get_state(self.state1)))
+
+    def test_shouldInvalidateTheCacheWhenTheWorkflowChanges(self):
+        assert_that(ModelWithWorkflowObject.river.my_field.workflow, none())
+
+        flow = self._build_flow()
+        assert_that(ModelWithWorkflowObject.river.my_field.workflow, equal_to(flow.workflow))
+
+        new_initial_state = StateObjectFactory(label="state0")
+        flow.workflow.initial_state = new_initial_state
+        flow.workflow.save()
+        assert_that(ModelWithWorkflowObject.river.my_field.initial_state, equal_to(new_initial_state))
+
+        flow.workflow.delete()
+        assert_that(ModelWithWorkflowObject.river.my_field.workflow, none())
+
+    def test_shouldKeepTheProcessesCoherentThroughTheSharedVersion(self):
+        flow = self._build_flow()
+        cache_of_one_process = WorkflowCache(cache_alias="default")
+        cache_of_another_process = WorkflowCache(cache_alias="default")
+
+        workflow = cache_of_one_process.get(self.content_type, "my_field")
+        assert_that(cache_of_another_process.get(self.content_type, "my_field"), equal_to(flow.workflow))
+        with self.assertNumQueries(0):
+            assert_that(cache_of_one_process.get(self.content_type, "my_field"), same_instance(workflow))
+
+        cache_of_another_process.invalidate()
+
+        with self.assertNumQueries(1):
+            reloaded_workflow = cache_of_one_process.get(self.content_type, "my_field")
+        assert_that(reloaded_workflow, is_not(same_instance(workflow)))
+        assert_that(reloaded_workflow, equal_to(flow.workflow))
@@ -0,0 +1,176 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, contains_inanyorder, is_, same_instance, is_not, empty, calling, raises, \
+    has_item, contains_string
+
+from river.core.workflowgraph import workflow_graph_cache, PerWorkflowCache, WorkflowGraph
+from river.models import Transition, TransitionApproval
+from river.models.factories import GroupObjectFactory, UserObjectFactory, TransitionMetaFactory, StateObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+from river.utils.exceptions import RiverException
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class WorkflowGraphTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+
+    def _flow_builder(self):
+        return FlowBuilder("my_field", self.content_type).with_object_factory(lambda: ModelWithWorkflowObjectFactory().model)
+
+    def test_shouldCompileTheWorkflowDefinition(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+        state3 = RawState("state3")
+        state4 = RawState("state4")
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        flow = self._flow_builder() \
+            .with_transition(state1, state2, authorization_policies) \
+            .with_transition(state2, state3, authorization_policies) \
+            .with_transition(state2, state4, authorization_policies) \
+            .with_objects(0) \
+            .build()
+
+        graph = workflow_graph_cache.get(flow.workflow)
+
+        assert_that(graph.initial_state, equal_to(flow.get_state(state1)))
+        assert_that(graph.final_state_ids, contains_inanyorder(flow.get_state(state3).pk, flow.get_state(state4).pk))
+        assert_that(graph.outgoing(flow.get_state(state2).pk), contains_inanyorder(*flow.transitions_metas[1:]))
+        assert_that(graph.incoming(flow.get_state(state2).pk), contains_inanyorder(flow.transitions_metas[0]))
+        assert_that(graph.outgoing(flow.get_state(state3).pk), is_(empty()))
+        assert_that(graph.levels, has_length(2))
+        assert_that(graph.levels[0], contains_inanyorder(flow.transitions_metas[0]))
+        assert_that(graph.levels[1], contains_inanyorder(*flow.transitions_metas[1:]))
+        assert_that(graph.approval_metas(flow.transitions_metas[0].pk), contains_inanyorder(flow.transitions_approval_metas[0]))
+        assert_that(graph.groups(flow.transitions_approval_metas[0].pk), contains_inanyorder(self.group.pk))
+
+    def test_shouldNotQueryTheDatabaseOnceTheGraphIsCompiled(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+
+        flow = self._flow_builder().with_transition(state1, state2, []).with_objects(0).build()
+
+        graph = workflow_graph_cache.get(flow.workflow)
+        with self.assertNumQueries(0):
+            assert_that(workflow_graph_cache.get(flow.workflow), same_instance(graph))
+            assert_that(graph.is_final(flow.get_state(state2).pk), equal_to(True))
+
+    def test_shouldInvalidateTheGraphWhenTheDefinitionChanges(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+
+        flow = self._flow_builder() \
+            .with_transition(state1, state2, [AuthorizationPolicyBuilder().build()]) \
+            .with_objects(0) \
+            .build()
+
+        graph = workflow_graph_cache.get(flow.workflow)
+        state3 = StateObjectFactory(label="state3")
+        TransitionMetaFactory.create(workflow=flow.workflow, source_state=flow.get_state(state2), destination_state=state3)
+
+        recompiled_graph = workflow_graph_cache.get(flow.workflow)
+        assert_that(recompiled_graph, is_not(same_instance(graph)))
+        assert_that(recompiled_graph.final_state_ids, contains_inanyorder(state3.pk))
+
+        flow.transitions_approval_metas[0].groups.add(self.group)
+        assert_that(workflow_graph_cache.get(flow.workflow).groups(flow.transitions_approval_metas[0].pk), contains_inanyorder(self.group.pk))
+
+    def test_shouldKeepTheProcessesCoherentThroughTheSharedVersion(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+
+        flow = self._flow_builder().with_transition(state1, state2, []).with_objects(0).build()
+        cache_of_one_process = PerWorkflowCache(WorkflowGraph.build, cache_alias="default")
+        cache_of_another_process = PerWorkflowCache(WorkflowGraph.build, cache_alias="default")
+
+        graph = cache_of_one_process.get(flow.workflow)
+        cache_of_another_process.get(flow.workflow)
+        with self.assertNumQueries(0):
+            assert_that(cache_of_one_process.get(flow.workflow), same_instance(graph))
+
+        cache_of_another_process.invalidate(flow.workflow.pk)
+
+        assert_that(cache_of_one_process.get(flow.workflow), is_not(same_instance(graph)))
+
+    def test_shouldInitializeAndApproveWithTheCompiledGraph(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+        state3 = RawState("state3")
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        flow = self._flow_builder() \
+            .with_transition(state1, state2, authorization_policies) \
+            .with_transition(state2, state3, authorization_policies) \
+            .build()
+
+        workflow_object = flow.objects[0]
+
+        transitions = Transition.objects.filter(workflow=flow.workflow, workflow_object=workflow_object)
+        assert_that(transitions, has_length(2))
+        assert_that(list(transitions.order_by("iteration").values_list("iteration", flat=True)), equal_to([0, 1]))
+
+        approvals = TransitionApproval.objects.filter(workflow=flow.workflow, workflow_object=workflow_object)
+        assert_that(approvals, has_length(2))
+        assert_that(list(approvals[0].groups.all()), equal_to([self.group]))
+
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(state1)))
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(state2)))
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(False))
+
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(state3)))
+        assert_that(workflow_object.river.my_field.on_final_state, equal_to(True))
+
+    def test_shouldComputeTheReachabilityOfTheStates(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+        state3 = RawState("state3")
+        state4 = RawState("state4")
+
+        flow = self._flow_builder() \
+            .with_transition(state1, state2, []) \
+            .with_transition(state2, state3, []) \
+            .with_transition(state3, state2, []) \
+            .with_transition(state1, state4, []) \
+            .with_objects(0) \
+            .build()
+
+        graph = workflow_graph_cache.get(flow.workflow)
+        assert_that(graph.can_reach(flow.get_state(state1).pk, flow.get_state(state3).pk), equal_to(True))
+        assert_that(graph.can_reach(flow.get_state(state2).pk, flow.get_state(state2).pk), equal_to(True))
+        assert_that(graph.can_reach(flow.get_state(state3).pk, flow.get_state(state1).pk), equal_to(False))
+        assert_that(graph.can_reach(flow.get_state(state4).pk, flow.get_state(state4).pk), equal_to(False))
+        assert_that(graph.reachable_state_ids(flow.get_state(state3).pk), contains_inanyorder(
+            flow.get_state(state2).pk, flow.get_state(state3).pk
+        ))
+        assert_that(graph.reachable_state_ids(flow.get_state(state4).pk), contains_inanyorder(flow.get_state(state4).pk))
+
+    def test_shouldRejectAJumpToAStateThatCanNotBeReachedWithoutLookingForTheTransitions(self):
+        state1 = RawState("state1")
+        state2 = RawState("state2")
+        state3 = RawState("state3")
+
+        flow = self._flow_builder() \
+            .with_transition(state1, state2, [AuthorizationPolicyBuilder().build()]) \
+            .with_transition(state2, state3, [AuthorizationPolicyBuilder().build()]) \
+            .build()
+        workflow_object = flow.objects[0]
+        workflow_object.river.my_field.jump_to(flow.get_state(state2))
+        workflow_graph_cache.get(flow.workflow)
+
+        with CaptureQueriesContext(connection) as context:
+            assert_that(
+                calling(workflow_object.river.my_field.jump_to).with_args(flow.get_state(state1)),
+                raises(RiverException, "This state is not available to be jumped in the future of this object")
+            )
+        assert_that([query["sql"] for query in context.captured_queries], is_not(has_item(contains_string("river_transition"))))
+        assert_that(workflow_object.my_field, equal_to(flow.get_state(state2)))
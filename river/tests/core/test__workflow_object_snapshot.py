@@ -0,0 +1,146 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from hamcrest import assert_that, equal_to, has_length, none, not_none, has_properties
+
+from river.models import WorkflowObjectSnapshot, TransitionApproval, APPROVED
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+class WorkflowObjectSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, authorization_policies) \
+            .with_transition(self.state2, self.state3, authorization_policies) \
+            .build()
+
+    def _snapshot(self, workflow_object):
+        return WorkflowObjectSnapshot.objects.get(content_type=self.content_type, object_id=workflow_object.pk, workflow=self.flow.workflow)
+
+    def test_shouldTakeTheSnapshotWhenTheObjectIsCreated(self):
+        assert_that(self._snapshot(self.flow.objects[0]), has_properties(
+            state=self.flow.get_state(self.state1),
+            iteration=0,
+            last_approval=none(),
+            completed=False,
+            last_transition_date=none()
+        ))
+
+    def test_shouldUpdateTheSnapshotOnEveryApproval(self):
+        workflow_object = self.flow.objects[0]
+
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        first_approval = TransitionApproval.objects.filter(workflow_object=workflow_object, status=APPROVED).get()
+        assert_that(self._snapshot(workflow_object), has_properties(
+            state=self.flow.get_state(self.state2),
+            iteration=0,
+            last_approval=first_approval,
+            completed=False,
+            last_transition_date=not_none()
+        ))
+
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        second_approval = TransitionApproval.objects.filter(workflow_object=workflow_object, status=APPROVED).exclude(pk=first_approval.pk).get()
+        assert_that(second_approval.previous, equal_to(first_approval))
+        assert_that(self._snapshot(workflow_object), has_properties(
+            state=self.flow.get_state(self.state3),
+            iteration=1,
+            last_approval=second_approval,
+            completed=True
+        ))
+
+    def test_shouldFindTheRecentApprovalWithASingleQuery(self):
+        self.flow.objects[0].river.my_field.approve(as_user=self.user, groups=[self.group])
+
+        workflow_object = ModelWithWorkflowObject.objects.get(pk=self.flow.objects[0].pk)
+        with self.assertNumQueries(1):
+            recent_approval = workflow_object.river.my_field.recent_approval
+        assert_that(recent_approval, equal_to(TransitionApproval.objects.filter(workflow_object=workflow_object, status=APPROVED).get()))
+
+    def test_shouldUpdateTheSnapshotOnJump(self):
+        workflow_object = self.flow.objects[0]
+
+        workflow_object.river.my_field.jump_to(self.flow.get_state(self.state3))
+
+        assert_that(self._snapshot(workflow_object), has_properties(
+            state=self.flow.get_state(self.state3),
+            iteration=1,
+            last_approval=none(),
+            completed=True,
+            last_transition_date=not_none()
+        ))
+
+    def test_shouldTakeTheSnapshotOfTheObjectsThatDoNotHaveOne(self):
+        workflow_object = self.flow.objects[0]
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+        WorkflowObjectSnapshot.objects.all().delete()
+
+        workflow_object.river.refresh()
+        assert_that(workflow_object.river.my_field.snapshot, has_properties(
+            state=self.flow.get_state(self.state2),
+            iteration=0,
+            last_approval=TransitionApproval.objects.filter(workflow_object=workflow_object, status=APPROVED).get(),
+            completed=False
+        ))
+        assert_that(WorkflowObjectSnapshot.objects.all(), has_length(1))
+
+    def test_shouldTakeTheSnapshotsOfTheObjectsThatAreInitializedInBulk(self):
+        ModelWithWorkflowObject.objects.bulk_create([ModelWithWorkflowObject() for _ in range(5)])
+
+        ModelWithWorkflowObject.river.my_field.initialize_many(ModelWithWorkflowObject.objects.all(), batch_size=2)
+
+        snapshots = WorkflowObjectSnapshot.objects.filter(workflow=self.flow.workflow, state=self.flow.get_state(self.state1))
+        assert_that(snapshots, has_length(6))
+
+    def test_shouldDeleteTheSnapshotWhenTheObjectIsDeleted(self):
+        self.flow.objects[0].delete()
+
+        assert_that(WorkflowObjectSnapshot.objects.all(), has_length(0))
+
+
+class ConcurrentApprovalSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group1 = GroupObjectFactory()
+        self.group2 = GroupObjectFactory()
+        self.user1 = UserObjectFactory(groups=[self.group1])
+        self.user2 = UserObjectFactory(groups=[self.group2])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, [
+                AuthorizationPolicyBuilder().with_priority(0).with_group(self.group1).build(),
+                AuthorizationPolicyBuilder().with_priority(1).with_group(self.group2).build(),
+            ]) \
+            .build()
+
+    def test_shouldNotApproveOverAStaleSnapshot(self):
+        stale_object = ModelWithWorkflowObject.objects.get(pk=self.flow.objects[0].pk)
+        assert_that(stale_object.river.my_field.snapshot, has_properties(last_approval=none()))
+
+        self.flow.objects[0].river.my_field.approve(as_user=self.user1, groups=[self.group1])
+        stale_object.river.my_field.approve(as_user=self.user2, groups=[self.group2])
+
+        first_approval, second_approval = TransitionApproval.objects.filter(workflow_object=stale_object).order_by("priority")
+        assert_that(second_approval.previous, equal_to(first_approval))
+        assert_that(WorkflowObjectSnapshot.objects.get(object_id=stale_object.pk, workflow=self.flow.workflow), has_properties(
+            state=self.flow.get_state(self.state2),
+            last_approval=second_approval,
+            completed=True
+        ))
@@ -0,0 +1,97 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, has_length, has_entry, is_not, contains_string, calling, raises, empty
+
+import river
+from river.core.hookregistry import hook_registry
+from river.models import Function
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.models.hook import BEFORE, AFTER
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection DuplicatedCode
+from rivertest.flowbuilder import RawState, AuthorizationPolicyBuilder, FlowBuilder
+
+
+class CodeHooksTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+        self.state1 = RawState("state1")
+        self.state2 = RawState("state2")
+        self.state3 = RawState("state3")
+
+        authorization_policies = [
+            AuthorizationPolicyBuilder().with_priority(0).with_group(self.group).build(),
+            AuthorizationPolicyBuilder().with_priority(1).with_group(self.group).build(),
+        ]
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, authorization_policies) \
+            .with_transition(self.state2, self.state3, authorization_policies) \
+            .build()
+        self.calls = []
+
+    def _register(self, decorator):
+        def callback(context):
+            self.calls.append(context)
+
+        decorator(callback)
+        self.addCleanup(hook_registry.unregister, callback)
+
+    def _approve(self, *next_states):
+        for next_state in next_states:
+            self.flow.objects[0].river.my_field.approve(as_user=self.user, groups=[self.group], next_state=self.flow.get_state(next_state))
+
+    def test_shouldCallTheRegisteredTransitHooks(self):
+        self._register(river.on_transit(workflow="tests.ModelWithWorkflowObject.my_field", source="state2", destination="state3"))
+
+        self._approve(self.state2, self.state2)
+        assert_that(self.calls, has_length(0))
+
+        self._approve(self.state3, self.state3)
+        assert_that(self.calls, has_length(1))
+        assert_that(self.calls[0]["hook"], has_entry("type", "on-transit"))
+        assert_that(self.calls[0]["hook"], has_entry("when", AFTER))
+        assert_that(self.calls[0]["hook"]["payload"], has_entry("workflow_object", self.flow.objects[0]))
+
+    def test_shouldCallTheRegisteredApprovedHooksOfTheGivenPriority(self):
+        self._register(river.on_approved(workflow="tests.modelwithworkflowobject.my_field", priority=1, when=BEFORE))
+
+        self._approve(self.state2, self.state2, self.state3, self.state3)
+
+        assert_that(self.calls, has_length(2))
+        assert_that([context["hook"]["payload"]["transition_approval"].priority for context in self.calls], equal_to([1, 1]))
+        assert_that([context["hook"]["when"] for context in self.calls], equal_to([BEFORE, BEFORE]))
+
+    def test_shouldCallTheRegisteredCompleteHooks(self):
+        self._register(river.on_complete(workflow="tests.ModelWithWorkflowObject.my_field"))
+
+        self._approve(self.state2, self.state2, self.state3, self.state3)
+
+        assert_that(self.calls, has_length(1))
+        assert_that(self.calls[0]["hook"], has_entry("type", "on-complete"))
+
+    def test_shouldNotReadTheDatabaseNorExecuteAnyFunctionToCallTheRegisteredHooks(self):
+        self._register(river.on_transit(workflow="tests.ModelWithWorkflowObject.my_field"))
+        self._approve(self.state2, self.state2)
+
+        with CaptureQueriesContext(connection) as context:
+            self._approve(self.state3, self.state3)
+
+        assert_that(self.calls, has_length(2))
+        assert_that(Function.objects.all(), empty())
+        for query in context.captured_queries:
+            assert_that(query["sql"], is_not(contains_string("river_ontransithook")))
+
+    def test_shouldNotAcceptAnUnknownWorkflow(self):
+        assert_that(calling(river.on_transit(workflow="tests.ModelWithWorkflowObject.unknown_field")).with_args(lambda context: None),
+                    raises(ImproperlyConfigured))
+        assert_that(calling(river.on_complete(workflow="tests.UnknownModel.my_field")).with_args(lambda context: None),
+                    raises(ImproperlyConfigured))
+        assert_that(calling(river.on_complete(workflow="my_field")).with_args(lambda context: None), raises(ImproperlyConfigured))
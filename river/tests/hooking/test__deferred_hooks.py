@@ -0,0 +1,137 @@
+import threading
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, none, has_length, has_entries, greater_than
+
+from river.core.hookexecutor import HookExecutor
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.models.hook import BEFORE, AFTER
+from river.tests.hooking.base_hooking_test import BaseHookingTest
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection DuplicatedCode
+from rivertest.flowbuilder import RawState, AuthorizationPolicyBuilder, FlowBuilder
+
+
+class BlockingHook(object):
+    pk = None
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.threads = []
+
+    def execute(self, context):
+        self.threads.append(threading.current_thread().name)
+        self.started.set()
+        self.released.wait(5)
+
+
+@override_settings(RIVER_DEFERRED_HOOKS=True)
+class DeferredHooksTest(BaseHookingTest):
+
+    def setUp(self):
+        super(DeferredHooksTest, self).setUp()
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        self.flow = FlowBuilder("my_field", ContentType.objects.get_for_model(ModelWithWorkflowObject)) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(RawState("state_1"), RawState("state_2"), authorization_policies) \
+            .build()
+
+    def test_shouldExecuteTheAfterHooksOnceTheTransactionIsCommitted(self):
+        from river.core.hookexecutor import hook_executor
+
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+        self.hook_post_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.flow.objects[0].river.my_field.approve(as_user=self.user, groups=[self.group])
+            assert_that([context["hook"]["when"] for context in self.get_output()], equal_to([BEFORE]))
+
+        assert_that(callbacks, has_length(1))
+        for callback in callbacks:
+            callback()
+        assert_that(hook_executor.drain(timeout=5), equal_to(True))
+
+        assert_that([context["hook"]["when"] for context in self.get_output()], equal_to([BEFORE, AFTER]))
+        assert_that(hook_executor.metrics(), has_entries(queue_depth=0, executed=greater_than(0)))
+
+    def test_shouldNotExecuteTheAfterHooksWhenTheTransactionIsRolledBack(self):
+        self.hook_post_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.flow.objects[0].river.my_field.approve(as_user=self.user, groups=[self.group])
+
+        assert_that(self.get_output(), none())
+
+
+class HookExecutorTest(TestCase):
+
+    def test_shouldExecuteTheHooksOnTheWorkersAfterTheCommit(self):
+        executor = HookExecutor(workers=2, queue_size=10, queue_timeout=1)
+        hook = BlockingHook()
+        hook.released.set()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.submit(hook, {})
+            executor.submit(hook, {})
+            assert_that(hook.threads, has_length(0))
+
+        assert_that(executor.drain(timeout=5), equal_to(True))
+        assert_that(hook.threads, has_length(2))
+        assert_that(all(name.startswith("river-hook-worker-") for name in hook.threads), equal_to(True))
+        assert_that(executor.metrics(), has_entries(workers=2, queue_depth=0, executed=2, executed_inline=0))
+        executor.shutdown(timeout=5)
+
+    def test_shouldExecuteTheHookOnTheCommittingThreadWhenTheQueueIsFull(self):
+        executor = HookExecutor(workers=1, queue_size=1, queue_timeout=0.01)
+        blocking_hook = BlockingHook()
+        inline_hook = BlockingHook()
+        inline_hook.released.set()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.submit(blocking_hook, {})
+        assert_that(blocking_hook.started.wait(5), equal_to(True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.submit(blocking_hook, {})
+            executor.submit(inline_hook, {})
+
+        assert_that(inline_hook.threads, equal_to([threading.current_thread().name]))
+        assert_that(executor.drain(timeout=0.01), equal_to(False))
+
+        blocking_hook.released.set()
+        assert_that(executor.drain(timeout=5), equal_to(True))
+        assert_that(executor.metrics(), has_entries(executed=3, executed_inline=1))
+        executor.shutdown(timeout=5)
+
+    def test_shouldShutDownWhileAWorkerIsExecutingAHookAndTheQueueIsFull(self):
+        executor = HookExecutor(workers=1, queue_size=1, queue_timeout=0.01)
+        hook = BlockingHook()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.submit(hook, {})
+        assert_that(hook.started.wait(5), equal_to(True))
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.submit(hook, {})
+
+        drain, drained = executor.drain, threading.Event()
+
+        def timed_out_drain(timeout=None):
+            result = drain(timeout)
+            drained.set()
+            return result
+
+        executor.drain = timed_out_drain
+        shutdown = threading.Thread(target=executor.shutdown, args=(2,))
+        shutdown.start()
+        assert_that(drained.wait(5), equal_to(True))
+        hook.released.set()
+        shutdown.join(10)
+
+        assert_that(shutdown.is_alive(), equal_to(False))
+        assert_that(executor.metrics(), has_entries(workers=0, queue_depth=0, executed=2, executed_inline=0))
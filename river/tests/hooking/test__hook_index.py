@@ -0,0 +1,138 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hamcrest import assert_that, equal_to, none, has_length, has_entry, all_of, is_not, has_item, contains_string, \
+    any_of, contains_inanyorder
+
+from river.core.hookindex import hook_index_cache
+from river.models import TransitionApproval, APPROVED
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from river.models import OnApprovedHook
+from river.models.hook import BEFORE, AFTER
+from river.tests.hooking.base_hooking_test import BaseHookingTest
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection DuplicatedCode
+from rivertest.flowbuilder import RawState, AuthorizationPolicyBuilder, FlowBuilder
+
+
+class HookIndexTest(BaseHookingTest):
+
+    def setUp(self):
+        super(HookIndexTest, self).setUp()
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.group = GroupObjectFactory()
+        self.user = UserObjectFactory(groups=[self.group])
+        self.state1 = RawState("state_1")
+        self.state2 = RawState("state_2")
+        self.state3 = RawState("state_3")
+
+        authorization_policies = [AuthorizationPolicyBuilder().with_group(self.group).build()]
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(self.state1, self.state2, authorization_policies) \
+            .with_transition(self.state2, self.state3, authorization_policies) \
+            .with_objects(2) \
+            .build()
+
+    def _approve(self, workflow_object):
+        workflow_object.river.my_field.approve(as_user=self.user, groups=[self.group])
+
+    def test_shouldExecuteTheApprovedHooksOfAllTheObjects(self):
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+        self.hook_post_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+
+        workflow_object = self.flow.objects[0]
+        self._approve(workflow_object)
+
+        approval = TransitionApproval.objects.filter(workflow_object=workflow_object, status=APPROVED).get()
+        output = self.get_output()
+        assert_that(output, has_length(2))
+        assert_that([context["hook"]["when"] for context in output], equal_to([BEFORE, AFTER]))
+        for context in output:
+            assert_that(context["hook"], has_entry("type", "on-approved"))
+            assert_that(context["hook"], has_entry("payload", all_of(
+                has_entry("workflow", self.flow.workflow),
+                has_entry("workflow_object", workflow_object),
+                has_entry("transition_approval", approval),
+            )))
+
+        self._approve(self.flow.objects[1])
+        assert_that(self.get_output(), has_length(4))
+
+    def test_shouldExecuteTheTransitHooksOfTheGivenObjectOnly(self):
+        workflow_object = self.flow.objects[0]
+        self.hook_post_transition(self.flow.workflow, self.flow.transitions_metas[0], workflow_object=workflow_object)
+
+        self._approve(self.flow.objects[1])
+        assert_that(self.get_output(), none())
+
+        self._approve(workflow_object)
+        output = self.get_output()
+        assert_that(output, has_length(1))
+        assert_that(output[0]["hook"], has_entry("type", "on-transit"))
+        assert_that(output[0]["hook"], has_entry("when", AFTER))
+
+    def test_shouldExecuteTheCompleteHooksWhenTheWorkflowIsComplete(self):
+        self.hook_pre_complete(self.flow.workflow)
+        self.hook_post_complete(self.flow.workflow, workflow_object=self.flow.objects[0])
+
+        workflow_object = self.flow.objects[0]
+        self._approve(workflow_object)
+        assert_that(self.get_output(), none())
+
+        self._approve(workflow_object)
+        output = self.get_output()
+        assert_that([(context["hook"]["type"], context["hook"]["when"]) for context in output], equal_to([
+            ("on-complete", BEFORE), ("on-complete", AFTER)
+        ]))
+        assert_that(output[0]["hook"]["payload"], is_not(has_item("transition_approval")))
+
+    def test_shouldNotLookTheHooksUpOnceTheIndexIsBuilt(self):
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0])
+        self.hook_post_transition(self.flow.workflow, self.flow.transitions_metas[0])
+        hook_index_cache.get(self.flow.workflow)
+
+        with CaptureQueriesContext(connection) as context:
+            self._approve(self.flow.objects[0])
+
+        assert_that(self.get_output(), has_length(2))
+        for query in context.captured_queries:
+            assert_that(query["sql"], is_not(any_of(
+                contains_string("river_onapprovedhook"),
+                contains_string("river_ontransithook"),
+                contains_string("river_oncompletehook")
+            )))
+
+    def test_shouldPickTheHooksUpThatAreCreatedAfterTheIndexIsBuilt(self):
+        hook_index_cache.get(self.flow.workflow)
+        self.hook_pre_transition(self.flow.workflow, self.flow.transitions_metas[0])
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0], workflow_object=self.flow.objects[0])
+
+        self._approve(self.flow.objects[0])
+
+        assert_that([context["hook"]["type"] for context in self.get_output()], contains_inanyorder("on-approved", "on-transit"))
+
+    def test_shouldLookTheHooksOfTheObjectUpWithASingleQuery(self):
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0], workflow_object=self.flow.objects[0])
+        self.hook_post_approve(self.flow.workflow, self.flow.transitions_approval_metas[0], workflow_object=self.flow.objects[1])
+        hook_index_cache.get(self.flow.workflow)
+
+        with CaptureQueriesContext(connection) as context:
+            self._approve(self.flow.objects[0])
+
+        assert_that(self.get_output(), has_length(1))
+        hook_queries = [query["sql"] for query in context.captured_queries if "river_onapprovedhook" in query["sql"]]
+        assert_that(hook_queries, has_length(2))
+        for query in hook_queries:
+            assert_that(query, contains_string("object_id"))
+
+    def test_shouldNotRebuildTheIndexWhenAHookOfAnObjectIsChanged(self):
+        self.hook_pre_approve(self.flow.workflow, self.flow.transitions_approval_metas[0], workflow_object=self.flow.objects[0])
+        hook = OnApprovedHook.objects.get(workflow=self.flow.workflow)
+        hook_index = hook_index_cache.get(self.flow.workflow)
+
+        hook.save()
+        hook.delete()
+
+        assert_that(hook_index_cache.get(self.flow.workflow), equal_to(hook_index))
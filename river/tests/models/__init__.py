@@ -1,7 +1,9 @@
 from uuid import uuid4
 
 from django.db import models
+from django.db.models import Q
 
+from river.models import State, TransitionApproval, TransitionApprovalMeta, APPROVED, PENDING
 from river.models.fields.state import StateField
 
 
@@ -40,4 +42,33 @@ class ModelWithTwoStateFields(models.Model):
 
 class ModelWithStringPrimaryKey(models.Model):
     custom_pk = models.CharField(max_length=200, primary_key=True, default=uuid4())
-    status = StateField()
\ No newline at end of file
+    status = StateField()
+
+class ModelWithWorkflowObject(models.Model):
+    """
+    Implements what the engine expects from a workflow object; the workflow it belongs to and the
+    approvals that are available for the given groups.
+    """
+    id = models.BigAutoField(primary_key=True)
+    my_field = StateField()
+
+    @property
+    def workflow_obj(self):
+        return self.__class__.river.my_field.workflow
+
+    def get_available_approvals(self, groups):
+        approved_metas = TransitionApproval.objects.filter(
+            workflow=self.workflow_obj,
+            object_id=str(self.pk),
+            meta__isnull=False,
+            status=APPROVED,
+            transition__status=PENDING,
+        ).values("meta")
+        return TransitionApprovalMeta.objects.filter(
+            Q(groups__isnull=True) | Q(groups__in=groups),
+            workflow=self.workflow_obj,
+            transition_meta__source_state=self.my_field,
+        ).exclude(pk__in=approved_metas).distinct()
+
+    def get_available_states(self, groups):
+        return State.objects.filter(pk__in=self.get_available_approvals(groups).values("transition_meta__destination_state"))
@@ -1,4 +1,4 @@
-from river.tests.models import BasicTestModel, ModelWithTwoStateFields
+from river.tests.models import BasicTestModel, ModelWithTwoStateFields, ModelWithWorkflowObject
 
 
 class BasicTestModelObjectFactory(object):
@@ -21,3 +21,14 @@ class ModelWithTwoStateFieldsObjectFactory(object):
         for i in range(size):
             ModelWithTwoStateFields.objects.create()
         return ModelWithTwoStateFields.objects.all()
+
+
+class ModelWithWorkflowObjectFactory(object):
+    def __init__(self):
+        self.model = ModelWithWorkflowObject.objects.create()
+
+    @staticmethod
+    def create_batch(size):
+        for i in range(size):
+            ModelWithWorkflowObject.objects.create()
+        return ModelWithWorkflowObject.objects.all()
@@ -0,0 +1,67 @@
+from django.apps import apps
+from django.test import TestCase, override_settings
+from hamcrest import assert_that, equal_to, same_instance, is_not, has_length
+
+from river.models import Function, OnCompleteHook
+from river.models.factories import WorkflowFactory
+from river.models.function import FunctionCache, function_cache
+from river.models.hook import AFTER
+
+callback_output = []
+
+callback_method = """
+from river.tests.models.test__function import callback_output
+def handle(context):
+    callback_output.append((%s, context))
+"""
+
+
+class FunctionTest(TestCase):
+
+    def setUp(self):
+        callback_output.clear()
+        function_cache.clear()
+
+    def _function(self, name, output):
+        return Function.objects.create(name=name, body=callback_method % output)
+
+    def test_shouldCompileTheFunctionOncePerVersion(self):
+        function = self._function("function1", 1)
+
+        func = function.get()
+        assert_that(Function.objects.get(pk=function.pk).get(), same_instance(func))
+
+        func({"key": "value"})
+        assert_that(callback_output, equal_to([(1, {"key": "value"})]))
+
+        function.body = callback_method % 2
+        function.save()
+        new_func = function.get()
+        assert_that(new_func, is_not(same_instance(func)))
+        new_func({})
+        assert_that(callback_output[-1], equal_to((2, {})))
+
+    def test_shouldEvictTheLeastRecentlyUsedFunctions(self):
+        cache = FunctionCache(size=2)
+        function1 = self._function("function1", 1)
+        function2 = self._function("function2", 2)
+        function3 = self._function("function3", 3)
+
+        func1 = cache.get(function1)
+        cache.get(function2)
+        assert_that(cache.get(function1), same_instance(func1))
+        cache.get(function3)
+
+        assert_that(cache, has_length(2))
+        assert_that(cache.get(function1), same_instance(func1))
+        assert_that(cache, has_length(2))
+
+    @override_settings(RIVER_WARM_UP_FUNCTIONS=True)
+    def test_shouldCompileTheHookedFunctionsInAdvance(self):
+        hooked_function = self._function("function1", 1)
+        self._function("function2", 2)
+        OnCompleteHook.objects.create(workflow=WorkflowFactory(), callback_function=hooked_function, hook_type=AFTER)
+
+        apps.get_app_config("river").ready()
+
+        assert_that(function_cache, has_length(1))
@@ -0,0 +1,64 @@
+from unittest import skipUnless
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Min
+from django.test import TestCase
+from hamcrest import assert_that, contains_string, any_of
+
+from river.models import Transition, TransitionApproval, PENDING
+from river.tests.models import ModelWithWorkflowObject
+from river.tests.models.factories import ModelWithWorkflowObjectFactory
+# noinspection PyMethodMayBeStatic,DuplicatedCode
+from rivertest.flowbuilder import RawState, FlowBuilder, AuthorizationPolicyBuilder
+
+
+@skipUnless(connection.vendor == 'sqlite', "The query plans are asserted on SQLite")
+class IndexTest(TestCase):
+
+    def setUp(self):
+        self.content_type = ContentType.objects.get_for_model(ModelWithWorkflowObject)
+        self.flow = FlowBuilder("my_field", self.content_type) \
+            .with_object_factory(lambda: ModelWithWorkflowObjectFactory().model) \
+            .with_transition(RawState("state1"), RawState("state2"), [AuthorizationPolicyBuilder().build()]) \
+            .with_transition(RawState("state2"), RawState("state3"), [AuthorizationPolicyBuilder().build()]) \
+            .with_objects(3) \
+            .build()
+        self.workflow_object = self.flow.objects[0]
+
+    def test_shouldUseTheIndexOfPendingTransitionsToCancelTheImpossibleFuture(self):
+        transitions = Transition.objects.filter(
+            workflow=self.flow.workflow,
+            content_type=self.content_type,
+            object_id=self.workflow_object.pk,
+            status=PENDING,
+            iteration__gte=1
+        )
+        assert_that(transitions.explain(), any_of(
+            contains_string("USING INDEX river_trans_pending_idx"),
+            contains_string("USING INDEX river_trans_object_status_idx")
+        ))
+
+    def test_shouldUseTheIndexOfSourceStatesToFindTheNextTransitions(self):
+        transitions = Transition.objects.filter(
+            workflow=self.flow.workflow,
+            content_type=self.content_type,
+            object_id=self.workflow_object.pk,
+            source_state=self.workflow_object.my_field
+        )
+        assert_that(transitions.explain(), contains_string("USING INDEX river_trans_object_source_idx"))
+
+    def test_shouldUseTheIndexOfPendingApprovalsToFindTheMinimumPriorities(self):
+        approvals = TransitionApproval.objects.filter(
+            workflow=self.flow.workflow,
+            status=PENDING
+        ).values("workflow", "object_id", "transition").annotate(min_priority=Min("priority"))
+        assert_that(approvals.explain(), contains_string("river_ta_pending_idx"))
+
+    def test_shouldUseTheIndexOfTransactionDatesToFindTheRecentApproval(self):
+        approvals = TransitionApproval.objects.filter(
+            content_type=self.content_type,
+            object_id=self.workflow_object.pk,
+            transaction_date__isnull=False
+        ).order_by("-transaction_date")[:1]
+        assert_that(approvals.explain(), contains_string("USING INDEX river_ta_object_date_idx"))
@@ -0,0 +1,14 @@
+from django.http import HttpResponse, Http404
+
+from river.instrumentation import instrumentation
+
+
+def prometheus_metrics(request):
+    """
+    Exposes the metrics of the ``InMemoryMetricsBackend`` in the text format of Prometheus. It is not routed by
+    default; it can be added to the ``urls.py`` of the project behind whatever protection it needs.
+    """
+    backend = instrumentation.backend
+    if not hasattr(backend, "render_prometheus"):
+        raise Http404("The metrics backend of django-river can not be rendered for Prometheus")
+    return HttpResponse(backend.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,168 @@
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction, connection
+
+from river.core.workflowcache import workflow_cache
+from river.instrumentation import QueryCounter
+from river.models.factories import GroupObjectFactory, UserObjectFactory
+from rivertest.flowbuilder import FlowBuilder, RawState, AuthorizationPolicyBuilder
+
+WorkflowShape = namedtuple("WorkflowShape", ["states", "fan_out", "approvals", "cycles"])
+
+
+class Measurement(object):
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.error = None
+
+    def as_dict(self):
+        measurement = {"objects": self.objects, "calls": self.calls, "queries": self.queries, "seconds": self.seconds}
+        if self.error:
+            measurement["error"] = self.error
+        return measurement
+
+
+class Benchmark(object):
+    """
+    Times the paths of ``django-river`` on a generated workflow and a generated population of the objects of a model. The
+    workflow is a chain of ``states`` states where each state has transitions to the next ``fan_out`` ones, each
+    transition is approved by ``approvals`` approval metas with increasing priorities and the first ``cycles`` states
+    are returned to from their next state. Everything that is created is rolled back at the end.
+    """
+
+    def __init__(self, model, field_name, shape, batch_size=1000, sample=100):
+        self.model = model
+        self.field_name = field_name
+        self.shape = shape
+        self.batch_size = batch_size
+        self.sample = sample
+
+    def run(self, objects):
+        try:
+            with transaction.atomic():
+                measurements = self._run(objects)
+                transaction.set_rollback(True)
+        finally:
+            workflow_cache.invalidate()
+        return {operation: measurement.as_dict() for operation, measurement in measurements.items()}
+
+    def _run(self, objects):
+        group = GroupObjectFactory()
+        user = UserObjectFactory(groups=[group])
+        flow, raw_states = self._build_flow(group)
+        first_state, last_state = flow.get_state(raw_states[1]), flow.get_state(raw_states[-1])
+        class_workflow = getattr(self.model.river, self.field_name)
+        measurements = {}
+
+        population = []
+        for batch in self._chunks(range(objects)):
+            population.extend(self.model.objects.bulk_create([self.model() for _ in batch], batch_size=self.batch_size))
+
+        with self._measure(measurements, "initialize_many", len(population)) as measurement:
+            measurement.calls = 1
+            class_workflow.initialize_many(population, batch_size=self.batch_size)
+
+        sample = []
+        with self._measure(measurements, "initialize_approvals", self.sample) as measurement:
+            for _ in range(self.sample):
+                measurement.calls += 1
+                sample.append(self.model.objects.create())
+
+        with self._measure(measurements, "get_available_approvals", len(population) + len(sample)) as measurement:
+            measurement.calls = 1
+            len(list(class_workflow.get_available_approvals(as_user=user)))
+
+        with self._measure(measurements, "get_on_approval_objects", len(population) + len(sample)) as measurement:
+            measurement.calls = 1
+            len(list(class_workflow.get_on_approval_objects(as_user=user)))
+
+        with self._measure(measurements, "approve", len(sample)) as measurement:
+            for workflow_object in sample:
+                measurement.calls += 1
+                getattr(workflow_object.river, self.field_name).approve(as_user=user, groups=[group], next_state=first_state)
+
+        with self._measure(measurements, "jump_to", len(sample)) as measurement:
+            for workflow_object in sample:
+                measurement.calls += 1
+                getattr(workflow_object.river, self.field_name).jump_to(last_state)
+
+        with self._measure(measurements, "approve_many", len(population)) as measurement:
+            for batch in self._chunks(population):
+                measurement.calls += 1
+                class_workflow.approve_many(batch, as_user=user, next_state=first_state)
+
+        with self._measure(measurements, "jump_many", len(population)) as measurement:
+            for batch in self._chunks(population):
+                measurement.calls += 1
+                class_workflow.jump_many(batch, last_state)
+
+        return measurements
+
+    def _build_flow(self, group):
+        raw_states = [RawState("river_bench_state_%s" % i) for i in range(self.shape.states)]
+        flow_builder = FlowBuilder(self.field_name, ContentType.objects.get_for_model(self.model)).with_objects(0)
+        for index, source_state in enumerate(raw_states[:-1]):
+            for destination_state in raw_states[index + 1:index + 1 + self.shape.fan_out]:
+                flow_builder.with_transition(source_state, destination_state, self._authorization_policies(group))
+        for index in range(self.shape.cycles):
+            flow_builder.with_transition(raw_states[index + 1], raw_states[index], self._authorization_policies(group))
+        return flow_builder.build(), raw_states
+
+    def _authorization_policies(self, group):
+        return [AuthorizationPolicyBuilder().with_group(group).with_priority(priority).build() for priority in range(self.shape.approvals)]
+
+    def _chunks(self, items):
+        items = list(items)
+        for index in range(0, len(items), self.batch_size):
+            yield items[index:index + self.batch_size]
+
+    @staticmethod
+    @contextmanager
+    def _measure(measurements, operation, objects):
+        measurement = measurements[operation] = Measurement(objects)
+        query_counter = QueryCounter()
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), connection.execute_wrapper(query_counter):
+                yield measurement
+        except Exception as e:  # pylint: disable=broad-except
+            measurement.error = "%s: %s" % (e.__class__.__name__, e)
+        finally:
+            measurement.seconds = time.perf_counter() - started
+            measurement.queries = query_counter.count
+
+
+def compare(report, baseline, threshold):
+    """
+    Compares the runs of a report with the runs of the baseline that have the same number of objects. An operation
+    regresses when it runs more queries than it does in the baseline or when it is slower than it is in the baseline by
+    more than the ``threshold`` fraction. Returns the descriptions of the regressions. A baseline of another workflow
+    shape can't be compared with and is reported as a regression itself.
+    """
+    if baseline.get("workflow") != report["workflow"]:
+        return ["The baseline is run on a different workflow; %s" % baseline.get("workflow")]
+
+    baseline_runs = {run["objects"]: run["operations"] for run in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        for operation, measurement in sorted(run["operations"].items()):
+            baseline_measurement = baseline_runs.get(run["objects"], {}).get(operation)
+            if not baseline_measurement:
+                continue
+            if measurement.get("error") and not baseline_measurement.get("error"):
+                regressions.append("%s with %s objects fails; %s" % (operation, run["objects"], measurement["error"]))
+            if measurement["queries"] > baseline_measurement["queries"]:
+                regressions.append("%s with %s objects runs %s queries instead of %s" % (
+                    operation, run["objects"], measurement["queries"], baseline_measurement["queries"]
+                ))
+            if measurement["seconds"] > baseline_measurement["seconds"] * (1 + threshold):
+                regressions.append("%s with %s objects takes %.3f seconds instead of %.3f" % (
+                    operation, run["objects"], measurement["seconds"], baseline_measurement["seconds"]
+                ))
+    return regressions